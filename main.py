@@ -15,6 +15,10 @@ import argparse
 import json
 from datetime import datetime
 
+sys.path.append('/home/ubuntu/lotofacil/scripts/ia')
+from draw_store import LotofacilDrawStore
+from shared_history import SharedDrawHistory, SHARED_HISTORY_PATH
+
 # Configuração de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -52,6 +56,36 @@ class LotofacilSystem:
             'auth': '/home/ubuntu/lotofacil/scripts/auth/auth_api.py',
             'main': '/home/ubuntu/lotofacil/app.py'
         }
+        
+        # Histórico de sorteios compartilhado por todos os serviços
+        self.data_path = '/home/ubuntu/lotofacil/data/historico/lotofacil_raw.csv'
+        self.store_path = '/home/ubuntu/lotofacil/data/historico/lotofacil_draws.bin'
+        self.shared_history_path = SHARED_HISTORY_PATH
+    
+    def publish_history(self):
+        """
+        Publica o histórico compartilhado antes de iniciar os serviços
+        
+        Os serviços mapeiam o mesmo arquivo somente leitura, de modo que a memória
+        usada pelo histórico não cresce com o número de serviços.
+        
+        Returns:
+            bool: True se o histórico foi publicado, False caso contrário
+        """
+        try:
+            if not os.path.exists(self.store_path) and not os.path.exists(self.data_path):
+                logger.warning("Histórico não encontrado. Serviços usarão seus próprios dados.")
+                return False
+            
+            store = LotofacilDrawStore.load_or_build(self.store_path, self.data_path)
+            versao = SharedDrawHistory.publish(store, self.shared_history_path)
+            
+            logger.info(f"Histórico compartilhado publicado (versão {versao}, {len(store)} concursos)")
+            
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao publicar histórico compartilhado: {str(e)}")
+            return False
     
     def start_services(self, services=None):
         """
@@ -70,6 +104,9 @@ class LotofacilSystem:
             if services is None:
                 services = list(self.scripts.keys())
             
+            # Publicar o histórico antes que os serviços se conectem a ele
+            self.publish_history()
+            
             # Iniciar serviços
             for service in services:
                 if service not in self.scripts:
@@ -6,6 +6,7 @@ API Flask para a estratégia de Ciclo de Dezenas Fora
 """
 
 import os
+import sys
 import json
 from flask import Flask, request, jsonify, render_template
 import logging
@@ -14,6 +15,15 @@ import shutil
 
 # Importar a estratégia de Ciclo de Dezenas Fora
 from ciclo_dezenas_fora import CicloDezenasFora
+from combinacoes import TabelaCombinacoes
+from conferencia import ConferenciaJogos
+
+sys.path.append('/home/ubuntu/lotofacil/scripts/ia')
+from draw_store import mask_to_dezenas
+from nearest_draws import NearestDrawIndex
+from statistics_engine import StatisticsEngine
+from dataset_version import dataset_version
+from cooccurrence import LotofacilCooccurrenceIndex
 
 # Configuração de logging
 logging.basicConfig(
@@ -24,6 +34,15 @@ logging.basicConfig(
 )
 logger = logging.getLogger('ciclo_api')
 
+# Maior lote de jogos aceito por requisição
+LIMITE_JOGOS_LOTE = 200_000
+
+# Maior número de jogos conferidos por requisição (mantém a conferência no processo da API)
+LIMITE_JOGOS_CONFERENCIA = 1_000
+
+# Maior número de jogos sorteados entre as combinações filtradas por requisição
+LIMITE_JOGOS_FILTRO = 1_000
+
 class CicloDezenasForaAPI:
     """Classe para API da estratégia de Ciclo de Dezenas Fora"""
     
@@ -36,6 +55,20 @@ class CicloDezenasForaAPI:
         
         # Inicializar estratégia
         self.ciclo = CicloDezenasFora()
+        
+        # Tabela de todas as combinações (aberta na primeira consulta)
+        self.combinacoes = None
+        
+        # Índice de busca dos sorteios mais parecidos (reconstruído quando o histórico muda)
+        self.similares = None
+        self.versao_similares = None
+        
+        # Estatísticas do histórico (recalculadas apenas quando a versão do histórico muda)
+        self.estatisticas = StatisticsEngine()
+        
+        # Índice de coocorrência mantido pelo coletor (relido quando o histórico muda)
+        self.coocorrencia = None
+        self.versao_coocorrencia = None
     
     def analisar_ciclo(self):
         """
@@ -81,12 +114,13 @@ class CicloDezenasForaAPI:
                 'message': f'Erro ao analisar ciclo: {str(e)}'
             }
     
-    def gerar_jogos(self, num_jogos=5):
+    def gerar_jogos(self, num_jogos=5, conferir=False):
         """
         Gera jogos com base no ciclo atual
         
         Args:
             num_jogos (int): Número de jogos a serem gerados
+            conferir (bool): Se True, inclui o desempenho dos jogos no histórico
             
         Returns:
             dict: Jogos gerados
@@ -103,10 +137,15 @@ class CicloDezenasForaAPI:
                     'message': 'Falha ao gerar jogos'
                 }
             
-            return {
+            resultado = {
                 'success': True,
                 'jogos': jogos
             }
+            
+            if conferir:
+                resultado['conferencia'] = self.conferir_jogos(jogos).get('resultados')
+            
+            return resultado
         except Exception as e:
             logger.error(f"Erro ao gerar jogos: {str(e)}")
             return {
@@ -114,6 +153,278 @@ class CicloDezenasForaAPI:
                 'message': f'Erro ao gerar jogos: {str(e)}'
             }
     
+    def gerar_jogos_lote(self, num_jogos, seed=None):
+        """
+        Gera um lote grande de jogos distintos com base no ciclo atual
+        
+        Args:
+            num_jogos (int): Número de jogos a serem gerados
+            seed (int): Semente do gerador aleatório (opcional)
+            
+        Returns:
+            dict: Total e jogos gerados
+        """
+        try:
+            logger.info(f"Gerando lote de {num_jogos} jogos via API...")
+            
+            if not 1 <= num_jogos <= LIMITE_JOGOS_LOTE:
+                raise ValueError(f"num_jogos deve estar entre 1 e {LIMITE_JOGOS_LOTE}")
+            
+            jogos = self.ciclo.gerar_jogos_lote(num_jogos, seed=seed)
+            
+            if jogos is None:
+                return {
+                    'success': False,
+                    'message': 'Falha ao gerar jogos'
+                }
+            
+            return {
+                'success': True,
+                'total': len(jogos),
+                'jogos': jogos.tolist()
+            }
+        except ValueError as e:
+            return {
+                'success': False,
+                'message': str(e)
+            }
+        except Exception as e:
+            logger.error(f"Erro ao gerar lote de jogos: {str(e)}")
+            return {
+                'success': False,
+                'message': f'Erro ao gerar lote de jogos: {str(e)}'
+            }
+    
+    def conferir_jogos(self, jogos):
+        """
+        Confere jogos contra todo o histórico
+        
+        Args:
+            jogos (list): Jogos (listas de 15 dezenas)
+            
+        Returns:
+            dict: Sorteios em cada faixa de premiação (11 a 15 acertos) por jogo
+        """
+        try:
+            logger.info(f"Conferindo {len(jogos)} jogos via API...")
+            
+            if len(jogos) > LIMITE_JOGOS_CONFERENCIA:
+                raise ValueError(f"No máximo {LIMITE_JOGOS_CONFERENCIA} jogos por conferência")
+            
+            historico = self.ciclo.carregar_dados()
+            
+            if historico is None:
+                return {
+                    'success': False,
+                    'message': 'Falha ao carregar dados'
+                }
+            
+            return {
+                'success': True,
+                'concursos': len(historico),
+                'resultados': ConferenciaJogos(historico).resumo(jogos)
+            }
+        except ValueError as e:
+            return {
+                'success': False,
+                'message': str(e)
+            }
+        except Exception as e:
+            logger.error(f"Erro ao conferir jogos: {str(e)}")
+            return {
+                'success': False,
+                'message': f'Erro ao conferir jogos: {str(e)}'
+            }
+    
+    def buscar_similares(self, jogos, k=10):
+        """
+        Busca os sorteios históricos mais parecidos com cada jogo
+        
+        Args:
+            jogos (list): Jogos (listas de 15 dezenas)
+            k (int): Número de sorteios retornados por jogo
+            
+        Returns:
+            dict: Para cada jogo, os k sorteios mais próximos e os concursos com 13 ou mais acertos
+        """
+        try:
+            logger.info(f"Buscando sorteios similares a {len(jogos)} jogos via API...")
+            
+            if k < 1:
+                raise ValueError("k deve ser um inteiro positivo")
+            
+            historico = self.ciclo.carregar_dados()
+            
+            if historico is None or len(historico) == 0:
+                return {
+                    'success': False,
+                    'message': 'Falha ao carregar dados'
+                }
+            
+            # Versão pelo conteúdo: a correção de um concurso passado também reconstrói o índice
+            versao = dataset_version(historico)
+            if self.similares is None or self.versao_similares != versao:
+                self.similares = NearestDrawIndex.from_store(historico)
+                self.versao_similares = versao
+            
+            return {
+                'success': True,
+                'concursos': len(historico),
+                'resultados': self.similares.nearest_many(jogos, k)
+            }
+        except ValueError as e:
+            return {
+                'success': False,
+                'message': str(e)
+            }
+        except Exception as e:
+            logger.error(f"Erro ao buscar sorteios similares: {str(e)}")
+            return {
+                'success': False,
+                'message': f'Erro ao buscar sorteios similares: {str(e)}'
+            }
+    
+    def obter_estatisticas(self, janela=None):
+        """
+        Obtém as estatísticas por dezena e as distribuições do histórico
+        
+        Args:
+            janela (int): Considerar apenas os últimos N concursos (None para todos)
+            
+        Returns:
+            dict: Estatísticas do histórico e a versão a partir da qual foram calculadas
+        """
+        try:
+            historico = self.ciclo.carregar_dados()
+            
+            if historico is None or len(historico) == 0:
+                return {
+                    'success': False,
+                    'message': 'Falha ao carregar dados'
+                }
+            
+            return {
+                'success': True,
+                'estatisticas': self.estatisticas.get(historico, janela)
+            }
+        except ValueError as e:
+            return {
+                'success': False,
+                'message': str(e)
+            }
+        except Exception as e:
+            logger.error(f"Erro ao obter estatísticas: {str(e)}")
+            return {
+                'success': False,
+                'message': f'Erro ao obter estatísticas: {str(e)}'
+            }
+    
+    def obter_pares(self, dezena=None, k=10, janela=None):
+        """
+        Obtém os pares de dezenas que mais saíram juntos
+        
+        Args:
+            dezena (int): Se informada, apenas os pares que contêm esta dezena
+            k (int): Número de pares retornados
+            janela (int): Considerar apenas os últimos N concursos (None para todos)
+            
+        Returns:
+            dict: Pares em ordem decrescente de coocorrência
+        """
+        try:
+            if dezena is not None and not 1 <= dezena <= 25:
+                raise ValueError("As dezenas devem estar entre 1 e 25")
+            if k < 1:
+                raise ValueError("k deve ser um inteiro positivo")
+            if janela is not None and janela < 1:
+                raise ValueError("janela deve ser um número positivo de concursos")
+            
+            historico = self.ciclo.carregar_dados()
+            
+            if historico is None or len(historico) == 0:
+                return {
+                    'success': False,
+                    'message': 'Falha ao carregar dados'
+                }
+            
+            # Índice gravado pelo coletor; concursos ainda não indexados são acrescentados em memória
+            versao = dataset_version(historico)
+            if self.coocorrencia is None or self.versao_coocorrencia != versao:
+                self.coocorrencia = LotofacilCooccurrenceIndex.load_or_build(historico, save=False)
+                self.versao_coocorrencia = versao
+            
+            return {
+                'success': True,
+                'concursos': min(janela or len(historico), len(historico)),
+                'pares': [
+                    {'dezenas': sorted(par), 'contagem': contagem}
+                    for par, contagem in self.coocorrencia.top_pairs(k, janela, dezena)
+                ]
+            }
+        except ValueError as e:
+            return {
+                'success': False,
+                'message': str(e)
+            }
+        except Exception as e:
+            logger.error(f"Erro ao obter pares de dezenas: {str(e)}")
+            return {
+                'success': False,
+                'message': f'Erro ao obter pares de dezenas: {str(e)}'
+            }
+    
+    def filtrar_combinacoes(self, filtros, num_jogos=5, seed=None):
+        """
+        Filtra o espaço completo de jogos e sorteia jogos entre os selecionados
+        
+        Args:
+            filtros (dict): Argumentos de TabelaCombinacoes.filtrar
+            num_jogos (int): Número de jogos a serem sorteados
+            seed (int): Semente do gerador aleatório (opcional)
+            
+        Returns:
+            dict: Total de jogos que atendem aos filtros e jogos sorteados
+        """
+        try:
+            logger.info(f"Filtrando combinações via API: {filtros}")
+            
+            if not 1 <= num_jogos <= LIMITE_JOGOS_FILTRO:
+                raise ValueError(f"num_jogos deve estar entre 1 e {LIMITE_JOGOS_FILTRO}")
+            
+            if self.combinacoes is None:
+                self.combinacoes = TabelaCombinacoes.load_or_build()
+            
+            # Repetidas são contadas em relação ao último concurso do histórico
+            filtros = dict(filtros)
+            if filtros.get('repetidas') is not None and filtros.get('ultimo_sorteio') is None:
+                historico = self.ciclo.carregar_dados()
+                if historico is None or len(historico) == 0:
+                    return {
+                        'success': False,
+                        'message': 'Histórico indisponível para o filtro de repetidas'
+                    }
+                filtros['ultimo_sorteio'] = int(historico.masks[-1])
+            
+            selecao = self.combinacoes.filtrar(**filtros)
+            jogos = [mask_to_dezenas(m) for m in self.combinacoes.amostrar(selecao, num_jogos, seed)]
+            
+            return {
+                'success': True,
+                'total': int(selecao.sum()),
+                'jogos': jogos
+            }
+        except ValueError as e:
+            return {
+                'success': False,
+                'message': str(e)
+            }
+        except Exception as e:
+            logger.error(f"Erro ao filtrar combinações: {str(e)}")
+            return {
+                'success': False,
+                'message': f'Erro ao filtrar combinações: {str(e)}'
+            }
+    
     def iniciar_ciclo(self):
         """
         Inicia um novo ciclo de dezenas fora
@@ -238,6 +549,83 @@ def analisar_ciclo():
             'message': f'Erro ao analisar ciclo: {str(e)}'
         }), 500
 
+@app.route('/api/estatisticas', methods=['GET'])
+def obter_estatisticas():
+    """
+    Obtém as estatísticas do histórico (frequência, atrasos, paridade, soma, moldura e centro)
+    
+    Parâmetros de consulta:
+    - janela (int): Considerar apenas os últimos N concursos (opcional)
+    
+    A resposta traz um ETag com a versão do histórico: enquanto ela não mudar, requisições
+    com If-None-Match recebem 304 sem corpo
+    """
+    try:
+        janela = request.args.get('janela', type=int)
+        
+        if 'janela' in request.args and (janela is None or janela < 1):
+            return jsonify({
+                'success': False,
+                'message': 'janela deve ser um número positivo de concursos'
+            }), 400
+        
+        resultado = ciclo_api.obter_estatisticas(janela)
+        if not resultado['success']:
+            return jsonify(resultado), 503
+        
+        resposta = jsonify(resultado)
+        resposta.set_etag(f"{resultado['estatisticas']['dataset_version']}-{janela or 'todos'}")
+        resposta.headers['Cache-Control'] = 'no-cache'
+        resposta.headers['Access-Control-Allow-Origin'] = '*'
+        return resposta.make_conditional(request)
+    except Exception as e:
+        logger.error(f"Erro ao obter estatísticas: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'Erro ao obter estatísticas: {str(e)}'
+        }), 500
+
+@app.route('/api/coocorrencia/pares', methods=['GET'])
+def obter_pares():
+    """
+    Obtém os pares de dezenas que mais saíram juntos
+    
+    Parâmetros de consulta:
+    - dezena (int): Apenas os pares que contêm esta dezena (opcional)
+    - k (int): Número de pares retornados (opcional, padrão: 10)
+    - janela (int): Considerar apenas os últimos N concursos (opcional)
+    
+    Retorna um JSON com os pares e o número de vezes que saíram juntos
+    """
+    try:
+        dezena = request.args.get('dezena', type=int)
+        k = request.args.get('k', 10, type=int)
+        janela = request.args.get('janela', type=int)
+        
+        if 'dezena' in request.args and (dezena is None or not 1 <= dezena <= 25):
+            mensagem = 'As dezenas devem estar entre 1 e 25'
+        elif 'k' in request.args and (request.args.get('k', type=int) is None or k < 1):
+            mensagem = 'k deve ser um inteiro positivo'
+        elif 'janela' in request.args and (janela is None or janela < 1):
+            mensagem = 'janela deve ser um número positivo de concursos'
+        else:
+            mensagem = None
+        
+        if mensagem:
+            return jsonify({
+                'success': False,
+                'message': mensagem
+            }), 400
+        
+        resultado = ciclo_api.obter_pares(dezena=dezena, k=k, janela=janela)
+        return jsonify(resultado)
+    except Exception as e:
+        logger.error(f"Erro ao obter pares de dezenas: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'Erro ao obter pares de dezenas: {str(e)}'
+        }), 500
+
 @app.route('/api/ciclo/gerar-jogos', methods=['GET'])
 def gerar_jogos():
     """
@@ -245,12 +633,14 @@ def gerar_jogos():
     
     Parâmetros de consulta:
     - num_jogos (int): Número de jogos a serem gerados (opcional, padrão: 5)
+    - conferir (bool): Incluir o desempenho dos jogos no histórico (opcional, padrão: false)
     
     Retorna um JSON com os jogos gerados
     """
     try:
         num_jogos = request.args.get('num_jogos', 5, type=int)
-        resultado = ciclo_api.gerar_jogos(num_jogos=num_jogos)
+        conferir = request.args.get('conferir', 'false').lower() in ('1', 'true', 'sim')
+        resultado = ciclo_api.gerar_jogos(num_jogos=num_jogos, conferir=conferir)
         return jsonify(resultado)
     except Exception as e:
         logger.error(f"Erro ao gerar jogos: {str(e)}")
@@ -259,6 +649,149 @@ def gerar_jogos():
             'message': f'Erro ao gerar jogos: {str(e)}'
         }), 500
 
+@app.route('/api/ciclo/gerar-jogos-lote', methods=['GET'])
+def gerar_jogos_lote():
+    """
+    Gera um lote grande de jogos distintos com base no ciclo atual
+    
+    Parâmetros de consulta:
+    - num_jogos (int): Número de jogos a serem gerados (opcional, padrão: 1000)
+    - seed (int): Semente do gerador aleatório (opcional)
+    
+    Retorna um JSON com o total e os jogos gerados
+    """
+    try:
+        num_jogos = request.args.get('num_jogos', 1000, type=int)
+        seed = request.args.get('seed', None, type=int)
+        resultado = ciclo_api.gerar_jogos_lote(num_jogos=num_jogos, seed=seed)
+        return jsonify(resultado)
+    except Exception as e:
+        logger.error(f"Erro ao gerar lote de jogos: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'Erro ao gerar lote de jogos: {str(e)}'
+        }), 500
+
+@app.route('/api/jogos/conferir', methods=['POST'])
+def conferir_jogos():
+    """
+    Confere jogos contra todo o histórico de sorteios
+    
+    Espera um JSON com o seguinte campo:
+    - jogos (list): Jogos a conferir (listas de 15 dezenas)
+    
+    Retorna um JSON com o número de sorteios em cada faixa (11 a 15 acertos) por jogo
+    """
+    try:
+        data = request.json or {}
+        jogos = data.get('jogos')
+        
+        if not jogos:
+            return jsonify({
+                'success': False,
+                'message': 'Nenhum jogo informado'
+            }), 400
+        
+        if not isinstance(jogos, list) or len(jogos) > LIMITE_JOGOS_CONFERENCIA:
+            return jsonify({
+                'success': False,
+                'message': f'Informe uma lista de até {LIMITE_JOGOS_CONFERENCIA} jogos'
+            }), 400
+        
+        resultado = ciclo_api.conferir_jogos(jogos)
+        return jsonify(resultado)
+    except Exception as e:
+        logger.error(f"Erro ao conferir jogos: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'Erro ao conferir jogos: {str(e)}'
+        }), 500
+
+@app.route('/api/ciclo/similares', methods=['POST'])
+def buscar_similares():
+    """
+    Busca os sorteios históricos mais parecidos com cada jogo (distância de Hamming)
+    
+    Espera um JSON com os seguintes campos:
+    - jogos (list): Jogos a consultar (listas de 15 dezenas); aceita também jogo (list)
+    - k (int): Número de sorteios retornados por jogo (padrão: 10)
+    
+    Retorna um JSON com os k sorteios mais próximos de cada jogo e os concursos com 13 ou mais acertos
+    """
+    try:
+        data = request.json or {}
+        jogos = data.get('jogos') or ([data['jogo']] if data.get('jogo') else None)
+        
+        if not jogos:
+            return jsonify({
+                'success': False,
+                'message': 'Nenhum jogo informado'
+            }), 400
+        
+        try:
+            k = int(data.get('k', 10))
+        except (TypeError, ValueError):
+            k = 0
+        
+        if k < 1:
+            return jsonify({
+                'success': False,
+                'message': 'k deve ser um inteiro positivo'
+            }), 400
+        
+        resultado = ciclo_api.buscar_similares(jogos, k)
+        return jsonify(resultado)
+    except Exception as e:
+        logger.error(f"Erro ao buscar sorteios similares: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'Erro ao buscar sorteios similares: {str(e)}'
+        }), 500
+
+@app.route('/api/combinacoes/filtrar', methods=['POST'])
+def filtrar_combinacoes():
+    """
+    Filtra as 3.268.760 combinações possíveis e sorteia jogos entre as selecionadas
+    
+    Espera um JSON com os seguintes campos (todos opcionais):
+    - fixas (list): Dezenas que devem estar no jogo
+    - excluidas (list): Dezenas que não podem estar no jogo
+    - pares, soma, primos, moldura, maior_sequencia, repetidas: valor exato ou [mínimo, máximo]
+    - num_jogos (int): Número de jogos a serem sorteados (padrão: 5)
+    - seed (int): Semente do gerador aleatório
+    
+    Retorna um JSON com o total de jogos que atendem aos filtros e os jogos sorteados
+    """
+    try:
+        data = request.json or {}
+        
+        campos = ('fixas', 'excluidas', 'pares', 'soma', 'primos', 'moldura', 'maior_sequencia', 'repetidas')
+        filtros = {campo: data[campo] for campo in campos if data.get(campo) is not None}
+        
+        num_jogos = data.get('num_jogos', 5)
+        seed = data.get('seed')
+        
+        if isinstance(num_jogos, bool) or not isinstance(num_jogos, int) or not 1 <= num_jogos <= LIMITE_JOGOS_FILTRO:
+            return jsonify({
+                'success': False,
+                'message': f'num_jogos deve ser um inteiro entre 1 e {LIMITE_JOGOS_FILTRO}'
+            }), 400
+        
+        if seed is not None and (isinstance(seed, bool) or not isinstance(seed, int)):
+            return jsonify({
+                'success': False,
+                'message': 'seed deve ser um inteiro'
+            }), 400
+        
+        resultado = ciclo_api.filtrar_combinacoes(filtros, num_jogos=num_jogos, seed=seed)
+        return jsonify(resultado)
+    except Exception as e:
+        logger.error(f"Erro ao filtrar combinações: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'Erro ao filtrar combinações: {str(e)}'
+        }), 500
+
 @app.route('/api/ciclo/iniciar', methods=['POST'])
 def iniciar_ciclo():
     """
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Backtest da estratégia de Ciclo de Dezenas Fora sobre todo o histórico
+
+Reproduz, do início do histórico, todos os ciclos que a estratégia teria aberto
+e fechado: o primeiro ciclo abre após a primeira janela de num_concursos
+concursos e, a cada fechamento, o ciclo seguinte abre no concurso de
+fechamento com as dezenas fora da janela até ele (as mesmas regras de
+CicloDezenasFora.atualizar_ciclo). Cada ciclo é aplicado por varrer_ciclo sobre
+as máscaras de bits e as contagens das janelas vêm de somas acumuladas, de modo
+que um histórico completo é percorrido em milissegundos. Conjuntos de
+parâmetros são distribuídos entre processos.
+"""
+
+import os
+import sys
+import logging
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+# Importar o armazenamento do histórico em máscaras de bits
+sys.path.append('/home/ubuntu/lotofacil/scripts/ia')
+from draw_store import NUM_DEZENAS, dezenas_to_mask, mask_to_dezenas, masks_to_matrix
+from ciclo_dezenas_fora import varrer_ciclo, selecionar_dezenas_fora
+
+logger = logging.getLogger('ciclo_backtest')
+
+# Sorteios do processo trabalhador (enviados uma única vez pelo inicializador do pool)
+_historico_worker = None
+
+
+def backtest_ciclos(mascaras, concursos=None, num_dezenas_ciclo=10, num_concursos=10):
+    """
+    Reproduz todos os ciclos da estratégia ao longo de um histórico
+    
+    Args:
+        mascaras (numpy.ndarray): Máscaras uint32 dos sorteios, em ordem de concurso
+        concursos (numpy.ndarray): Números dos concursos (padrão: posição + 1)
+        num_dezenas_ciclo (int): Número máximo de dezenas de um ciclo (ciclos com menos dezenas não fecham)
+        num_concursos (int): Janela de concursos usada na escolha das dezenas fora
+    
+    Returns:
+        list: Ciclos com concurso de abertura e de fechamento (None se ainda aberto), duração em
+            concursos, dezenas e ordem em que as dezenas foram sorteadas (dezena, concurso)
+    
+    Raises:
+        ValueError: Se os parâmetros não forem positivos
+    """
+    if num_dezenas_ciclo < 1 or num_concursos < 1:
+        raise ValueError("num_dezenas_ciclo e num_concursos devem ser positivos")
+    
+    mascaras = np.ascontiguousarray(mascaras, dtype=np.uint32)
+    if concursos is None:
+        concursos = np.arange(1, len(mascaras) + 1)
+    concursos = np.asarray(concursos, dtype=np.int64)
+    
+    # Contagem de cada dezena nos t primeiros sorteios: janela (a, b] = acumulados[b] - acumulados[a]
+    acumulados = np.zeros((len(mascaras) + 1, NUM_DEZENAS), dtype=np.int32)
+    np.cumsum(masks_to_matrix(mascaras, dtype=np.int32), axis=0, out=acumulados[1:])
+    
+    ciclos = []
+    pos = num_concursos
+    while pos <= len(mascaras):
+        contagem = acumulados[pos] - acumulados[max(0, pos - num_concursos)]
+        dezenas = list(selecionar_dezenas_fora(contagem, num_concursos).keys())[:num_dezenas_ciclo]
+        
+        fechamento, _, acertos = varrer_ciclo(
+            dezenas_to_mask(dezenas), 0, mascaras[pos:],
+            fecha=len(dezenas) == num_dezenas_ciclo, detalhar=True
+        )
+        
+        # Dezenas na ordem em que foram sorteadas (empates no mesmo concurso pela dezena)
+        ordem_acertos = [
+            {'dezena': dezena, 'concurso': int(concursos[pos + i])}
+            for i in np.flatnonzero(acertos).tolist()
+            for dezena in mask_to_dezenas(acertos[i])
+        ]
+        
+        ciclos.append({
+            'concurso_inicio': int(concursos[pos - 1]),
+            'concurso_fechamento': int(concursos[pos + fechamento]) if fechamento is not None else None,
+            'duracao': fechamento + 1 if fechamento is not None else len(acertos),
+            'dezenas': dezenas,
+            'ordem_acertos': ordem_acertos
+        })
+        
+        if fechamento is None:
+            break
+        pos += fechamento + 1
+    
+    return ciclos
+
+
+def resumir_ciclos(ciclos):
+    """
+    Resume a duração dos ciclos de um backtest
+    
+    Args:
+        ciclos (list): Ciclos retornados por backtest_ciclos
+    
+    Returns:
+        dict: Número de ciclos, de ciclos fechados e duração (média, mediana, mínima e máxima) dos fechados
+    """
+    duracoes = np.array([c['duracao'] for c in ciclos if c['concurso_fechamento'] is not None])
+    return {
+        'ciclos': len(ciclos),
+        'fechados': len(duracoes),
+        'duracao_media': round(float(duracoes.mean()), 2) if len(duracoes) else None,
+        'duracao_mediana': float(np.median(duracoes)) if len(duracoes) else None,
+        'duracao_minima': int(duracoes.min()) if len(duracoes) else None,
+        'duracao_maxima': int(duracoes.max()) if len(duracoes) else None
+    }
+
+
+def _iniciar_worker(mascaras, concursos):
+    """Guarda o histórico no processo trabalhador"""
+    global _historico_worker
+    _historico_worker = (mascaras, concursos)
+
+
+def _backtest_worker(tarefa):
+    """Executa o backtest de um conjunto de parâmetros no processo trabalhador"""
+    parametros, incluir_ciclos = tarefa
+    ciclos = backtest_ciclos(*_historico_worker, **parametros)
+    resultado = {'parametros': parametros, 'resumo': resumir_ciclos(ciclos)}
+    if incluir_ciclos:
+        resultado['ciclos'] = ciclos
+    return resultado
+
+
+def varrer_parametros(mascaras, parametros, concursos=None, processos=None, incluir_ciclos=False):
+    """
+    Executa o backtest para vários conjuntos de parâmetros, distribuindo-os entre processos
+    
+    Args:
+        mascaras (numpy.ndarray): Máscaras uint32 dos sorteios
+        parametros (list): Dicionários com num_dezenas_ciclo e/ou num_concursos
+        concursos (numpy.ndarray): Números dos concursos (padrão: posição + 1)
+        processos (int): Número de processos (None: um por processador)
+        incluir_ciclos (bool): Incluir a lista de ciclos de cada conjunto (além do resumo)
+    
+    Returns:
+        list: Para cada conjunto de parâmetros, na mesma ordem, os parâmetros, o resumo e,
+            se pedido, os ciclos
+    """
+    mascaras = np.ascontiguousarray(mascaras, dtype=np.uint32)
+    if concursos is None:
+        concursos = np.arange(1, len(mascaras) + 1)
+    concursos = np.asarray(concursos, dtype=np.int64)
+    
+    tarefas = [(dict(p), incluir_ciclos) for p in parametros]
+    processos = min(processos or os.cpu_count() or 1, len(tarefas))
+    
+    if processos <= 1:
+        _iniciar_worker(mascaras, concursos)
+        return [_backtest_worker(tarefa) for tarefa in tarefas]
+    
+    logger.info(f"Backtest de {len(tarefas)} conjuntos de parâmetros sobre {len(mascaras)} sorteios em {processos} processos")
+    
+    lote = max(1, len(tarefas) // (4 * processos))
+    with ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_worker, initargs=(mascaras, concursos)) as executor:
+        return list(executor.map(_backtest_worker, tarefas, chunksize=lote))
+
+
+if __name__ == "__main__":
+    import time
+    import argparse
+    from synthetic_history import SyntheticHistoryGenerator
+    
+    parser = argparse.ArgumentParser(description='Backtest da estratégia de Ciclo de Dezenas Fora')
+    parser.add_argument('--sorteios', type=int, default=3_500, help='Número de sorteios do histórico sintético')
+    parser.add_argument('--dezenas', type=int, nargs='+', default=list(range(1, 11)), help='Valores de num_dezenas_ciclo')
+    parser.add_argument('--janelas', type=int, nargs='+', default=list(range(3, 33)), help='Valores de num_concursos')
+    parser.add_argument('--processos', type=int, default=None, help='Número de processos')
+    args = parser.parse_args()
+    
+    mascaras = SyntheticHistoryGenerator(seed=1).store(args.sorteios).masks
+    parametros = [{'num_dezenas_ciclo': d, 'num_concursos': j} for d in args.dezenas for j in args.janelas]
+    
+    inicio = time.perf_counter()
+    resultados = varrer_parametros(mascaras, parametros, processos=args.processos)
+    print(f"{len(parametros)} configurações x {args.sorteios} sorteios em {time.perf_counter() - inicio:.2f} s")
+    
+    for resultado in sorted(resultados, key=lambda r: -r['resumo']['fechados'])[:10]:
+        print(f"{resultado['parametros']}: {resultado['resumo']}")
@@ -6,13 +6,23 @@ Implementação da estratégia de Ciclo de Dezenas Fora para a Lotofácil
 """
 
 import os
+import sys
+import math
 import numpy as np
 import pandas as pd
-import json
 import logging
 from datetime import datetime
 import matplotlib.pyplot as plt
-from collections import Counter
+
+# Importar o histórico em máscaras de bits
+sys.path.append('/home/ubuntu/lotofacil/scripts/ia')
+from draw_store import LotofacilDrawStore, mask_to_dezenas, dezenas_to_mask, masks_to_matrix
+from draw_store import NUM_DEZENAS, DEZENAS_POR_SORTEIO, BITS_DEZENAS
+from shared_history import SharedDrawHistory, SHARED_HISTORY_PATH
+from dataset_version import dataset_version, VersionedCache
+from repeat_index import DrawRepeatIndex
+from windowed_counter import WindowedCounter, CAPACIDADE_PADRAO
+from ciclo_repositorio import RepositorioCiclos
 
 # Configuração de logging
 logging.basicConfig(
@@ -23,6 +33,82 @@ logging.basicConfig(
 )
 logger = logging.getLogger('ciclo_dezenas')
 
+# Concursos examinados no primeiro bloco da varredura de um ciclo (o bloco dobra a cada passo)
+BLOCO_CICLO = 64
+
+
+def selecionar_dezenas_fora(contagem, num_concursos):
+    """
+    Seleciona as dezenas que ficaram fora ou apareceram em menos de 1/3 dos concursos
+    
+    Args:
+        contagem (numpy.ndarray): Contagem de cada dezena na janela (25 posições)
+        num_concursos (int): Tamanho da janela
+        
+    Returns:
+        dict: Dezenas selecionadas e suas frequências, da menos para a mais frequente
+    """
+    selecionadas = np.flatnonzero(contagem <= num_concursos // 3)
+    
+    # Ordenar por frequência (empates pela dezena)
+    ordem = selecionadas[np.argsort(contagem[selecionadas], kind='stable')]
+    return {int(i) + 1: int(contagem[i]) for i in ordem}
+
+
+def varrer_ciclo(mascara_ciclo, mascara_sorteadas, mascaras, fecha=True, detalhar=False, bloco=BLOCO_CICLO):
+    """
+    Aplica uma sequência de concursos a um ciclo usando máscaras de bits
+    
+    O OR acumulado das dezenas pendentes sorteadas em cada concurso mostra quais
+    delas já saíram; o ciclo fecha no primeiro concurso em que o acumulado cobre
+    todas as pendentes. Os concursos são examinados em blocos crescentes, de modo
+    que um fechamento próximo não percorre o restante dos concursos.
+    
+    Args:
+        mascara_ciclo (int): Máscara das dezenas do ciclo
+        mascara_sorteadas (int): Máscara das dezenas do ciclo já sorteadas
+        mascaras (numpy.ndarray): Máscaras uint32 dos concursos, em ordem
+        fecha (bool): Se False, o ciclo não fecha (todos os concursos são aplicados)
+        detalhar (bool): Se True, retorna também as dezenas do ciclo sorteadas pela primeira vez em cada concurso
+        bloco (int): Tamanho do primeiro bloco de concursos
+        
+    Returns:
+        tuple: (posição do concurso de fechamento ou None, máscara final das dezenas sorteadas,
+            máscaras uint32 das dezenas novas em cada concurso aplicado ou None se detalhar=False)
+    """
+    mascaras = np.asarray(mascaras, dtype=np.uint32)
+    pendentes = np.uint32(int(mascara_ciclo) & ~int(mascara_sorteadas))
+    acumulado_total = np.uint32(0)
+    fechamento = None
+    partes = []
+    
+    inicio = 0
+    while inicio < len(mascaras) and fechamento is None:
+        acumulado = np.bitwise_or.accumulate(mascaras[inicio:inicio + bloco] & pendentes) | acumulado_total
+        
+        if fecha:
+            completos = np.flatnonzero(acumulado == pendentes)
+            if len(completos):
+                acumulado = acumulado[:completos[0] + 1]
+                fechamento = inicio + int(completos[0])
+        
+        if detalhar:
+            anterior = np.empty_like(acumulado)
+            anterior[0] = acumulado_total
+            anterior[1:] = acumulado[:-1]
+            partes.append(acumulado & ~anterior)
+        
+        acumulado_total = acumulado[-1]
+        inicio += bloco
+        bloco *= 2
+    
+    acertos = None
+    if detalhar:
+        acertos = np.concatenate(partes) if partes else np.zeros(0, dtype=np.uint32)
+    
+    return fechamento, int(mascara_sorteadas) | int(acumulado_total), acertos
+
+
 class CicloDezenasFora:
     """Classe para implementação da estratégia de Ciclo de Dezenas Fora"""
     
@@ -35,48 +121,153 @@ class CicloDezenasFora:
         
         # Caminhos dos arquivos
         self.data_path = '/home/ubuntu/lotofacil/data/historico/lotofacil_raw.csv'
+        self.store_path = '/home/ubuntu/lotofacil/data/historico/lotofacil_draws.bin'
+        self.shared_history_path = SHARED_HISTORY_PATH
         self.ciclos_path = '/home/ubuntu/lotofacil/data/estrategias/ciclos_dezenas.json'
         
         # Número de dezenas no ciclo
         self.num_dezenas_ciclo = 10
         
+        # Número de concursos considerados na escolha das dezenas fora
+        self.num_concursos = 10
+        
         # Ciclo atual
         self.ciclo_atual = None
+        
+        # Ciclos em memória, gravados em segundo plano (criado na primeira leitura)
+        self.repositorio = None
+        
+        # Histórico publicado pelo coletor (conectado na primeira leitura)
+        self.historico_compartilhado = None
+        
+        # Versão do histórico a partir da qual o ciclo e o gráfico foram atualizados
+        self.versions = VersionedCache('/home/ubuntu/lotofacil/data/estrategias/versions.json')
+        self.versao_dados = None
+        
+        # Índice de repetições do histórico usado na geração de jogos
+        self.indice_repeticoes = None
+        self.versao_indice = None
+        
+        # Contagens das dezenas nas janelas dos últimos concursos (atualizadas a cada concurso novo)
+        self.contador = None
+    
+    def _obter_repositorio(self):
+        """Obtém o repositório de ciclos do arquivo atual (self.ciclos_path)"""
+        if self.repositorio is None or self.repositorio.path != self.ciclos_path:
+            if self.repositorio is not None:
+                self.repositorio.fechar()
+            self.repositorio = RepositorioCiclos(self.ciclos_path)
+        return self.repositorio
+    
+    def _obter_contador(self, historico, janela):
+        """
+        Obtém o contador de janelas sincronizado com o histórico
+        
+        Args:
+            historico (LotofacilDrawStore): Histórico de sorteios
+            janela (int): Maior janela que será consultada
+            
+        Returns:
+            WindowedCounter: Contador com todos os concursos do histórico
+        """
+        if self.contador is None or janela > self.contador.capacidade:
+            self.contador = WindowedCounter(max(janela, CAPACIDADE_PADRAO))
+        
+        # Concursos novos são acrescentados em O(25) cada
+        self.contador.sync(historico)
+        return self.contador
+    
+    def _obter_indice_repeticoes(self, historico):
+        """
+        Obtém o índice de repetições do histórico, reconstruindo-o quando o histórico muda
+        
+        Args:
+            historico (LotofacilDrawStore): Histórico de sorteios
+            
+        Returns:
+            DrawRepeatIndex: Índice dos sorteios passados
+        """
+        # Versão pelo conteúdo: a correção de um concurso passado também reconstrói o índice
+        versao = dataset_version(historico)
+        if self.indice_repeticoes is None or self.versao_indice != versao:
+            self.indice_repeticoes = DrawRepeatIndex.from_store(historico)
+            self.versao_indice = versao
+        return self.indice_repeticoes
+    
+    def _carregar_compartilhado(self):
+        """
+        Obtém o histórico compartilhado entre os serviços, sem cópia
+        
+        Returns:
+            LotofacilDrawStore: Histórico na versão mais recente ou None se não publicado
+        """
+        if self.historico_compartilhado is None:
+            self.historico_compartilhado = SharedDrawHistory.attach(self.shared_history_path)
+            if self.historico_compartilhado is None:
+                return None
+        elif self.historico_compartilhado.refresh():
+            logger.info(f"Histórico compartilhado atualizado (versão {self.historico_compartilhado.version})")
+        
+        if len(self.historico_compartilhado) == 0:
+            return None
+        
+        return self.historico_compartilhado.snapshot()
     
     def carregar_dados(self):
         """
         Carrega os dados históricos da Lotofácil
         
         Returns:
-            pandas.DataFrame: DataFrame com os dados históricos
+            LotofacilDrawStore: Histórico de sorteios em máscaras de bits
         """
         try:
             logger.info("Carregando dados históricos...")
             
+            # Preferir o histórico compartilhado: todos os serviços usam as mesmas páginas
+            historico = self._carregar_compartilhado()
+            if historico is not None:
+                logger.info(f"Dados carregados do histórico compartilhado: {len(historico)} concursos")
+                return historico
+            
             # Verificar se o arquivo existe
-            if not os.path.exists(self.data_path):
+            if not os.path.exists(self.store_path) and not os.path.exists(self.data_path):
                 logger.error(f"Arquivo de dados não encontrado: {self.data_path}")
                 return None
             
-            # Carregar dados
-            df = pd.read_csv(self.data_path)
-            
-            # Ordenar por número do concurso
-            df = df.sort_values('concurso')
+            # Carregar histórico binário (reconstruído a partir do CSV se necessário)
+            historico = LotofacilDrawStore.load_or_build(self.store_path, self.data_path)
             
-            logger.info(f"Dados carregados com sucesso: {len(df)} concursos")
+            logger.info(f"Dados carregados com sucesso: {len(historico)} concursos")
             
-            return df
+            return historico
         except Exception as e:
             logger.error(f"Erro ao carregar dados: {str(e)}")
             return None
     
+    def _obter_historico(self, df):
+        """
+        Normaliza o histórico recebido pelos métodos da estratégia
+        
+        Args:
+            df (LotofacilDrawStore or pandas.DataFrame): Histórico fornecido (opcional)
+            
+        Returns:
+            LotofacilDrawStore: Histórico em máscaras de bits
+        """
+        if df is None:
+            return self.carregar_dados()
+        
+        if isinstance(df, pd.DataFrame):
+            return LotofacilDrawStore.from_dataframe(df)
+        
+        return df
+    
     def identificar_dezenas_fora(self, df, num_concursos=10):
         """
         Identifica as dezenas que ficaram fora nos últimos concursos
         
         Args:
-            df (pandas.DataFrame): DataFrame com os dados históricos
+            df (LotofacilDrawStore): Histórico de sorteios
             num_concursos (int): Número de concursos a considerar
             
         Returns:
@@ -85,33 +276,13 @@ class CicloDezenasFora:
         try:
             logger.info(f"Identificando dezenas fora nos últimos {num_concursos} concursos...")
             
-            # Obter os últimos concursos
-            ultimos_concursos = df.tail(num_concursos)
-            
-            # Extrair todas as dezenas sorteadas
-            todas_dezenas = []
-            for dezenas_str in ultimos_concursos['dezenas']:
-                dezenas = [int(d) for d in dezenas_str.split(',')]
-                todas_dezenas.extend(dezenas)
+            historico = self._obter_historico(df)
             
-            # Contar frequência de cada dezena
-            contador = Counter(todas_dezenas)
+            # Contar frequência de cada dezena nos últimos concursos (O(25) com o contador de janelas)
+            contagem = self._obter_contador(historico, num_concursos).counts(num_concursos)
             
-            # Identificar dezenas que ficaram fora ou apareceram menos vezes
-            todas_possiveis = set(range(1, 26))
-            dezenas_sorteadas = set(contador.keys())
-            dezenas_fora = todas_possiveis - dezenas_sorteadas
-            
-            # Criar dicionário com frequências (0 para dezenas que ficaram fora)
-            frequencias = {dezena: 0 for dezena in dezenas_fora}
-            
-            # Adicionar dezenas que apareceram poucas vezes
-            for dezena, freq in contador.items():
-                if freq <= num_concursos // 3:  # Dezenas que apareceram em menos de 1/3 dos concursos
-                    frequencias[dezena] = freq
-            
-            # Ordenar por frequência
-            frequencias = dict(sorted(frequencias.items(), key=lambda x: x[1]))
+            # Dezenas que ficaram fora ou apareceram em menos de 1/3 dos concursos
+            frequencias = selecionar_dezenas_fora(contagem, num_concursos)
             
             logger.info(f"Dezenas fora identificadas: {frequencias}")
             
@@ -125,7 +296,7 @@ class CicloDezenasFora:
         Inicia um novo ciclo de dezenas fora
         
         Args:
-            df (pandas.DataFrame): DataFrame com os dados históricos (opcional)
+            df (LotofacilDrawStore): Histórico de sorteios (opcional)
             
         Returns:
             dict: Informações do ciclo iniciado
@@ -134,15 +305,14 @@ class CicloDezenasFora:
             logger.info("Iniciando novo ciclo de dezenas fora...")
             
             # Carregar dados se não fornecidos
-            if df is None:
-                df = self.carregar_dados()
-                
-                if df is None:
-                    logger.error("Falha ao carregar dados. Ciclo não iniciado.")
-                    return None
+            historico = self._obter_historico(df)
+            
+            if historico is None:
+                logger.error("Falha ao carregar dados. Ciclo não iniciado.")
+                return None
             
             # Identificar dezenas fora
-            frequencias = self.identificar_dezenas_fora(df, num_concursos=10)
+            frequencias = self.identificar_dezenas_fora(historico, num_concursos=self.num_concursos)
             
             if frequencias is None:
                 logger.error("Falha ao identificar dezenas fora. Ciclo não iniciado.")
@@ -151,36 +321,62 @@ class CicloDezenasFora:
             # Selecionar as 10 dezenas com menor frequência
             dezenas_ciclo = list(frequencias.keys())[:self.num_dezenas_ciclo]
             
-            # Criar ciclo
-            ciclo = {
-                'id': datetime.now().strftime('%Y%m%d%H%M%S'),
-                'data_inicio': datetime.now().isoformat(),
-                'concurso_inicio': int(df['concurso'].max()),
-                'dezenas': dezenas_ciclo,
-                'dezenas_sorteadas': [],
-                'concursos': [],
-                'status': 'ativo',
-                'data_fechamento': None,
-                'concurso_fechamento': None
-            }
-            
-            # Salvar ciclo
-            self.ciclo_atual = ciclo
-            self.salvar_ciclos()
-            
-            logger.info(f"Novo ciclo iniciado: {ciclo}")
-            
-            return ciclo
+            return self._abrir_ciclo(dezenas_ciclo, historico.last_concurso)
         except Exception as e:
             logger.error(f"Erro ao iniciar ciclo: {str(e)}")
             return None
     
-    def atualizar_ciclo(self, df=None):
+    def _abrir_ciclo(self, dezenas_ciclo, concurso_inicio):
+        """
+        Cria e registra um ciclo, que passa a ser o ciclo atual
+        
+        Args:
+            dezenas_ciclo (list): Dezenas do ciclo
+            concurso_inicio (int): Concurso a partir do qual o ciclo é acompanhado
+            
+        Returns:
+            dict: Ciclo criado
+        """
+        # Id pela data; um ciclo aberto no mesmo segundo em que outro fechou recebe um sufixo
+        repositorio = self._obter_repositorio()
+        id_ciclo = datetime.now().strftime('%Y%m%d%H%M%S')
+        if repositorio.obter(id_ciclo) is not None:
+            id_ciclo = f"{id_ciclo}-{len(repositorio)}"
+        
+        # Criar ciclo
+        ciclo = {
+            'id': id_ciclo,
+            'data_inicio': datetime.now().isoformat(),
+            'concurso_inicio': concurso_inicio,
+            'dezenas': dezenas_ciclo,
+            'dezenas_sorteadas': [],
+            'concursos': [],
+            'ultimo_concurso': concurso_inicio,
+            'status': 'ativo',
+            'data_fechamento': None,
+            'concurso_fechamento': None
+        }
+        
+        # Registrar ciclo (evento de abertura no log de ciclos)
+        self.ciclo_atual = repositorio.abrir(ciclo)
+        
+        logger.info(f"Novo ciclo iniciado: {ciclo}")
+        
+        return ciclo
+    
+    def atualizar_ciclo(self, df=None, detalhar=True):
         """
         Atualiza o ciclo atual com os novos sorteios
         
+        Todos os concursos novos são aplicados em uma única passada sobre as máscaras
+        de bits (ver varrer_ciclo). Quando um ciclo fecha, o ciclo seguinte é aberto
+        no concurso de fechamento, com as dezenas fora dos num_concursos concursos até ele, e
+        recebe os concursos restantes na mesma passada.
+        
         Args:
-            df (pandas.DataFrame): DataFrame com os dados históricos (opcional)
+            df (LotofacilDrawStore): Histórico de sorteios (opcional)
+            detalhar (bool): Registrar cada concurso no ciclo (dezenas e dezenas do ciclo
+                sorteadas nele); se False, apenas as dezenas sorteadas e os fechamentos
             
         Returns:
             dict: Informações do ciclo atualizado
@@ -197,59 +393,68 @@ class CicloDezenasFora:
                     return self.iniciar_ciclo(df)
             
             # Carregar dados se não fornecidos
-            if df is None:
-                df = self.carregar_dados()
-                
-                if df is None:
-                    logger.error("Falha ao carregar dados. Ciclo não atualizado.")
-                    return None
+            historico = self._obter_historico(df)
+            
+            if historico is None:
+                logger.error("Falha ao carregar dados. Ciclo não atualizado.")
+                return None
+            
+            # Ciclo já atualizado com esta versão do histórico
+            self.versao_dados = dataset_version(historico)
+            if self.versions.is_current('ciclo', self.versao_dados, {'ciclo': self.ciclo_atual['id']}):
+                logger.info(f"Ciclo já atualizado com a versão {self.versao_dados} do histórico.")
+                return self.ciclo_atual
             
-            # Obter concursos após o início do ciclo
-            concurso_inicio = self.ciclo_atual['concurso_inicio']
-            novos_concursos = df[df['concurso'] > concurso_inicio]
+            # Obter concursos após o último concurso aplicado ao ciclo (ciclos gravados sem
+            # ultimo_concurso retomam pela lista de concursos)
+            concurso_inicio = self.ciclo_atual.get('ultimo_concurso')
+            if concurso_inicio is None:
+                concursos = self.ciclo_atual['concursos']
+                concurso_inicio = concursos[-1]['concurso'] if concursos else self.ciclo_atual['concurso_inicio']
+            inicio = int(np.searchsorted(historico.concursos, concurso_inicio, side='right'))
             
-            if len(novos_concursos) == 0:
+            if inicio >= len(historico):
                 logger.info("Nenhum novo concurso encontrado. Ciclo não atualizado.")
+                self.versions.mark('ciclo', self.versao_dados, {'ciclo': self.ciclo_atual['id']})
                 return self.ciclo_atual
             
-            # Atualizar ciclo com novos concursos
-            for _, concurso in novos_concursos.iterrows():
-                concurso_num = int(concurso['concurso'])
-                dezenas = [int(d) for d in concurso['dezenas'].split(',')]
+            # Atualizar ciclos com novos concursos
+            repositorio = self._obter_repositorio()
+            pos = inicio
+            while pos < len(historico):
+                ciclo = self.ciclo_atual
+                mascara_sorteadas = dezenas_to_mask(ciclo['dezenas_sorteadas'])
                 
-                # Verificar se alguma dezena do ciclo foi sorteada
-                dezenas_sorteadas = []
-                for dezena in self.ciclo_atual['dezenas']:
-                    if dezena in dezenas and dezena not in self.ciclo_atual['dezenas_sorteadas']:
-                        dezenas_sorteadas.append(dezena)
+                # Ciclos com menos de num_dezenas_ciclo dezenas não fecham
+                fechamento, sorteadas, acertos = varrer_ciclo(
+                    dezenas_to_mask(ciclo['dezenas']), mascara_sorteadas, historico.masks[pos:],
+                    fecha=len(ciclo['dezenas']) == self.num_dezenas_ciclo, detalhar=detalhar
+                )
+                fim = pos + fechamento + 1 if fechamento is not None else len(historico)
                 
-                # Adicionar concurso ao ciclo
-                self.ciclo_atual['concursos'].append({
-                    'concurso': concurso_num,
-                    'data': concurso['data'],
-                    'dezenas': dezenas,
-                    'dezenas_ciclo_sorteadas': dezenas_sorteadas
-                })
+                # Registrar concursos e dezenas sorteadas (eventos no log de ciclos)
+                if detalhar:
+                    self._registrar_concursos(ciclo['id'], historico, pos, acertos)
+                elif sorteadas != mascara_sorteadas:
+                    repositorio.registrar_acertos(ciclo['id'], mask_to_dezenas(sorteadas & ~mascara_sorteadas))
                 
-                # Atualizar dezenas sorteadas
-                self.ciclo_atual['dezenas_sorteadas'].extend(dezenas_sorteadas)
-                self.ciclo_atual['dezenas_sorteadas'] = sorted(list(set(self.ciclo_atual['dezenas_sorteadas'])))
+                # Ponto de retomada da próxima atualização, com ou sem detalhamento
+                concurso_num = int(historico.concursos[fim - 1])
+                repositorio.registrar_avanco(ciclo['id'], concurso_num)
                 
-                # Verificar se o ciclo foi fechado
-                if len(self.ciclo_atual['dezenas_sorteadas']) == self.num_dezenas_ciclo:
-                    self.ciclo_atual['status'] = 'fechado'
-                    self.ciclo_atual['data_fechamento'] = datetime.now().isoformat()
-                    self.ciclo_atual['concurso_fechamento'] = concurso_num
-                    
-                    logger.info(f"Ciclo fechado no concurso {concurso_num}")
-                    
-                    # Iniciar novo ciclo
-                    self.salvar_ciclos()
-                    self.ciclo_atual = None
-                    return self.iniciar_ciclo(df)
+                if fechamento is None:
+                    break
+                
+                repositorio.fechar_ciclo(ciclo['id'], concurso_num, datetime.now().isoformat())
+                logger.info(f"Ciclo fechado no concurso {concurso_num}")
+                
+                # Abrir o ciclo seguinte com as dezenas fora dos últimos concursos até o fechamento
+                contagem = masks_to_matrix(historico.masks[max(0, fim - self.num_concursos):fim]).sum(axis=0)
+                dezenas_ciclo = list(selecionar_dezenas_fora(contagem, self.num_concursos).keys())[:self.num_dezenas_ciclo]
+                self._abrir_ciclo(dezenas_ciclo, concurso_num)
+                pos = fim
             
-            # Salvar ciclo atualizado
-            self.salvar_ciclos()
+            self.versions.mark('ciclo', self.versao_dados, {'ciclo': self.ciclo_atual['id']})
             
             logger.info(f"Ciclo atualizado: {self.ciclo_atual}")
             
@@ -258,6 +463,28 @@ class CicloDezenasFora:
             logger.error(f"Erro ao atualizar ciclo: {str(e)}")
             return None
     
+    def _registrar_concursos(self, id_ciclo, historico, inicio, acertos):
+        """
+        Registra no ciclo os concursos aplicados por varrer_ciclo
+        
+        Args:
+            id_ciclo (str): Id do ciclo
+            historico (LotofacilDrawStore): Histórico de sorteios
+            inicio (int): Posição do primeiro concurso aplicado
+            acertos (numpy.ndarray): Máscaras das dezenas do ciclo sorteadas pela primeira vez em cada concurso
+        """
+        repositorio = self._obter_repositorio()
+        fim = inicio + len(acertos)
+        dezenas = np.nonzero(masks_to_matrix(historico.masks[inicio:fim]))[1].reshape(len(acertos), -1) + 1
+        
+        for i, (linha, acerto) in enumerate(zip(dezenas.tolist(), acertos.tolist())):
+            repositorio.aplicar_concurso(id_ciclo, {
+                'concurso': int(historico.concursos[inicio + i]),
+                'data': historico.data_str(inicio + i),
+                'dezenas': linha,
+                'dezenas_ciclo_sorteadas': mask_to_dezenas(acerto) if acerto else []
+            })
+    
     def carregar_ciclos(self):
         """
         Carrega os ciclos salvos
@@ -266,73 +493,47 @@ class CicloDezenasFora:
             list: Lista de ciclos
         """
         try:
-            logger.info("Carregando ciclos salvos...")
-            
-            # Verificar se o arquivo existe
-            if not os.path.exists(self.ciclos_path):
-                logger.warning(f"Arquivo de ciclos não encontrado: {self.ciclos_path}")
-                return []
-            
-            # Carregar ciclos
-            with open(self.ciclos_path, 'r', encoding='utf-8') as f:
-                ciclos = json.load(f)
+            # O arquivo é lido apenas na primeira chamada; depois os ciclos vêm da memória
+            repositorio = self._obter_repositorio()
             
             # Identificar ciclo ativo
-            for ciclo in ciclos:
-                if ciclo['status'] == 'ativo':
-                    self.ciclo_atual = ciclo
-                    break
-            
-            logger.info(f"Ciclos carregados: {len(ciclos)}")
+            ativo = repositorio.ativo()
+            if ativo is not None:
+                self.ciclo_atual = ativo
             
-            return ciclos
+            return repositorio.listar()
         except Exception as e:
             logger.error(f"Erro ao carregar ciclos: {str(e)}")
             return []
     
     def salvar_ciclos(self):
         """
-        Salva os ciclos
+        Salva o ciclo atual por inteiro
+        
+        Registra o ciclo atual como um evento de substituição no log de ciclos, para
+        alterações feitas diretamente em self.ciclo_atual; a abertura, os concursos e
+        o fechamento já são registrados por iniciar_ciclo e atualizar_ciclo.
         
         Returns:
             bool: True se os ciclos foram salvos com sucesso, False caso contrário
         """
         try:
-            logger.info("Salvando ciclos...")
-            
-            # Carregar ciclos existentes
-            ciclos = self.carregar_ciclos()
-            
-            # Verificar se o ciclo atual já existe
             if self.ciclo_atual is not None:
-                ciclo_existente = False
-                
-                for i, ciclo in enumerate(ciclos):
-                    if ciclo['id'] == self.ciclo_atual['id']:
-                        ciclos[i] = self.ciclo_atual
-                        ciclo_existente = True
-                        break
-                
-                if not ciclo_existente:
-                    ciclos.append(self.ciclo_atual)
-            
-            # Salvar ciclos
-            with open(self.ciclos_path, 'w', encoding='utf-8') as f:
-                json.dump(ciclos, f, ensure_ascii=False, indent=4)
-            
-            logger.info(f"Ciclos salvos: {len(ciclos)}")
+                self._obter_repositorio().salvar(self.ciclo_atual)
             
             return True
         except Exception as e:
             logger.error(f"Erro ao salvar ciclos: {str(e)}")
             return False
     
-    def gerar_jogos(self, num_jogos=5):
+    def gerar_jogos(self, num_jogos=5, evitar_repetidos=True, tentativas=20):
         """
         Gera jogos com base no ciclo atual
         
         Args:
             num_jogos (int): Número de jogos a serem gerados
+            evitar_repetidos (bool): Descartar jogos com 14 ou 15 acertos em algum concurso passado
+            tentativas (int): Número máximo de sorteios por jogo ao evitar repetições
             
         Returns:
             list: Lista de jogos gerados
@@ -346,45 +547,54 @@ class CicloDezenasFora:
                 
                 if self.ciclo_atual is None:
                     logger.warning("Nenhum ciclo ativo encontrado. Iniciando novo ciclo...")
-                    df = self.carregar_dados()
-                    self.iniciar_ciclo(df)
+                    historico = self.carregar_dados()
+                    self.iniciar_ciclo(historico)
             
             # Obter dezenas que ainda não foram sorteadas
             dezenas_pendentes = [d for d in self.ciclo_atual['dezenas'] if d not in self.ciclo_atual['dezenas_sorteadas']]
             
             # Carregar dados
-            df = self.carregar_dados()
+            historico = self.carregar_dados()
             
-            if df is None:
+            if historico is None or len(historico) == 0:
                 logger.error("Falha ao carregar dados. Jogos não gerados.")
                 return None
             
             # Obter último concurso
-            ultimo_concurso = df.iloc[-1]
-            dezenas_ultimo = [int(d) for d in ultimo_concurso['dezenas'].split(',')]
+            dezenas_ultimo = mask_to_dezenas(historico.masks[-1])
+            
+            # Índice de repetições (consulta sem varrer o histórico a cada jogo)
+            indice = self._obter_indice_repeticoes(historico) if evitar_repetidos else None
             
             # Gerar jogos
             jogos = []
             
             for _ in range(num_jogos):
-                # Incluir dezenas pendentes do ciclo
-                jogo = dezenas_pendentes.copy()
-                
-                # Completar com dezenas aleatórias que não estão no ciclo
-                dezenas_disponiveis = [d for d in range(1, 26) if d not in self.ciclo_atual['dezenas']]
-                
-                # Priorizar dezenas que apareceram no último concurso
-                for d in dezenas_ultimo:
-                    if d in dezenas_disponiveis and len(jogo) < 15:
-                        jogo.append(d)
-                        dezenas_disponiveis.remove(d)
-                
-                # Completar com dezenas aleatórias
-                np.random.shuffle(dezenas_disponiveis)
-                jogo.extend(dezenas_disponiveis[:15 - len(jogo)])
-                
-                # Ordenar jogo
-                jogo.sort()
+                for _ in range(max(1, tentativas)):
+                    # Incluir dezenas pendentes do ciclo
+                    jogo = dezenas_pendentes.copy()
+                    
+                    # Completar com dezenas aleatórias que não estão no ciclo
+                    dezenas_disponiveis = [d for d in range(1, 26) if d not in self.ciclo_atual['dezenas']]
+                    
+                    # Priorizar dezenas que apareceram no último concurso
+                    for d in dezenas_ultimo:
+                        if d in dezenas_disponiveis and len(jogo) < 15:
+                            jogo.append(d)
+                            dezenas_disponiveis.remove(d)
+                    
+                    # Completar com dezenas aleatórias
+                    np.random.shuffle(dezenas_disponiveis)
+                    jogo.extend(dezenas_disponiveis[:15 - len(jogo)])
+                    
+                    # Ordenar jogo
+                    jogo.sort()
+                    
+                    # Aceitar o jogo se ele não repetir (nem quase repetir) um concurso passado
+                    if indice is None or not indice.is_repeat(dezenas_to_mask(jogo)):
+                        break
+                else:
+                    logger.warning(f"Jogo {jogo} repete um concurso passado após {tentativas} tentativas")
                 
                 jogos.append(jogo)
             
@@ -395,6 +605,98 @@ class CicloDezenasFora:
             logger.error(f"Erro ao gerar jogos: {str(e)}")
             return None
     
+    def gerar_jogos_lote(self, num_jogos, seed=None, deduplicar=True, evitar_repetidos=True, df=None, tentativas=20):
+        """
+        Gera um lote de jogos com base no ciclo atual, todos de uma vez
+        
+        Aplica as mesmas regras de gerar_jogos (dezenas pendentes do ciclo, prioridade
+        para as dezenas do último concurso fora do ciclo e complemento aleatório com as
+        demais dezenas fora do ciclo), mas sorteia o complemento de todos os jogos em
+        uma única operação vetorizada sobre máscaras de bits.
+        
+        Args:
+            num_jogos (int): Número de jogos a serem gerados
+            seed (int): Semente do gerador aleatório (opcional)
+            deduplicar (bool): Descartar jogos repetidos no lote
+            evitar_repetidos (bool): Descartar jogos com 14 ou 15 acertos em algum concurso passado
+            df (LotofacilDrawStore): Histórico de sorteios (opcional)
+            tentativas (int): Número máximo de lotes sorteados para completar os jogos descartados
+            
+        Returns:
+            numpy.ndarray: Jogos (num_jogos x 15, dezenas em ordem crescente); com deduplicação,
+                no máximo um jogo por complemento possível
+        """
+        try:
+            logger.info(f"Gerando lote de {num_jogos} jogos com base no ciclo atual...")
+            
+            historico = self._obter_historico(df)
+            
+            if historico is None or len(historico) == 0:
+                logger.error("Falha ao carregar dados. Jogos não gerados.")
+                return None
+            
+            # Verificar se existe um ciclo ativo
+            if self.ciclo_atual is None:
+                self.carregar_ciclos()
+                
+                if self.ciclo_atual is None:
+                    logger.warning("Nenhum ciclo ativo encontrado. Iniciando novo ciclo...")
+                    self.iniciar_ciclo(historico)
+            
+            # Parte fixa: dezenas pendentes do ciclo e dezenas do último concurso fora do ciclo
+            mascara_ciclo = dezenas_to_mask(self.ciclo_atual['dezenas'])
+            fixas = [d for d in self.ciclo_atual['dezenas'] if d not in self.ciclo_atual['dezenas_sorteadas']]
+            ultimo = [d for d in mask_to_dezenas(historico.masks[-1]) if not (mascara_ciclo >> (d - 1)) & 1]
+            fixas += ultimo[:max(0, DEZENAS_POR_SORTEIO - len(fixas))]
+            mascara_fixas = np.uint32(dezenas_to_mask(fixas))
+            
+            # Complemento sorteado entre as demais dezenas fora do ciclo
+            bits = BITS_DEZENAS[[i for i in range(NUM_DEZENAS) if not ((mascara_ciclo | int(mascara_fixas)) >> i) & 1]]
+            faltam = min(DEZENAS_POR_SORTEIO - len(fixas), len(bits))
+            
+            rng = np.random.default_rng(seed)
+            indice = self._obter_indice_repeticoes(historico) if evitar_repetidos else None
+            mascaras = np.zeros(0, dtype=np.uint32)
+            
+            # Com deduplicação, o lote é limitado pelo número de complementos distintos
+            alvo = min(num_jogos, math.comb(len(bits), faltam)) if deduplicar else num_jogos
+            
+            for _ in range(max(1, tentativas)):
+                restantes = alvo - len(mascaras)
+                if restantes <= 0:
+                    break
+                
+                # Sorteios extras compensam os jogos descartados
+                lote = restantes if not deduplicar and indice is None else restantes + restantes // 4 + 16
+                
+                # As faltam menores chaves aleatórias de cada linha escolhem as dezenas do complemento
+                if faltam > 0:
+                    escolhidas = np.argpartition(rng.random((lote, len(bits))), faltam - 1, axis=1)[:, :faltam]
+                else:
+                    escolhidas = np.zeros((lote, 0), dtype=np.intp)
+                novas = mascara_fixas | np.bitwise_or.reduce(bits[escolhidas], axis=1)
+                
+                if indice is not None:
+                    novas = novas[indice.filter_new(novas)]
+                
+                mascaras = np.concatenate([mascaras, novas])
+                if deduplicar:
+                    _, primeiras = np.unique(mascaras, return_index=True)
+                    mascaras = mascaras[np.sort(primeiras)]
+            
+            mascaras = mascaras[:num_jogos]
+            if len(mascaras) < num_jogos:
+                logger.warning(f"Apenas {len(mascaras)} de {num_jogos} jogos distintos gerados")
+            
+            jogos = np.nonzero(masks_to_matrix(mascaras))[1].reshape(len(mascaras), DEZENAS_POR_SORTEIO) + 1
+            
+            logger.info(f"Lote de {len(jogos)} jogos gerado")
+            
+            return jogos.astype(np.uint8)
+        except Exception as e:
+            logger.error(f"Erro ao gerar lote de jogos: {str(e)}")
+            return None
+    
     def analisar_ciclo_atual(self):
         """
         Analisa o ciclo atual
@@ -411,8 +713,8 @@ class CicloDezenasFora:
                 
                 if self.ciclo_atual is None:
                     logger.warning("Nenhum ciclo ativo encontrado. Iniciando novo ciclo...")
-                    df = self.carregar_dados()
-                    self.iniciar_ciclo(df)
+                    historico = self.carregar_dados()
+                    self.iniciar_ciclo(historico)
             
             # Calcular estatísticas do ciclo
             dezenas_sorteadas = self.ciclo_atual['dezenas_sorteadas']
@@ -482,8 +784,15 @@ class CicloDezenasFora:
                 
                 if self.ciclo_atual is None:
                     logger.warning("Nenhum ciclo ativo encontrado. Iniciando novo ciclo...")
-                    df = self.carregar_dados()
-                    self.iniciar_ciclo(df)
+                    historico = self.carregar_dados()
+                    self.iniciar_ciclo(historico)
+            
+            # Gráfico já gerado para este estado do ciclo
+            plot_path = '/home/ubuntu/lotofacil/static/images/plots/ciclo_dezenas.png'
+            params = {'ciclo': self.ciclo_atual['id'], 'dezenas_sorteadas': self.ciclo_atual['dezenas_sorteadas']}
+            if os.path.exists(plot_path) and self.versions.is_current('plot', self.versao_dados, params):
+                logger.info(f"Gráfico do ciclo reaproveitado: {plot_path}")
+                return plot_path
             
             # Criar figura
             plt.figure(figsize=(12, 8))
@@ -541,9 +850,9 @@ class CicloDezenasFora:
             
             # Salvar figura
             plt.tight_layout()
-            plot_path = '/home/ubuntu/lotofacil/static/images/plots/ciclo_dezenas.png'
             plt.savefig(plot_path)
             plt.close()
+            self.versions.mark('plot', self.versao_dados, params)
             
             logger.info(f"Ciclo plotado e salvo em {plot_path}")
             
@@ -563,14 +872,14 @@ class CicloDezenasFora:
             logger.info("Iniciando pipeline completo...")
             
             # Carregar dados
-            df = self.carregar_dados()
+            historico = self.carregar_dados()
             
-            if df is None:
+            if historico is None:
                 logger.error("Falha ao carregar dados. Pipeline interrompido.")
                 return None
             
             # Atualizar ciclo
-            ciclo = self.atualizar_ciclo(df)
+            ciclo = self.atualizar_ciclo(historico)
             
             if ciclo is None:
                 logger.error("Falha ao atualizar ciclo. Pipeline interrompido.")
@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Repositório em memória dos ciclos de dezenas fora
+
+Os ciclos ficam em memória, indexados por id e por status, e são persistidos
+como um log de eventos somente de acréscimo (ciclo aberto, concurso aplicado,
+dezenas do ciclo sorteadas, último concurso aplicado, ciclo fechado) mais um
+snapshot periódico:
+
+- o snapshot é o arquivo JSON de ciclos (lista de ciclos, como antes);
+- cada alteração acrescenta uma linha JSON ao log; alterações próximas são
+  agrupadas em uma única escrita (debounce), feita em segundo plano;
+- quando o log passa de LIMITE_EVENTOS linhas, o estado é compactado: o
+  snapshot é regravado de forma atômica (arquivo temporário + renomeação) e o
+  log é esvaziado. Só os ciclos alterados desde o último snapshot são
+  serializados de novo.
+
+Na leitura, o estado é o snapshot mais a reaplicação do log. Os eventos são
+idempotentes, então uma queda entre a gravação do snapshot e o esvaziamento do
+log não duplica nada, e uma última linha incompleta (queda no meio de uma
+escrita) é descartada.
+"""
+
+import os
+import json
+import atexit
+import logging
+import threading
+import time
+
+logger = logging.getLogger('ciclo_repositorio')
+
+# Espera após a última alteração antes de gravar (segundos)
+ATRASO_GRAVACAO = 1.0
+
+# Espera máxima desde a primeira alteração pendente (segundos)
+ATRASO_MAXIMO = 5.0
+
+# Número de eventos no log a partir do qual o snapshot é regravado
+LIMITE_EVENTOS = 500
+
+
+def aplicar_evento(ciclos, evento):
+    """
+    Aplica um evento ao estado dos ciclos (idempotente)
+    
+    Args:
+        ciclos (dict): Ciclos por id (alterados no próprio objeto)
+        evento (dict): Evento do log ('tipo' = aberto, concurso, acerto, avanco, fechado ou ciclo)
+    
+    Returns:
+        dict: Ciclo afetado (None se o evento se refere a um ciclo desconhecido)
+    """
+    tipo = evento['tipo']
+    
+    if tipo in ('aberto', 'ciclo'):
+        ciclo = evento['ciclo']
+        if tipo == 'aberto' and ciclo['id'] in ciclos:
+            return ciclos[ciclo['id']]
+        ciclos[ciclo['id']] = ciclo
+        return ciclo
+    
+    ciclo = ciclos.get(evento['id'])
+    if ciclo is None:
+        logger.warning(f"Evento {tipo} para ciclo desconhecido: {evento['id']}")
+        return None
+    
+    if tipo == 'concurso':
+        # Concurso já presente (evento reaplicado sobre um snapshot mais novo)
+        concursos = ciclo['concursos']
+        if not concursos or concursos[-1]['concurso'] < evento['concurso']['concurso']:
+            concursos.append(evento['concurso'])
+    elif tipo == 'acerto':
+        ciclo['dezenas_sorteadas'] = sorted(set(ciclo['dezenas_sorteadas']) | set(evento['dezenas']))
+    elif tipo == 'avanco':
+        ciclo['ultimo_concurso'] = max(ciclo.get('ultimo_concurso') or 0, evento['concurso'])
+    elif tipo == 'fechado':
+        ciclo['status'] = 'fechado'
+        ciclo['data_fechamento'] = evento['data']
+        ciclo['concurso_fechamento'] = evento['concurso']
+    else:
+        raise ValueError(f"Tipo de evento desconhecido: {tipo}")
+    
+    return ciclo
+
+
+class RepositorioCiclos:
+    """Ciclos indexados por id e status, persistidos em log de eventos com snapshot"""
+    
+    def __init__(self, path, atraso=ATRASO_GRAVACAO, atraso_maximo=ATRASO_MAXIMO, limite_eventos=LIMITE_EVENTOS):
+        """
+        Inicializa o repositório (os arquivos são lidos na primeira consulta)
+        
+        Args:
+            path (str): Caminho do snapshot (arquivo JSON de ciclos)
+            atraso (float): Espera após a última alteração antes de gravar (0 = gravar na hora)
+            atraso_maximo (float): Espera máxima desde a primeira alteração pendente
+            limite_eventos (int): Eventos no log a partir dos quais o snapshot é regravado
+        """
+        self.path = path
+        self.log_path = f"{os.path.splitext(path)[0]}_eventos.jsonl"
+        self.atraso = atraso
+        self.atraso_maximo = atraso_maximo
+        self.limite_eventos = limite_eventos
+        
+        self._ciclos = {}
+        self._por_status = {}
+        self._status = {}
+        self._carregado = False
+        
+        # Texto de cada ciclo no último snapshot e ciclos alterados desde então
+        self._serializados = {}
+        self._alterados = set()
+        
+        # Eventos ainda não gravados (já serializados) e número de eventos no log
+        self._pendentes = []
+        self._eventos_log = 0
+        
+        self._lock = threading.RLock()
+        self._timer = None
+        self._prazo = None
+        self._ultima_alteracao = None
+        
+        atexit.register(self.fechar)
+    
+    def _indexar(self, ciclo):
+        """Atualiza o índice por status de um ciclo (o ciclo pode ter sido alterado no próprio objeto)"""
+        anterior = self._status.get(ciclo['id'])
+        if anterior is not None and anterior != ciclo['status']:
+            self._por_status[anterior].pop(ciclo['id'], None)
+        self._por_status.setdefault(ciclo['status'], {})[ciclo['id']] = None
+        self._status[ciclo['id']] = ciclo['status']
+    
+    def _ler_log(self):
+        """Lê os eventos do log, descartando uma última linha incompleta"""
+        with open(self.log_path, 'rb') as f:
+            conteudo = f.read()
+        
+        # Linha final sem quebra: escrita interrompida; o log é cortado no último evento completo
+        completo = conteudo.rfind(b'\n') + 1
+        if completo < len(conteudo):
+            logger.warning(f"Última linha incompleta descartada do log de ciclos: {self.log_path}")
+            with open(self.log_path, 'r+b') as f:
+                f.truncate(completo)
+        
+        eventos = []
+        for numero, linha in enumerate(conteudo[:completo].splitlines(), 1):
+            if not linha.strip():
+                continue
+            try:
+                eventos.append(json.loads(linha))
+            except ValueError:
+                logger.warning(f"Evento inválido na linha {numero} do log de ciclos ignorado")
+        return eventos
+    
+    def carregar(self):
+        """
+        Lê o snapshot e reaplica o log, apenas na primeira chamada
+        
+        Returns:
+            int: Número de ciclos em memória
+        """
+        with self._lock:
+            if self._carregado:
+                return len(self._ciclos)
+            
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    for ciclo in json.load(f):
+                        self._ciclos[ciclo['id']] = ciclo
+                        self._serializados[ciclo['id']] = json.dumps(ciclo, ensure_ascii=False)
+            elif not os.path.exists(self.log_path):
+                logger.warning(f"Arquivo de ciclos não encontrado: {self.path}")
+            
+            if os.path.exists(self.log_path):
+                eventos = self._ler_log()
+                for evento in eventos:
+                    ciclo = aplicar_evento(self._ciclos, evento)
+                    if ciclo is not None:
+                        self._alterados.add(ciclo['id'])
+                self._eventos_log = len(eventos)
+            
+            for ciclo in self._ciclos.values():
+                self._indexar(ciclo)
+            
+            logger.info(f"Ciclos carregados: {len(self._ciclos)} ({self._eventos_log} eventos no log)")
+            self._carregado = True
+            return len(self._ciclos)
+    
+    def __len__(self):
+        return self.carregar()
+    
+    def obter(self, id_ciclo):
+        """
+        Obtém um ciclo pelo id
+        
+        Args:
+            id_ciclo (str): Id do ciclo
+        
+        Returns:
+            dict: Ciclo ou None se não existir
+        """
+        self.carregar()
+        return self._ciclos.get(id_ciclo)
+    
+    def listar(self, status=None):
+        """
+        Lista os ciclos, na ordem em que foram criados
+        
+        Args:
+            status (str): Filtrar pelo status ('ativo' ou 'fechado'; None para todos)
+        
+        Returns:
+            list: Ciclos
+        """
+        self.carregar()
+        with self._lock:
+            if status is None:
+                return list(self._ciclos.values())
+            return [self._ciclos[id_ciclo] for id_ciclo in self._por_status.get(status, {})]
+    
+    def ativo(self):
+        """
+        Obtém o ciclo ativo
+        
+        Returns:
+            dict: Primeiro ciclo com status 'ativo' ou None
+        """
+        self.carregar()
+        with self._lock:
+            id_ciclo = next(iter(self._por_status.get('ativo', {})), None)
+            return self._ciclos[id_ciclo] if id_ciclo is not None else None
+    
+    def _registrar(self, evento):
+        """Aplica um evento em memória e o coloca na fila de gravação"""
+        self.carregar()
+        with self._lock:
+            ciclo = aplicar_evento(self._ciclos, evento)
+            if ciclo is None:
+                raise ValueError(f"Ciclo não encontrado: {evento['id']}")
+            self._indexar(ciclo)
+            self._alterados.add(ciclo['id'])
+            self._pendentes.append(json.dumps(evento, ensure_ascii=False))
+            self._agendar()
+            return ciclo
+    
+    def abrir(self, ciclo):
+        """
+        Registra um novo ciclo
+        
+        Args:
+            ciclo (dict): Ciclo aberto (mantido em memória; alterações seguintes passam pelo repositório)
+        
+        Returns:
+            dict: Ciclo registrado
+        """
+        return self._registrar({'tipo': 'aberto', 'ciclo': ciclo})
+    
+    def aplicar_concurso(self, id_ciclo, concurso):
+        """
+        Acrescenta um concurso a um ciclo e marca as dezenas do ciclo sorteadas nele
+        
+        Args:
+            id_ciclo (str): Id do ciclo
+            concurso (dict): Concurso (concurso, data, dezenas, dezenas_ciclo_sorteadas)
+        
+        Returns:
+            dict: Ciclo atualizado
+        """
+        ciclo = self._registrar({'tipo': 'concurso', 'id': id_ciclo, 'concurso': concurso})
+        if concurso['dezenas_ciclo_sorteadas']:
+            ciclo = self.registrar_acertos(id_ciclo, concurso['dezenas_ciclo_sorteadas'])
+        return ciclo
+    
+    def registrar_acertos(self, id_ciclo, dezenas):
+        """
+        Marca dezenas do ciclo como sorteadas
+        
+        Args:
+            id_ciclo (str): Id do ciclo
+            dezenas (list): Dezenas do ciclo sorteadas
+        
+        Returns:
+            dict: Ciclo atualizado
+        """
+        return self._registrar({'tipo': 'acerto', 'id': id_ciclo, 'dezenas': dezenas})
+    
+    def registrar_avanco(self, id_ciclo, concurso):
+        """
+        Registra o último concurso aplicado a um ciclo (ponto de retomada da atualização)
+        
+        Args:
+            id_ciclo (str): Id do ciclo
+            concurso (int): Número do último concurso aplicado
+        
+        Returns:
+            dict: Ciclo atualizado
+        """
+        return self._registrar({'tipo': 'avanco', 'id': id_ciclo, 'concurso': concurso})
+    
+    def fechar_ciclo(self, id_ciclo, concurso, data):
+        """
+        Fecha um ciclo
+        
+        Args:
+            id_ciclo (str): Id do ciclo
+            concurso (int): Concurso em que o ciclo fechou
+            data (str): Data do fechamento (ISO)
+        
+        Returns:
+            dict: Ciclo fechado
+        """
+        return self._registrar({'tipo': 'fechado', 'id': id_ciclo, 'concurso': concurso, 'data': data})
+    
+    def salvar(self, ciclo):
+        """
+        Insere ou substitui um ciclo inteiro (alterações que não correspondem aos eventos acima)
+        
+        Args:
+            ciclo (dict): Ciclo
+        """
+        self._registrar({'tipo': 'ciclo', 'ciclo': ciclo})
+    
+    def _agendar(self):
+        """Agenda a gravação, adiando-a a cada alteração até o prazo máximo"""
+        if self.atraso <= 0:
+            self.gravar()
+            return
+        
+        self._ultima_alteracao = time.monotonic()
+        if self._prazo is None:
+            self._prazo = self._ultima_alteracao + self.atraso_maximo
+        if self._timer is None:
+            self._iniciar_timer(self.atraso)
+    
+    def _iniciar_timer(self, espera):
+        """Inicia o timer de gravação (um único timer, reagendado ao expirar)"""
+        self._timer = threading.Timer(espera, self._expirar)
+        self._timer.daemon = True
+        self._timer.start()
+    
+    def _expirar(self):
+        """Grava se não houve alteração na última espera ou se o prazo máximo passou"""
+        with self._lock:
+            if self._prazo is None:
+                return
+            espera = min(self._ultima_alteracao + self.atraso, self._prazo) - time.monotonic()
+            if espera > 0:
+                self._iniciar_timer(espera)
+                return
+        self.fechar()
+    
+    def gravar(self):
+        """
+        Acrescenta os eventos pendentes ao log, compactando-o se passou do limite
+        
+        Returns:
+            bool: True se algum evento foi gravado, False se não havia alterações
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._prazo = None
+            
+            if not self._pendentes:
+                return False
+            
+            os.makedirs(os.path.dirname(self.log_path) or '.', exist_ok=True)
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(''.join(evento + '\n' for evento in self._pendentes))
+            
+            self._eventos_log += len(self._pendentes)
+            self._pendentes.clear()
+            
+            if self._eventos_log >= self.limite_eventos:
+                self.compactar()
+            return True
+    
+    def compactar(self):
+        """Regrava o snapshot com o estado em memória e esvazia o log"""
+        self.carregar()
+        with self._lock:
+            # Eventos ainda não gravados já estão refletidos no snapshot
+            self._pendentes.clear()
+            
+            for id_ciclo in self._alterados:
+                self._serializados[id_ciclo] = json.dumps(self._ciclos[id_ciclo], ensure_ascii=False)
+            
+            # Um ciclo por linha: o snapshot continua sendo uma lista JSON
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write('[\n')
+                f.write(',\n'.join(self._serializados[id_ciclo] for id_ciclo in self._ciclos))
+                f.write('\n]\n')
+            os.replace(tmp_path, self.path)
+            
+            # Reaplicar o log sobre o novo snapshot não altera nada: esvaziá-lo por último é seguro
+            open(self.log_path, 'w').close()
+            
+            logger.info(f"Log de ciclos compactado: {len(self._ciclos)} ciclos ({len(self._alterados)} alterados)")
+            self._alterados.clear()
+            self._eventos_log = 0
+    
+    def fechar(self):
+        """Grava os eventos pendentes e cancela a gravação agendada"""
+        try:
+            self.gravar()
+        except Exception as e:
+            logger.error(f"Erro ao gravar ciclos pendentes: {str(e)}")
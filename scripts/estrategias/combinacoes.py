@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tabela completa das combinações da Lotofácil com motor de filtros vetorizado
+
+As C(25,15) = 3.268.760 combinações possíveis são pré-calculadas uma única vez
+como máscaras de bits uint32, junto com colunas compactas de atributos (pares,
+soma, primos, dezenas da moldura e maior sequência de dezenas consecutivas). As
+colunas são gravadas em arquivos .npy e abertas por memory map, de modo que
+qualquer filtro sobre o espaço inteiro de jogos é uma combinação de máscaras
+booleanas NumPy.
+"""
+
+import os
+import sys
+import json
+import math
+import logging
+import numpy as np
+
+# Importar o armazenamento do histórico em máscaras de bits
+sys.path.append('/home/ubuntu/lotofacil/scripts/ia')
+from draw_store import NUM_DEZENAS, DEZENAS_POR_SORTEIO, MASCARA_PARES, MOLDURA, MASCARA_MOLDURA
+from draw_store import popcount, dezenas_to_mask, mask_to_dezenas
+
+logger = logging.getLogger('combinacoes')
+
+# Número de jogos possíveis
+TOTAL_COMBINACOES = math.comb(NUM_DEZENAS, DEZENAS_POR_SORTEIO)
+
+# Dezenas primas
+PRIMOS = (2, 3, 5, 7, 11, 13, 17, 19, 23)
+MASCARA_PRIMOS = dezenas_to_mask(PRIMOS)
+
+# Colunas de atributos e seus tipos
+COLUNAS = {
+    'pares': np.uint8,
+    'soma': np.uint16,
+    'primos': np.uint8,
+    'moldura': np.uint8,
+    'maior_sequencia': np.uint8
+}
+
+# Diretório padrão da tabela
+COMBINACOES_DIR = '/home/ubuntu/lotofacil/data/estrategias/combinacoes'
+
+
+def gerar_mascaras(lote=1 << 22):
+    """
+    Enumera as máscaras de todas as combinações de 15 dezenas, em ordem crescente
+    
+    Args:
+        lote (int): Quantidade de inteiros de 25 bits examinados por vez
+    
+    Returns:
+        numpy.ndarray: Máscaras uint32 (TOTAL_COMBINACOES elementos)
+    """
+    partes = []
+    for inicio in range(0, 1 << NUM_DEZENAS, lote):
+        valores = np.arange(inicio, min(inicio + lote, 1 << NUM_DEZENAS), dtype=np.uint32)
+        partes.append(valores[popcount(valores) == DEZENAS_POR_SORTEIO])
+    return np.concatenate(partes)
+
+
+def calcular_atributos(mascaras):
+    """
+    Calcula as colunas de atributos de um array de jogos
+    
+    Args:
+        mascaras (numpy.ndarray): Máscaras uint32
+    
+    Returns:
+        dict: Nome da coluna -> array (tipos de COLUNAS)
+    """
+    mascaras = np.asarray(mascaras, dtype=np.uint32)
+    
+    soma = np.zeros(len(mascaras), dtype=np.uint16)
+    for i in range(NUM_DEZENAS):
+        soma += ((mascaras >> np.uint32(i)) & np.uint32(1)).astype(np.uint16) * np.uint16(i + 1)
+    
+    # Maior sequência: quantas vezes m &= m >> 1 até zerar
+    maior_sequencia = np.zeros(len(mascaras), dtype=np.uint8)
+    restante = mascaras.copy()
+    while restante.any():
+        maior_sequencia += restante != 0
+        restante &= restante >> np.uint32(1)
+    
+    return {
+        'pares': popcount(mascaras & np.uint32(MASCARA_PARES)).astype(np.uint8),
+        'soma': soma,
+        'primos': popcount(mascaras & np.uint32(MASCARA_PRIMOS)).astype(np.uint8),
+        'moldura': popcount(mascaras & np.uint32(MASCARA_MOLDURA)).astype(np.uint8),
+        'maior_sequencia': maior_sequencia
+    }
+
+
+def _intervalo(coluna, limites, nome):
+    """
+    Seleciona os elementos de uma coluna dentro de um intervalo
+    
+    Args:
+        coluna (numpy.ndarray): Valores da coluna
+        limites (int or tuple): Valor exato ou (mínimo, máximo), inclusivos; None
+            em uma das pontas deixa o intervalo aberto
+        nome (str): Nome do filtro (para mensagens de erro)
+    
+    Returns:
+        numpy.ndarray: Máscara booleana
+    """
+    if isinstance(limites, (int, np.integer)):
+        return coluna == limites
+    
+    try:
+        minimo, maximo = limites
+    except (TypeError, ValueError):
+        raise ValueError(f"Filtro {nome} inválido: use um número ou (mínimo, máximo)")
+    
+    if minimo is not None and maximo is not None and minimo > maximo:
+        raise ValueError(f"Filtro {nome} inválido: mínimo maior que o máximo")
+    
+    selecao = np.ones(len(coluna), dtype=bool)
+    if minimo is not None:
+        selecao &= coluna >= minimo
+    if maximo is not None:
+        selecao &= coluna <= maximo
+    return selecao
+
+
+def _mascara_dezenas(dezenas):
+    """
+    Converte uma lista de dezenas em máscara, validando cada dezena
+    
+    Args:
+        dezenas (list): Dezenas entre 1 e 25 (int ou str)
+    
+    Returns:
+        int: Máscara de bits das dezenas
+    
+    Raises:
+        ValueError: Se alguma dezena não for um número entre 1 e 25
+    """
+    try:
+        dezenas = [int(d) for d in dezenas]
+    except (TypeError, ValueError):
+        raise ValueError("As dezenas devem estar entre 1 e 25")
+    if any(not 1 <= d <= NUM_DEZENAS for d in dezenas):
+        raise ValueError("As dezenas devem estar entre 1 e 25")
+    return dezenas_to_mask(dezenas)
+
+
+class TabelaCombinacoes:
+    """Classe para a tabela de todas as combinações e o motor de filtros"""
+    
+    VERSAO = 1
+    
+    def __init__(self, diretorio=COMBINACOES_DIR):
+        """
+        Inicializa uma tabela vazia
+        
+        Args:
+            diretorio (str): Diretório dos arquivos .npy da tabela
+        """
+        self.diretorio = diretorio
+        self.masks = None
+        self.colunas = {}
+    
+    def __len__(self):
+        return 0 if self.masks is None else len(self.masks)
+    
+    def _path(self, nome):
+        """Caminho do arquivo de uma coluna"""
+        return os.path.join(self.diretorio, f'{nome}.npy')
+    
+    @classmethod
+    def build(cls, diretorio=COMBINACOES_DIR):
+        """
+        Calcula a tabela completa e a grava em disco
+        
+        Args:
+            diretorio (str): Diretório dos arquivos .npy da tabela
+        
+        Returns:
+            TabelaCombinacoes: Tabela aberta por memory map
+        """
+        logger.info("Calculando a tabela de combinações...")
+        
+        os.makedirs(diretorio, exist_ok=True)
+        tabela = cls(diretorio)
+        
+        mascaras = gerar_mascaras()
+        colunas = dict(calcular_atributos(mascaras), masks=mascaras)
+        
+        # Gravar cada coluna de forma atômica; o arquivo de metadados vem por último
+        for nome, valores in colunas.items():
+            tmp_path = f"{tabela._path(nome)}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.save(f, valores)
+            os.replace(tmp_path, tabela._path(nome))
+        
+        meta_path = os.path.join(diretorio, 'meta.json')
+        with open(f"{meta_path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump({'versao': cls.VERSAO, 'total': len(mascaras), 'colunas': list(COLUNAS)}, f)
+        os.replace(f"{meta_path}.tmp", meta_path)
+        
+        logger.info(f"Tabela de combinações gravada em {diretorio}: {len(mascaras)} jogos")
+        
+        return cls.load(diretorio)
+    
+    @classmethod
+    def load(cls, diretorio=COMBINACOES_DIR):
+        """
+        Abre a tabela gravada por memory map
+        
+        Args:
+            diretorio (str): Diretório dos arquivos .npy da tabela
+        
+        Returns:
+            TabelaCombinacoes: Tabela aberta (somente leitura)
+        
+        Raises:
+            ValueError: Se os arquivos estiverem ausentes ou inconsistentes
+        """
+        tabela = cls(diretorio)
+        
+        meta_path = os.path.join(diretorio, 'meta.json')
+        if not os.path.exists(meta_path):
+            raise ValueError(f"Tabela de combinações não encontrada em {diretorio}")
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('versao') != cls.VERSAO or meta.get('colunas') != list(COLUNAS):
+            raise ValueError("Tabela de combinações em formato antigo")
+        
+        tabela.masks = np.load(tabela._path('masks'), mmap_mode='r')
+        tabela.colunas = {nome: np.load(tabela._path(nome), mmap_mode='r') for nome in COLUNAS}
+        
+        if any(len(coluna) != TOTAL_COMBINACOES for coluna in [tabela.masks, *tabela.colunas.values()]):
+            raise ValueError("Tabela de combinações incompleta")
+        
+        return tabela
+    
+    @classmethod
+    def load_or_build(cls, diretorio=COMBINACOES_DIR):
+        """
+        Abre a tabela, calculando-a se ainda não existir
+        
+        Args:
+            diretorio (str): Diretório dos arquivos .npy da tabela
+        
+        Returns:
+            TabelaCombinacoes: Tabela aberta por memory map
+        """
+        try:
+            return cls.load(diretorio)
+        except (ValueError, OSError) as e:
+            logger.info(f"Tabela de combinações indisponível ({str(e)}). Recalculando...")
+            return cls.build(diretorio)
+    
+    def filtrar(self, fixas=None, excluidas=None, pares=None, soma=None, primos=None, moldura=None,
+                maior_sequencia=None, repetidas=None, ultimo_sorteio=None):
+        """
+        Seleciona os jogos que atendem a todos os filtros informados
+        
+        Os filtros de intervalo aceitam um valor exato ou (mínimo, máximo).
+        
+        Args:
+            fixas (list): Dezenas que devem estar no jogo
+            excluidas (list): Dezenas que não podem estar no jogo
+            pares (int or tuple): Quantidade de dezenas pares
+            soma (int or tuple): Soma das dezenas
+            primos (int or tuple): Quantidade de dezenas primas
+            moldura (int or tuple): Quantidade de dezenas da moldura
+            maior_sequencia (int or tuple): Maior sequência de dezenas consecutivas
+            repetidas (int or tuple): Dezenas repetidas do último sorteio
+            ultimo_sorteio (int or list): Máscara ou dezenas do último sorteio
+                (obrigatório com repetidas)
+        
+        Returns:
+            numpy.ndarray: Máscara booleana sobre a tabela
+        
+        Raises:
+            ValueError: Se os filtros forem inválidos
+        """
+        fixas_mask = _mascara_dezenas(fixas or [])
+        excluidas_mask = _mascara_dezenas(excluidas or [])
+        
+        if fixas_mask & excluidas_mask:
+            raise ValueError("Dezenas fixas e excluídas em comum")
+        if bin(fixas_mask).count('1') > DEZENAS_POR_SORTEIO:
+            raise ValueError("Mais de 15 dezenas fixas")
+        
+        selecao = np.ones(len(self), dtype=bool)
+        
+        if fixas_mask:
+            selecao &= (self.masks & np.uint32(fixas_mask)) == fixas_mask
+        if excluidas_mask:
+            selecao &= (self.masks & np.uint32(excluidas_mask)) == 0
+        
+        for nome, limites in (('pares', pares), ('soma', soma), ('primos', primos),
+                              ('moldura', moldura), ('maior_sequencia', maior_sequencia)):
+            if limites is not None:
+                selecao &= _intervalo(self.colunas[nome], limites, nome)
+        
+        if repetidas is not None:
+            if ultimo_sorteio is None:
+                raise ValueError("O filtro de repetidas exige o último sorteio")
+            if not isinstance(ultimo_sorteio, (int, np.integer)):
+                ultimo_sorteio = _mascara_dezenas(ultimo_sorteio)
+            selecao &= _intervalo(popcount(self.masks & np.uint32(ultimo_sorteio)), repetidas, 'repetidas')
+        
+        return selecao
+    
+    def contar(self, **filtros):
+        """
+        Conta os jogos que atendem aos filtros
+        
+        Args:
+            **filtros: Mesmos argumentos de filtrar
+        
+        Returns:
+            int: Quantidade de jogos
+        """
+        return int(np.count_nonzero(self.filtrar(**filtros)))
+    
+    def jogos(self, selecao, limite=None):
+        """
+        Lista os jogos selecionados, em ordem da tabela
+        
+        Args:
+            selecao (numpy.ndarray): Máscara booleana retornada por filtrar
+            limite (int): Número máximo de jogos
+        
+        Returns:
+            list: Jogos como listas de dezenas
+        """
+        indices = np.flatnonzero(selecao)[:limite]
+        return [mask_to_dezenas(m) for m in self.masks[indices]]
+    
+    def amostrar(self, selecao, quantidade, seed=None):
+        """
+        Sorteia jogos distintos entre os selecionados
+        
+        Args:
+            selecao (numpy.ndarray): Máscara booleana retornada por filtrar
+            quantidade (int): Número de jogos (limitado aos selecionados)
+            seed (int): Semente do gerador aleatório
+        
+        Returns:
+            numpy.ndarray: Máscaras uint32 dos jogos sorteados
+        """
+        indices = np.flatnonzero(selecao)
+        rng = np.random.default_rng(seed)
+        escolhidos = rng.choice(indices, size=min(quantidade, len(indices)), replace=False)
+        return np.asarray(self.masks[np.sort(escolhidos)])
+    
+    def gerar_jogos(self, num_jogos=5, seed=None, **filtros):
+        """
+        Gera jogos aleatórios entre os que atendem aos filtros
+        
+        Args:
+            num_jogos (int): Número de jogos a serem gerados
+            seed (int): Semente do gerador aleatório
+            **filtros: Mesmos argumentos de filtrar
+        
+        Returns:
+            list: Jogos gerados (listas de dezenas)
+        """
+        return [mask_to_dezenas(m) for m in self.amostrar(self.filtrar(**filtros), num_jogos, seed)]
+
+
+if __name__ == "__main__":
+    import time
+    
+    inicio = time.perf_counter()
+    tabela = TabelaCombinacoes.load_or_build()
+    print(f"Tabela com {len(tabela)} jogos aberta em {time.perf_counter() - inicio:.2f} s")
+    
+    inicio = time.perf_counter()
+    total = tabela.contar(fixas=[1, 2], excluidas=[25], pares=(6, 8), soma=(180, 210), maior_sequencia=(None, 5))
+    print(f"{total} jogos atendem ao filtro de exemplo ({(time.perf_counter() - inicio) * 1000:.1f} ms)")
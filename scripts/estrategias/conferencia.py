@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Conferência em massa de jogos contra todo o histórico da Lotofácil
+
+Cada jogo é conferido contra cada sorteio por AND + popcount das máscaras de
+bits. O resultado é, por jogo, o histograma das faixas de premiação (11 a 15
+acertos) ao longo do histórico. A conferência é feita em blocos de jogos para
+manter a matriz de acertos pequena e pode ser distribuída entre processos.
+"""
+
+import os
+import sys
+import logging
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+# Importar o armazenamento do histórico em máscaras de bits
+sys.path.append('/home/ubuntu/lotofacil/scripts/ia')
+from draw_store import NUM_DEZENAS, DEZENAS_POR_SORTEIO, popcount, dezenas_to_mask, mask_to_dezenas
+
+logger = logging.getLogger('conferencia')
+
+# Faixas de premiação (número de acertos)
+FAIXAS = (11, 12, 13, 14, 15)
+MENOR_FAIXA = FAIXAS[0]
+
+# Acima deste número de pares jogo x sorteio, a conferência usa todos os processadores
+PARES_POR_PROCESSO = 50_000_000
+
+# Sorteios do processo trabalhador (enviados uma única vez pelo inicializador do pool)
+_sorteios_worker = None
+
+
+def jogos_to_masks(jogos):
+    """
+    Converte jogos em máscaras de bits
+    
+    Args:
+        jogos (list or numpy.ndarray): Listas de dezenas ou máscaras uint32
+    
+    Returns:
+        numpy.ndarray: Máscaras uint32
+    
+    Raises:
+        ValueError: Se algum jogo tiver dezenas fora do intervalo de 1 a 25
+    """
+    if isinstance(jogos, np.ndarray) and jogos.ndim == 1:
+        return jogos.astype(np.uint32, copy=False)
+    
+    # As dezenas são validadas antes de virar bits (0 ou negativas não cabem na máscara)
+    mascaras = []
+    for jogo in jogos:
+        try:
+            dezenas = [int(d) for d in jogo]
+        except (TypeError, ValueError):
+            raise ValueError("Todos os jogos devem ter 15 dezenas distintas entre 1 e 25")
+        if not all(1 <= d <= NUM_DEZENAS for d in dezenas):
+            raise ValueError("Todos os jogos devem ter 15 dezenas distintas entre 1 e 25")
+        mascaras.append(dezenas_to_mask(dezenas))
+    return np.array(mascaras, dtype=np.uint32)
+
+
+def conferir_bloco(jogos, sorteios, bloco=256):
+    """
+    Calcula o histograma de faixas de premiação de cada jogo
+    
+    Args:
+        jogos (numpy.ndarray): Máscaras uint32 dos jogos
+        sorteios (numpy.ndarray): Máscaras uint32 dos sorteios
+        bloco (int): Jogos conferidos por vez (a matriz de acertos tem bloco x sorteios)
+    
+    Returns:
+        numpy.ndarray: Matriz (n_jogos x 5) com o número de sorteios em cada faixa
+    """
+    jogos = np.asarray(jogos, dtype=np.uint32)
+    sorteios = np.asarray(sorteios, dtype=np.uint32)
+    faixas = len(FAIXAS)
+    resultado = np.zeros((len(jogos), faixas), dtype=np.int64)
+    
+    if len(sorteios) == 0:
+        return resultado
+    
+    for inicio in range(0, len(jogos), bloco):
+        parte = jogos[inicio:inicio + bloco]
+        acertos = popcount(parte[:, None] & sorteios[None, :]).ravel()
+        
+        # Apenas os pares premiados (cerca de 10%) entram na contagem
+        premiados = np.flatnonzero(acertos >= MENOR_FAIXA)
+        codigos = (premiados // len(sorteios)) * faixas + (acertos[premiados].astype(np.intp) - MENOR_FAIXA)
+        resultado[inicio:inicio + len(parte)] = np.bincount(codigos, minlength=len(parte) * faixas).reshape(-1, faixas)
+    
+    return resultado
+
+
+def _iniciar_worker(sorteios):
+    """Guarda os sorteios no processo trabalhador"""
+    global _sorteios_worker
+    _sorteios_worker = sorteios
+
+
+def _conferir_worker(jogos):
+    """Confere uma parte dos jogos no processo trabalhador"""
+    return conferir_bloco(jogos, _sorteios_worker)
+
+
+def conferir(jogos, sorteios, processos=None, lote=65536):
+    """
+    Confere jogos contra sorteios, distribuindo o trabalho entre processos
+    
+    Args:
+        jogos (numpy.ndarray): Máscaras uint32 dos jogos
+        sorteios (numpy.ndarray): Máscaras uint32 dos sorteios
+        processos (int): Número de processos (None: automático pelo volume de trabalho)
+        lote (int): Jogos enviados a cada processo por tarefa
+    
+    Returns:
+        numpy.ndarray: Matriz (n_jogos x 5) com o número de sorteios em cada faixa
+    """
+    jogos = np.asarray(jogos, dtype=np.uint32)
+    sorteios = np.ascontiguousarray(sorteios, dtype=np.uint32)
+    
+    if processos is None:
+        processos = (os.cpu_count() or 1) if len(jogos) * len(sorteios) > PARES_POR_PROCESSO else 1
+    processos = min(processos, -(-len(jogos) // lote))
+    
+    if processos <= 1:
+        return conferir_bloco(jogos, sorteios)
+    
+    logger.info(f"Conferindo {len(jogos)} jogos contra {len(sorteios)} sorteios em {processos} processos")
+    
+    partes = [jogos[i:i + lote] for i in range(0, len(jogos), lote)]
+    with ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_worker, initargs=(sorteios,)) as executor:
+        return np.concatenate(list(executor.map(_conferir_worker, partes)))
+
+
+class ConferenciaJogos:
+    """Classe para conferência de jogos contra o histórico"""
+    
+    def __init__(self, historico):
+        """
+        Inicializa a conferência
+        
+        Args:
+            historico (LotofacilDrawStore): Histórico de sorteios
+        """
+        self.historico = historico
+    
+    def conferir(self, jogos, processos=None):
+        """
+        Calcula o histograma de faixas de cada jogo ao longo do histórico
+        
+        Args:
+            jogos (list or numpy.ndarray): Listas de dezenas ou máscaras uint32
+            processos (int): Número de processos (None: automático)
+        
+        Returns:
+            numpy.ndarray: Matriz (n_jogos x 5) com o número de sorteios em cada faixa
+        
+        Raises:
+            ValueError: Se algum jogo não tiver 15 dezenas distintas
+        """
+        mascaras = jogos_to_masks(jogos)
+        if len(mascaras) and ((popcount(mascaras) != DEZENAS_POR_SORTEIO).any() or (mascaras >> NUM_DEZENAS).any()):
+            raise ValueError("Todos os jogos devem ter 15 dezenas distintas entre 1 e 25")
+        
+        return conferir(mascaras, self.historico.masks, processos=processos)
+    
+    def resumo(self, jogos, processos=None):
+        """
+        Descreve o desempenho histórico de cada jogo
+        
+        Args:
+            jogos (list or numpy.ndarray): Listas de dezenas ou máscaras uint32
+            processos (int): Número de processos (None: automático)
+        
+        Returns:
+            list: Para cada jogo, as dezenas, os sorteios por faixa e o total de premiações
+        """
+        mascaras = jogos_to_masks(jogos)
+        histogramas = self.conferir(mascaras, processos=processos)
+        
+        return [
+            {
+                'jogo': mask_to_dezenas(mascara),
+                'acertos': {str(faixa): int(n) for faixa, n in zip(FAIXAS, histograma)},
+                'premiacoes': int(histograma.sum())
+            }
+            for mascara, histograma in zip(mascaras, histogramas)
+        ]
+
+
+if __name__ == "__main__":
+    import time
+    import argparse
+    from synthetic_history import SyntheticHistoryGenerator
+    
+    parser = argparse.ArgumentParser(description='Benchmark da conferência em massa')
+    parser.add_argument('--jogos', type=int, default=1_000_000, help='Número de jogos')
+    parser.add_argument('--sorteios', type=int, default=3_000, help='Número de sorteios')
+    parser.add_argument('--processos', type=int, default=None, help='Número de processos')
+    args = parser.parse_args()
+    
+    jogos = SyntheticHistoryGenerator(seed=1).store(args.jogos).masks
+    sorteios = SyntheticHistoryGenerator(seed=2).store(args.sorteios).masks
+    
+    inicio = time.perf_counter()
+    resultado = conferir(jogos, sorteios, processos=args.processos)
+    print(f"{args.jogos} jogos x {args.sorteios} sorteios em {time.perf_counter() - inicio:.2f} s: "
+          f"{dict(zip(FAIXAS, resultado.sum(axis=0).tolist()))}")
@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Índice de coocorrência de pares e trios de dezenas da Lotofácil
+
+Mantém a matriz 25x25 de pares (a diagonal é a frequência de cada dezena) e a
+contagem dos 2300 trios possíveis, indexada pela posição do trio na ordem
+lexicográfica, calculadas a partir das máscaras de bits do histórico. O índice é
+atualizado sorteio a sorteio e também mantém as mesmas contagens para janelas
+fixas dos últimos N concursos.
+
+O coletor mantém o índice gravado em disco (load_or_build), acrescentando só os
+concursos novos a cada sincronização; as APIs o leem para consultas de afinidade
+entre dezenas.
+"""
+
+import os
+import logging
+import numpy as np
+from itertools import combinations
+
+from draw_store import NUM_DEZENAS, DEZENAS_POR_SORTEIO, masks_to_matrix, popcount
+
+logger = logging.getLogger('cooccurrence')
+
+# Todos os trios de dezenas (base 0) em ordem lexicográfica
+TRIOS = np.array(list(combinations(range(NUM_DEZENAS), 3)), dtype=np.int64)
+
+# Posição de cada trio ordenado (a < b < c) em TRIOS
+INDICE_TRIOS = np.full((NUM_DEZENAS,) * 3, -1, dtype=np.int16)
+INDICE_TRIOS[TRIOS[:, 0], TRIOS[:, 1], TRIOS[:, 2]] = np.arange(len(TRIOS))
+
+# Trios de posições dentro das 15 dezenas de um sorteio
+_TRIOS_SORTEIO = np.array(list(combinations(range(DEZENAS_POR_SORTEIO), 3)), dtype=np.int64)
+
+# Sorteios processados por vez nas contagens em lote
+LOTE = 16384
+
+# Caminho padrão do índice gravado pelo coletor
+COOCORRENCIA_PATH = '/home/ubuntu/lotofacil/data/historico/lotofacil_cooccurrence.npz'
+
+# Janelas (últimos N concursos) mantidas pelo índice do coletor
+JANELAS_COOCORRENCIA = (10, 30, 100)
+
+
+def _dezenas_matrix(mascaras):
+    """Dezenas (base 0) de cada sorteio como matriz n x 15, em ordem crescente"""
+    mascaras = np.asarray(mascaras, dtype=np.uint32)
+    if not (popcount(mascaras) == DEZENAS_POR_SORTEIO).all():
+        raise ValueError("Todos os sorteios devem ter 15 dezenas")
+    return np.nonzero(masks_to_matrix(mascaras))[1].reshape(len(mascaras), DEZENAS_POR_SORTEIO)
+
+
+def pair_counts(mascaras):
+    """
+    Conta quantas vezes cada par de dezenas saiu junto
+    
+    Args:
+        mascaras (array-like): Máscaras de bits dos sorteios
+    
+    Returns:
+        numpy.ndarray: Matriz simétrica int64 (25 x 25); a diagonal é a frequência de cada dezena
+    """
+    mascaras = np.asarray(mascaras, dtype=np.uint32)
+    pares = np.zeros((NUM_DEZENAS, NUM_DEZENAS), dtype=np.int64)
+    for inicio in range(0, len(mascaras), LOTE):
+        matriz = masks_to_matrix(mascaras[inicio:inicio + LOTE], dtype=np.int64)
+        pares += matriz.T @ matriz
+    return pares
+
+
+def triple_counts(mascaras):
+    """
+    Conta quantas vezes cada trio de dezenas saiu junto
+    
+    Args:
+        mascaras (array-like): Máscaras de bits dos sorteios
+    
+    Returns:
+        numpy.ndarray: Contagens int64 na ordem de TRIOS (2300 posições)
+    """
+    mascaras = np.asarray(mascaras, dtype=np.uint32)
+    cubo = np.zeros((NUM_DEZENAS * NUM_DEZENAS, NUM_DEZENAS), dtype=np.int64)
+    for inicio in range(0, len(mascaras), LOTE):
+        # Contração (pares de cada sorteio)^T x (dezenas) em BLAS; float32 é exato
+        # para contagens de até 2^24 por lote
+        matriz = masks_to_matrix(mascaras[inicio:inicio + LOTE], dtype=np.float32)
+        pares = (matriz[:, :, None] * matriz[:, None, :]).reshape(len(matriz), -1)
+        cubo += (pares.T @ matriz).astype(np.int64)
+    cubo = cubo.reshape((NUM_DEZENAS,) * 3)
+    return cubo[TRIOS[:, 0], TRIOS[:, 1], TRIOS[:, 2]]
+
+
+def triple_index(a, b, c):
+    """
+    Obtém a posição de um trio de dezenas em TRIOS
+    
+    Args:
+        a, b, c (int): Dezenas distintas entre 1 e 25, em qualquer ordem
+    
+    Returns:
+        int: Posição do trio
+    """
+    x, y, z = sorted((int(a) - 1, int(b) - 1, int(c) - 1))
+    if x < 0 or z >= NUM_DEZENAS or x == y or y == z:
+        raise ValueError(f"Trio inválido: {a}, {b}, {c}")
+    return int(INDICE_TRIOS[x, y, z])
+
+
+class LotofacilCooccurrenceIndex:
+    """Classe para consultas de coocorrência de pares e trios de dezenas"""
+    
+    def __init__(self, janelas=()):
+        """
+        Inicializa um índice vazio
+        
+        Args:
+            janelas (tuple): Janelas (últimos N concursos) mantidas incrementalmente
+        """
+        self.janelas = tuple(sorted(set(janelas)))
+        
+        # Contagens do histórico completo e de cada janela
+        self.pares = np.zeros((NUM_DEZENAS, NUM_DEZENAS), dtype=np.int64)
+        self.trios = np.zeros(len(TRIOS), dtype=np.int64)
+        self.pares_janela = {j: np.zeros_like(self.pares) for j in self.janelas}
+        self.trios_janela = {j: np.zeros_like(self.trios) for j in self.janelas}
+        
+        # Máscaras processadas (consultas em janelas arbitrárias)
+        self._masks = np.zeros(0, dtype=np.uint32)
+        self._size = 0
+        self.last_concurso = None
+    
+    def __len__(self):
+        return self._size
+    
+    @property
+    def masks(self):
+        """Máscaras dos sorteios indexados"""
+        return self._masks[:self._size]
+    
+    @classmethod
+    def from_masks(cls, mascaras, janelas=(), concursos=None):
+        """
+        Constrói o índice a partir do histórico completo (modo em lote)
+        
+        Args:
+            mascaras (array-like): Máscaras de bits em ordem de concurso
+            janelas (tuple): Janelas mantidas incrementalmente
+            concursos (array-like): Números dos concursos (opcional)
+        
+        Returns:
+            LotofacilCooccurrenceIndex: Índice construído
+        """
+        index = cls(janelas)
+        mascaras = np.array(mascaras, dtype=np.uint32)
+        
+        index._masks = mascaras
+        index._size = len(mascaras)
+        index.pares = pair_counts(mascaras)
+        index.trios = triple_counts(mascaras)
+        for janela in index.janelas:
+            index.pares_janela[janela] = pair_counts(mascaras[-janela:])
+            index.trios_janela[janela] = triple_counts(mascaras[-janela:])
+        
+        if concursos is not None and len(concursos):
+            index.last_concurso = int(concursos[-1])
+        
+        return index
+    
+    @classmethod
+    def from_store(cls, store, janelas=()):
+        """
+        Constrói o índice a partir de um LotofacilDrawStore
+        
+        Args:
+            store (LotofacilDrawStore): Histórico de sorteios
+            janelas (tuple): Janelas mantidas incrementalmente
+        
+        Returns:
+            LotofacilCooccurrenceIndex: Índice construído
+        """
+        return cls.from_masks(store.masks, janelas, store.concursos)
+    
+    @classmethod
+    def load_or_build(cls, store, path=COOCORRENCIA_PATH, janelas=JANELAS_COOCORRENCIA, save=True):
+        """
+        Obtém o índice de um histórico, reaproveitando o índice gravado em disco
+        
+        Se o índice gravado corresponde a um prefixo do histórico, apenas os sorteios
+        novos são acrescentados (update); caso contrário, o índice é reconstruído em lote.
+        
+        Args:
+            store (LotofacilDrawStore): Histórico de sorteios
+            path (str): Caminho do arquivo .npz
+            janelas (tuple): Janelas mantidas incrementalmente
+            save (bool): Gravar o índice se ele foi atualizado ou reconstruído
+        
+        Returns:
+            LotofacilCooccurrenceIndex: Índice do histórico completo
+        """
+        janelas = tuple(sorted(set(janelas)))
+        index = None
+        
+        if path and os.path.exists(path):
+            try:
+                index = cls.load(path)
+            except Exception as e:
+                logger.warning(f"Índice de coocorrência inválido em {path}: {str(e)}")
+        
+        # O índice gravado precisa cobrir um prefixo do histórico atual
+        if index is not None:
+            n = len(index)
+            prefixo = index.janelas == janelas and n <= len(store) and np.array_equal(index.masks, store.masks[:n])
+            if not prefixo or (n and index.last_concurso != int(store.concursos[n - 1])):
+                logger.info("Índice de coocorrência não corresponde ao histórico. Reconstruindo...")
+                index = None
+        
+        if index is None:
+            index = cls.from_store(store, janelas)
+        elif len(index) < len(store):
+            index.update_many(store.masks[len(index):], store.concursos[len(index):])
+        else:
+            return index
+        
+        if save and path:
+            index.save(path)
+        
+        return index
+    
+    def update(self, mascara, concurso=None):
+        """
+        Acrescenta um sorteio, em O(25² + 455) por janela
+        
+        Args:
+            mascara (int): Máscara de bits do sorteio
+            concurso (int): Número do concurso (opcional)
+        """
+        linha = masks_to_matrix([mascara], dtype=np.int64)[0]
+        pares = np.outer(linha, linha)
+        trios = self._draw_triples(mascara)
+        
+        self.pares += pares
+        self.trios[trios] += 1
+        
+        # Nas janelas, o sorteio que sai dá lugar ao novo
+        for janela in self.janelas:
+            self.pares_janela[janela] += pares
+            self.trios_janela[janela][trios] += 1
+            if self._size >= janela:
+                saida = self._masks[self._size - janela]
+                linha_saida = masks_to_matrix([saida], dtype=np.int64)[0]
+                self.pares_janela[janela] -= np.outer(linha_saida, linha_saida)
+                self.trios_janela[janela][self._draw_triples(saida)] -= 1
+        
+        if self._size == len(self._masks):
+            novo = np.zeros(max(64, 2 * len(self._masks)), dtype=np.uint32)
+            novo[:self._size] = self._masks[:self._size]
+            self._masks = novo
+        self._masks[self._size] = mascara
+        self._size += 1
+        
+        if concurso is not None:
+            self.last_concurso = int(concurso)
+    
+    def update_many(self, mascaras, concursos=None):
+        """
+        Acrescenta vários sorteios em sequência
+        
+        Args:
+            mascaras (array-like): Máscaras de bits
+            concursos (array-like): Números dos concursos (opcional)
+        """
+        for i, mascara in enumerate(mascaras):
+            self.update(mascara, None if concursos is None else concursos[i])
+    
+    @staticmethod
+    def _draw_triples(mascara):
+        """Posições em TRIOS dos 455 trios de um sorteio"""
+        dezenas = _dezenas_matrix([mascara])[0]
+        return INDICE_TRIOS[dezenas[_TRIOS_SORTEIO[:, 0]], dezenas[_TRIOS_SORTEIO[:, 1]], dezenas[_TRIOS_SORTEIO[:, 2]]]
+    
+    def pair_matrix(self, janela=None):
+        """
+        Obtém a matriz de pares do histórico ou dos últimos N concursos
+        
+        Args:
+            janela (int): Últimos N concursos (padrão: histórico completo)
+        
+        Returns:
+            numpy.ndarray: Matriz 25 x 25 (somente leitura se mantida pelo índice)
+        """
+        if janela is None or janela >= self._size:
+            pares = self.pares
+        elif janela in self.pares_janela:
+            pares = self.pares_janela[janela]
+        else:
+            return pair_counts(self.masks[-janela:])
+        
+        pares = pares.view()
+        pares.flags.writeable = False
+        return pares
+    
+    def triple_vector(self, janela=None):
+        """
+        Obtém as contagens de trios do histórico ou dos últimos N concursos
+        
+        Args:
+            janela (int): Últimos N concursos (padrão: histórico completo)
+        
+        Returns:
+            numpy.ndarray: Contagens na ordem de TRIOS
+        """
+        if janela is None or janela >= self._size:
+            trios = self.trios
+        elif janela in self.trios_janela:
+            trios = self.trios_janela[janela]
+        else:
+            return triple_counts(self.masks[-janela:])
+        
+        trios = trios.view()
+        trios.flags.writeable = False
+        return trios
+    
+    def pair_count(self, a, b, janela=None):
+        """
+        Conta quantas vezes duas dezenas saíram juntas
+        
+        Args:
+            a, b (int): Dezenas entre 1 e 25
+            janela (int): Últimos N concursos (padrão: histórico completo)
+        
+        Returns:
+            int: Número de sorteios com as duas dezenas
+        """
+        return int(self.pair_matrix(janela)[int(a) - 1, int(b) - 1])
+    
+    def triple_count(self, a, b, c, janela=None):
+        """
+        Conta quantas vezes três dezenas saíram juntas
+        
+        Args:
+            a, b, c (int): Dezenas distintas entre 1 e 25
+            janela (int): Últimos N concursos (padrão: histórico completo)
+        
+        Returns:
+            int: Número de sorteios com as três dezenas
+        """
+        return int(self.triple_vector(janela)[triple_index(a, b, c)])
+    
+    def top_pairs(self, k=10, janela=None, dezena=None):
+        """
+        Obtém os pares que mais saíram juntos
+        
+        Args:
+            k (int): Quantidade de pares
+            janela (int): Últimos N concursos (padrão: histórico completo)
+            dezena (int): Se informada, apenas os pares que contêm esta dezena
+        
+        Returns:
+            list: Tuplas ((dezena_a, dezena_b), contagem) em ordem decrescente
+        """
+        pares = self.pair_matrix(janela)
+        if dezena is not None:
+            a = np.full(NUM_DEZENAS - 1, int(dezena) - 1)
+            b = np.delete(np.arange(NUM_DEZENAS), int(dezena) - 1)
+        else:
+            a, b = np.triu_indices(NUM_DEZENAS, k=1)
+        
+        contagens = pares[a, b]
+        ordem = np.argsort(-contagens, kind='stable')[:k]
+        return [((int(a[i]) + 1, int(b[i]) + 1), int(contagens[i])) for i in ordem]
+    
+    def top_triples(self, k=10, janela=None):
+        """
+        Obtém os trios que mais saíram juntos
+        
+        Args:
+            k (int): Quantidade de trios
+            janela (int): Últimos N concursos (padrão: histórico completo)
+        
+        Returns:
+            list: Tuplas ((dezena_a, dezena_b, dezena_c), contagem) em ordem decrescente
+        """
+        trios = self.triple_vector(janela)
+        ordem = np.argsort(-trios, kind='stable')[:k]
+        return [(tuple(int(d) + 1 for d in TRIOS[i]), int(trios[i])) for i in ordem]
+    
+    def save(self, path):
+        """
+        Grava o índice em disco
+        
+        Args:
+            path (str): Caminho do arquivo .npz
+        """
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            janelas=np.array(self.janelas, dtype=np.int64),
+            masks=self.masks,
+            last_concurso=-1 if self.last_concurso is None else self.last_concurso,
+            pares=self.pares,
+            trios=self.trios,
+            **{f'pares_{j}': self.pares_janela[j] for j in self.janelas},
+            **{f'trios_{j}': self.trios_janela[j] for j in self.janelas}
+        )
+        os.replace(tmp_path, path)
+    
+    @classmethod
+    def load(cls, path):
+        """
+        Carrega o índice gravado em disco
+        
+        Args:
+            path (str): Caminho do arquivo .npz
+        
+        Returns:
+            LotofacilCooccurrenceIndex: Índice carregado
+        """
+        with np.load(path) as dados:
+            index = cls(tuple(int(j) for j in dados['janelas']))
+            index._masks = dados['masks'].copy()
+            index._size = len(index._masks)
+            ultimo = int(dados['last_concurso'])
+            index.last_concurso = None if ultimo < 0 else ultimo
+            index.pares = dados['pares'].copy()
+            index.trios = dados['trios'].copy()
+            for janela in index.janelas:
+                index.pares_janela[janela] = dados[f'pares_{janela}'].copy()
+                index.trios_janela[janela] = dados[f'trios_{janela}'].copy()
+        return index
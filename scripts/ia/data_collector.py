@@ -6,13 +6,25 @@ Script para obtenção e processamento de dados históricos da Lotofácil
 """
 
 import os
-import requests
 import pandas as pd
 import numpy as np
 from datetime import datetime
 import logging
 import csv
 import json
+from array import array
+from functools import partial
+
+from draw_store import LotofacilDrawStore, dezenas_to_mask, encode_data
+from feature_engine import LotofacilFeatureEngine, IncrementalFeatureState, sequence_windows
+from feature_cache import ProcessedFeatureCache
+from http_fetcher import HedgedFetcher
+from http_cache import HttpResponseCache
+from json_stream import iter_json_array
+from synthetic_history import SyntheticHistoryGenerator
+from shared_history import SharedDrawHistory, SHARED_HISTORY_PATH
+from cooccurrence import LotofacilCooccurrenceIndex, COOCORRENCIA_PATH
+from dataset_version import dataset_version, write_dataset_version, read_dataset_version, VersionedCache, DATASET_VERSION_PATH
 
 # Configuração de logging
 logging.basicConfig(
@@ -36,105 +48,371 @@ class LotofacilDataCollector:
         self.raw_data_path = '/home/ubuntu/lotofacil/data/historico/lotofacil_raw.csv'
         self.processed_data_path = '/home/ubuntu/lotofacil/data/historico/lotofacil_processed.csv'
         self.json_data_path = '/home/ubuntu/lotofacil/data/historico/lotofacil_data.json'
+        self.store_path = '/home/ubuntu/lotofacil/data/historico/lotofacil_draws.bin'
+        self.feature_state_path = '/home/ubuntu/lotofacil/data/historico/lotofacil_features_state.npz'
+        self.feature_cache_dir = '/home/ubuntu/lotofacil/data/historico/lotofacil_processed_cache'
+        self.http_cache_dir = '/home/ubuntu/lotofacil/data/historico/http_cache'
+        self.shared_history_path = SHARED_HISTORY_PATH
+        self.dataset_version_path = DATASET_VERSION_PATH
+        self.cooccurrence_path = COOCORRENCIA_PATH
         
         # URLs para obtenção de dados
         self.api_url = "https://loteriascaixa-api.herokuapp.com/api/lotofacil"
         self.alternative_url = "https://servicebus2.caixa.gov.br/portaldeloterias/api/lotofacil"
+        
+        # Acima deste número de concursos faltantes, a sincronização incremental
+        # baixa o histórico completo e aproveita apenas os concursos novos
+        self.max_incremental_gap = 50
+        
+        # Busca concorrente entre as duas URLs: a alternativa é acionada se a
+        # principal não responder em hedge_delay segundos (0 = ambas em paralelo)
+        self.hedge_delay = 2.0
+        self.fetcher = HedgedFetcher(self._source_urls(), hedge_delay=self.hedge_delay)
+        
+        # Validadores (ETag/Last-Modified) e hashes das últimas respostas processadas
+        self.http_cache = HttpResponseCache(self.http_cache_dir)
+        
+        # Situação da última consulta em relação ao cache ('modified', 'not_modified' ou 'unchanged')
+        self.last_fetch_status = None
+        self.last_fetch_source = None
+        
+        # Construtor vetorizado das features de machine learning
+        self.feature_engine = LotofacilFeatureEngine()
+        
+        # Cache binário colunar de lotofacil_processed.csv
+        self.feature_cache = ProcessedFeatureCache(self.feature_cache_dir)
+        
+        # Versão do histórico a partir da qual as features foram calculadas
+        self.stage_cache = VersionedCache('/home/ubuntu/lotofacil/data/historico/lotofacil_stages.json')
+        
+        # Versão do histórico publicada na última execução
+        self.dataset_version = None
     
     def fetch_data_from_api(self):
         """
         Obtém dados históricos da Lotofácil a partir da API
         
+        O histórico é lido em streaming: cada concurso é convertido em máscara de
+        bits assim que chega, e o corpo é copiado sem alterações para o arquivo JSON,
+        de modo que a memória usada não depende do tamanho do histórico.
+        
         Returns:
             bool: True se os dados foram obtidos com sucesso, False caso contrário
         """
         try:
             logger.info("Iniciando obtenção de dados da API...")
             
-            # Tentar obter dados da API principal
-            response = requests.get(self.api_url, timeout=30)
-            
-            # Se falhar, tentar a URL alternativa
-            if response.status_code != 200:
-                logger.warning(f"Falha ao obter dados da API principal (status {response.status_code}). Tentando URL alternativa...")
-                response = requests.get(self.alternative_url, timeout=30)
+            # Consultar a API principal e a alternativa com hedge (requisição condicional
+            # apenas se os arquivos locais existirem para serem reaproveitados)
+            condicional = os.path.exists(self.raw_data_path) and os.path.exists(self.store_path)
+            fonte, resposta = self._fetch_history(condicional)
             
-            # Verificar se a requisição foi bem-sucedida
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Salvar dados brutos em JSON
-                with open(self.json_data_path, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, ensure_ascii=False, indent=4)
-                
-                logger.info(f"Dados obtidos com sucesso e salvos em {self.json_data_path}")
-                
-                # Processar e salvar em CSV
-                return self._process_api_data(data)
-            else:
-                logger.error(f"Falha ao obter dados da API (status {response.status_code})")
+            # Verificar se alguma das fontes respondeu
+            if resposta is None:
+                logger.error(f"Falha ao obter dados da API em todas as fontes: {self.fetcher.latency_stats()}")
                 return False
+            
+            # Histórico igual ao último processado: nada a gravar
+            if not resposta.modified:
+                logger.info(f"Histórico sem alterações na fonte {fonte} ({resposta.status}). Dados locais mantidos.")
+                self._discard_stream(resposta)
+                return True
+            
+            json_tmp_path, store = resposta.data
+            logger.info(f"Dados obtidos da fonte {fonte}: {len(store)} concursos")
+            
+            # Salvar dados brutos em JSON (cópia do corpo recebido)
+            os.replace(json_tmp_path, self.json_data_path)
+            
+            logger.info(f"Dados obtidos com sucesso e salvos em {self.json_data_path}")
+            
+            # Salvar em CSV e no histórico binário
+            store.to_csv(self.raw_data_path)
+            store.save()
+            
+            logger.info(f"Dados processados com sucesso e salvos em {self.raw_data_path}")
+            
+            self.http_cache.commit(resposta)
+            return True
         except Exception as e:
             logger.error(f"Erro ao obter dados da API: {str(e)}")
             return False
     
-    def _process_api_data(self, data):
+    def _source_urls(self, sufixo=''):
         """
-        Processa os dados obtidos da API e salva em CSV
+        Monta as URLs das fontes de dados, em ordem de prioridade
         
         Args:
-            data (list): Lista de concursos da Lotofácil
+            sufixo (str): Caminho acrescentado às URLs (ex.: '/latest', '/3000')
             
         Returns:
-            bool: True se os dados foram processados com sucesso, False caso contrário
+            dict: Nome da fonte -> URL
+        """
+        return {
+            'principal': f"{self.api_url}{sufixo}",
+            'alternativa': f"{self.alternative_url}{sufixo}"
+        }
+    
+    def _contest_urls(self, referencia):
+        """
+        Monta as URLs de um único concurso
+        
+        Args:
+            referencia (int or str): Número do concurso ou 'latest' para o mais recente
+            
+        Returns:
+            dict: Nome da fonte -> URL
+        """
+        urls = self._source_urls(f'/{referencia}')
+        
+        # A API da Caixa retorna o concurso mais recente na URL base
+        if referencia == 'latest':
+            urls['alternativa'] = self.alternative_url
+        
+        return urls
+    
+    @staticmethod
+    def _parse_contest(concurso):
+        """
+        Converte um concurso retornado pela API em número, máscara de bits e data codificada
+        
+        Aceita tanto o formato da API principal (concurso, data, dezenas) quanto o
+        da API da Caixa (numero, dataApuracao, listaDezenas).
+        
+        Args:
+            concurso (dict): Concurso retornado pela API
+            
+        Returns:
+            tuple: (concurso, mascara, data no formato aaaammdd)
         """
+        concurso_num = concurso.get('concurso', concurso.get('numero'))
+        data_concurso = concurso.get('data', concurso.get('dataApuracao'))
+        dezenas = concurso.get('dezenas', concurso.get('listaDezenas', []))
+        
+        return int(concurso_num), dezenas_to_mask(dezenas), encode_data(data_concurso)
+    
+    def _stream_tmp_path(self, nome):
+        """Arquivo temporário da cópia do histórico recebido de uma fonte"""
+        return f"{self.json_data_path}.{nome}.tmp"
+    
+    def _consume_history(self, nome, blocos):
+        """
+        Lê o histórico completo em streaming, concurso a concurso
+        
+        Args:
+            nome (str): Nome da fonte
+            blocos (iterable): Blocos de bytes do corpo da resposta
+            
+        Returns:
+            tuple: (caminho da cópia temporária do JSON, LotofacilDrawStore com o histórico)
+        """
+        tmp_path = self._stream_tmp_path(nome)
+        
+        # Arrays compactos (12 bytes por concurso) em vez de dicionários e DataFrames
+        concursos, mascaras, datas = array('I'), array('I'), array('I')
+        
+        def copiar(f):
+            for bloco in blocos:
+                f.write(bloco)
+                yield bloco
+        
         try:
-            # Criar lista para armazenar os dados processados
-            processed_data = []
-            
-            # Processar cada concurso
-            for concurso in data:
-                # Extrair informações básicas
-                concurso_num = concurso.get('concurso')
-                data_concurso = concurso.get('data')
-                dezenas = concurso.get('dezenas', [])
+            with open(tmp_path, 'wb') as f:
+                for concurso in iter_json_array(copiar(f)):
+                    numero, mascara, data = self._parse_contest(concurso)
+                    concursos.append(numero)
+                    mascaras.append(mascara)
+                    datas.append(data)
+            
+            if len(concursos) == 0:
+                raise ValueError("Resposta da API não contém concursos")
+            
+            store = LotofacilDrawStore(self.store_path)
+            store.extend(
+                np.frombuffer(concursos, dtype=np.uint32),
+                np.frombuffer(mascaras, dtype=np.uint32),
+                np.frombuffer(datas, dtype=np.uint32)
+            )
+            return tmp_path, store
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    
+    def _fetch_history(self, condicional=True):
+        """
+        Obtém o histórico completo em streaming da fonte que responder primeiro
+        
+        Args:
+            condicional (bool): Se True, envia os validadores da última resposta processada
+            
+        Returns:
+            tuple: (nome da fonte, CachedResponse cujo data é (JSON temporário, LotofacilDrawStore))
+                ou (None, None) se todas falharem
+        """
+        urls = self._source_urls()
+        
+        try:
+            return self._fetch_cached(urls, condicional=condicional, consumir=self._consume_history)
+        finally:
+            # Descartar as cópias das fontes perdedoras
+            for nome in urls:
+                tmp_path = self._stream_tmp_path(nome)
+                if os.path.exists(tmp_path) and self.last_fetch_source != nome:
+                    os.remove(tmp_path)
+    
+    @staticmethod
+    def _discard_stream(resposta):
+        """Remove a cópia temporária de um histórico lido em streaming e não utilizado"""
+        if resposta.data is not None and os.path.exists(resposta.data[0]):
+            os.remove(resposta.data[0])
+    
+    def _fetch_cached(self, urls, validar=None, condicional=True, consumir=None):
+        """
+        Consulta as fontes com requisições condicionais e avalia a resposta contra o cache HTTP
+        
+        O cache não é atualizado aqui: quem processa a resposta deve chamar
+        self.http_cache.commit(resposta) depois de gravar os dados.
+        
+        Args:
+            urls (dict): Nome da fonte -> URL
+            validar (callable): Função bytes -> dados, aplicada apenas a conteúdo novo
+            condicional (bool): Se True, envia os validadores da última resposta processada
+            consumir (callable): Função (nome, blocos) -> dados; se informada, o corpo
+                é lido em streaming em vez de validar
+            
+        Returns:
+            tuple: (nome da fonte, CachedResponse) ou (None, None) se todas falharem
+        """
+        headers = (lambda nome: self.http_cache.conditional_headers(urls[nome])) if condicional else None
+        
+        if consumir is not None:
+            parse = {
+                nome: partial(self.http_cache.read_stream, url, consumir=partial(consumir, nome), condicional=condicional)
+                for nome, url in urls.items()
+            }
+        else:
+            parse = {
+                nome: partial(self.http_cache.read, url, validar=validar, condicional=condicional)
+                for nome, url in urls.items()
+            }
+        
+        self.last_fetch_source = None
+        fonte, resposta = self.fetcher.fetch(urls=urls, parse=parse, headers=headers, stream=consumir is not None)
+        
+        if resposta is not None:
+            self.http_cache.record(resposta)
+            self.last_fetch_status = resposta.status
+            self.last_fetch_source = fonte
+        
+        return fonte, resposta
+    
+    def _fetch_contest(self, referencia='latest'):
+        """
+        Obtém um único concurso da API
+        
+        Args:
+            referencia (int or str): Número do concurso ou 'latest' para o mais recente
+            
+        Returns:
+            dict: Concurso retornado pela API ou None em caso de falha
+        """
+        fonte, concurso = self.fetcher.fetch(urls=self._contest_urls(referencia), parse=lambda response: response.json())
+        
+        if concurso is None:
+            logger.warning(f"Falha ao obter concurso {referencia} em todas as fontes")
+        
+        return concurso
+    
+    def sync_incremental(self):
+        """
+        Sincroniza o histórico baixando apenas os concursos posteriores ao último armazenado
+        
+        Consulta o concurso mais recente e, se houver concursos novos, busca cada um
+        pelo endpoint por concurso (ou o histórico completo, quando a lacuna é grande) e
+        os acrescenta ao final do histórico binário e de lotofacil_raw.csv.
+        
+        Returns:
+            int: Quantidade de concursos acrescentados ou None em caso de falha
+        """
+        try:
+            logger.info("Iniciando sincronização incremental...")
+            
+            # Sem histórico local, a única opção é o download completo
+            store = LotofacilDrawStore.load_or_build(self.store_path, self.raw_data_path)
+            
+            if store is None or len(store) == 0:
+                logger.info("Histórico local vazio. Baixando histórico completo...")
                 
-                # Converter dezenas para inteiros
-                dezenas_int = [int(d) for d in dezenas]
+                if not self.fetch_data_from_api():
+                    return None
                 
-                # Ordenar dezenas
-                dezenas_int.sort()
+                return len(LotofacilDrawStore.load(self.store_path))
+            
+            ultimo_local = store.last_concurso
+            
+            # Obter o concurso mais recente (requisição condicional: entre sorteios, um 304)
+            _, resposta = self._fetch_cached(self._contest_urls('latest'), json.loads)
+            
+            if resposta is None:
+                logger.error("Falha ao obter o concurso mais recente.")
+                return None
+            
+            if not resposta.modified:
+                logger.info(f"Concurso mais recente inalterado ({resposta.status}). Histórico já atualizado (concurso {ultimo_local}).")
+                return 0
+            
+            ultimo = self._parse_contest(resposta.data)
+            
+            if ultimo[0] <= ultimo_local:
+                logger.info(f"Histórico já atualizado (concurso {ultimo_local}).")
+                self.http_cache.commit(resposta)
+                return 0
+            
+            # Obter os concursos faltantes
+            faltantes = range(ultimo_local + 1, ultimo[0])
+            
+            if len(faltantes) > self.max_incremental_gap:
+                logger.info(f"{len(faltantes) + 1} concursos faltantes. Baixando histórico completo...")
+                _, historico = self._fetch_history(condicional=False)
                 
-                # Calcular estatísticas
-                pares = sum(1 for d in dezenas_int if d % 2 == 0)
-                impares = 15 - pares
-                soma = sum(dezenas_int)
+                if historico is None:
+                    logger.error("Falha ao obter histórico completo.")
+                    return None
                 
-                # Adicionar à lista de dados processados
-                processed_data.append({
-                    'concurso': concurso_num,
-                    'data': data_concurso,
-                    'dezenas': ','.join(dezenas),
-                    'pares': pares,
-                    'impares': impares,
-                    'soma': soma
-                })
-            
-            # Converter para DataFrame
-            df = pd.DataFrame(processed_data)
+                self._discard_stream(historico)
+                completo = historico.data[1]
+                novos = (completo.concursos > ultimo_local).nonzero()[0]
+                linhas = (completo.concursos[novos], completo.masks[novos], completo.datas[novos])
+            else:
+                linhas = [ultimo]
+                for numero in faltantes:
+                    concurso = self._fetch_contest(numero)
+                    
+                    if concurso is None:
+                        logger.error(f"Falha ao obter concurso {numero}. Sincronização interrompida.")
+                        return None
+                    
+                    linhas.append(self._parse_contest(concurso))
+                
+                linhas = tuple(zip(*linhas))
             
-            # Ordenar por número do concurso
-            df = df.sort_values('concurso')
+            # Acrescentar ao histórico e apenas as linhas novas ao CSV
+            # (o binário é gravado depois do CSV para continuar atualizado)
+            inicio = len(store)
+            adicionados = store.extend(*linhas)
+            store.to_csv(self.raw_data_path, inicio=inicio, append=True)
+            store.flush()
             
-            # Salvar em CSV
-            df.to_csv(self.raw_data_path, index=False)
+            # Só agora o concurso mais recente conta como processado
+            self.http_cache.commit(resposta)
             
-            logger.info(f"Dados processados com sucesso e salvos em {self.raw_data_path}")
+            logger.info(f"Sincronização incremental concluída: {adicionados} concursos novos até {store.last_concurso}")
             
-            return True
+            return adicionados
         except Exception as e:
-            logger.error(f"Erro ao processar dados da API: {str(e)}")
-            return False
+            logger.error(f"Erro na sincronização incremental: {str(e)}")
+            return None
     
     def fetch_data_from_web(self):
         """
@@ -149,39 +427,14 @@ class LotofacilDataCollector:
             # Simulação de dados históricos da Lotofácil
             # Em um ambiente real, faríamos web scraping ou usaríamos uma API
             
-            # Criar dados simulados para os últimos 100 concursos
-            concursos = []
+            # Criar dados simulados para os últimos 100 concursos (3275 a 3374),
+            # salvos em CSV e no histórico binário em máscaras de bits
+            gerador = SyntheticHistoryGenerator(seed=None, primeiro_concurso=3275, data_inicial='2025-01-02')
+            gerador.write(100, self.raw_data_path, self.store_path)
             
-            for i in range(3374, 3274, -1):
-                # Gerar data simulada
-                year = 2025 - ((3374 - i) // 100)
-                month = max(1, ((i % 100) % 12) + 1)
-                day = max(1, ((i % 30) + 1))
-                data_concurso = f"{day:02d}/{month:02d}/{year}"
-                
-                # Gerar 15 dezenas aleatórias entre 1 e 25
-                dezenas = sorted(np.random.choice(range(1, 26), size=15, replace=False))
-                
-                # Calcular estatísticas
-                pares = sum(1 for d in dezenas if d % 2 == 0)
-                impares = 15 - pares
-                soma = sum(dezenas)
-                
-                # Adicionar ao DataFrame
-                concursos.append({
-                    'concurso': i,
-                    'data': data_concurso,
-                    'dezenas': ','.join(map(str, dezenas)),
-                    'pares': pares,
-                    'impares': impares,
-                    'soma': soma
-                })
-            
-            # Converter para DataFrame
-            df = pd.DataFrame(concursos)
-            
-            # Salvar em CSV
-            df.to_csv(self.raw_data_path, index=False)
+            # Os dados locais não correspondem mais às respostas da API
+            for url in {**self._source_urls(), **self._contest_urls('latest')}.values():
+                self.http_cache.invalidate(url)
             
             logger.info(f"Dados simulados gerados com sucesso e salvos em {self.raw_data_path}")
             
@@ -190,10 +443,14 @@ class LotofacilDataCollector:
             logger.error(f"Erro ao obter dados da web: {str(e)}")
             return False
     
-    def process_data_for_ml(self):
+    def process_data_for_ml(self, incremental=False):
         """
         Processa os dados para uso em machine learning
         
+        Args:
+            incremental (bool): Se True, calcula e acrescenta apenas as linhas dos concursos
+                novos a partir do estado salvo; caso contrário, recalcula tudo em lote
+            
         Returns:
             bool: True se os dados foram processados com sucesso, False caso contrário
         """
@@ -205,47 +462,30 @@ class LotofacilDataCollector:
                 logger.error(f"Arquivo de dados brutos não encontrado: {self.raw_data_path}")
                 return False
             
-            # Carregar dados
-            df = pd.read_csv(self.raw_data_path)
-            
-            # Processar dezenas
-            df_processed = pd.DataFrame()
-            df_processed['concurso'] = df['concurso']
-            df_processed['data'] = df['data']
-            
-            # Converter string de dezenas para colunas individuais
-            for i in range(1, 26):
-                df_processed[f'dezena_{i}'] = df['dezenas'].apply(
-                    lambda x: 1 if str(i) in x.split(',') else 0
-                )
-            
-            # Adicionar estatísticas
-            df_processed['pares'] = df['pares']
-            df_processed['impares'] = df['impares']
-            df_processed['soma'] = df['soma']
-            
-            # Adicionar features adicionais
-            
-            # Frequência das dezenas nos últimos 10 concursos
-            for i in range(1, 26):
-                col_name = f'dezena_{i}'
-                df_processed[f'freq_10_{i}'] = df_processed[col_name].rolling(window=10, min_periods=1).mean()
-            
-            # Frequência das dezenas nos últimos 30 concursos
-            for i in range(1, 26):
-                col_name = f'dezena_{i}'
-                df_processed[f'freq_30_{i}'] = df_processed[col_name].rolling(window=30, min_periods=1).mean()
-            
-            # Calcular atraso de cada dezena (quantos concursos desde a última aparição)
-            for i in range(1, 26):
-                col_name = f'dezena_{i}'
-                df_processed[f'atraso_{i}'] = df_processed[col_name].cumsum()
-                df_processed[f'atraso_{i}'] = df_processed[f'atraso_{i}'].diff().fillna(0)
-                df_processed[f'atraso_{i}'] = df_processed[f'atraso_{i}'].apply(lambda x: 0 if x > 0 else 1)
-                df_processed[f'atraso_{i}'] = df_processed[f'atraso_{i}'].cumsum()
-            
-            # Salvar dados processados
+            # Carregar histórico em máscaras de bits
+            store = LotofacilDrawStore.load_or_build(self.store_path, self.raw_data_path)
+            
+            if incremental:
+                state = self._load_feature_state(store)
+                
+                if state is not None:
+                    if not self._append_processed_rows(store, state):
+                        return False
+                    self._mark_features(store)
+                    return True
+                
+                logger.info("Estado incremental ausente ou inconsistente. Recalculando em lote...")
+            
+            # Construir todas as features (dezenas, frequências e atrasos) de uma vez
+            df_processed = self.feature_engine.build(store)
+            
+            # Salvar dados processados (CSV e cache binário)
             df_processed.to_csv(self.processed_data_path, index=False)
+            self.feature_cache.write(df_processed, self.processed_data_path)
+            
+            # Salvar estado para as próximas atualizações incrementais
+            IncrementalFeatureState.from_masks(store.concursos, store.masks, self.feature_engine.janelas).save(self.feature_state_path)
+            self._mark_features(store)
             
             logger.info(f"Dados processados com sucesso e salvos em {self.processed_data_path}")
             
@@ -254,42 +494,166 @@ class LotofacilDataCollector:
             logger.error(f"Erro ao processar dados para machine learning: {str(e)}")
             return False
     
-    def create_sequence_data(self, sequence_length=5):
+    def _load_feature_state(self, store):
         """
-        Cria dados de sequência para treinamento de modelos LSTM
+        Carrega o estado incremental das features, se for consistente com o histórico
         
         Args:
-            sequence_length (int): Tamanho da sequência de concursos anteriores
+            store (LotofacilDrawStore): Histórico de sorteios
             
         Returns:
-            tuple: (X, y) onde X são as sequências de entrada e y são os alvos
+            IncrementalFeatureState: Estado carregado ou None se não puder ser usado
         """
+        if not os.path.exists(self.feature_state_path) or not os.path.exists(self.processed_data_path):
+            return None
+        
         try:
-            logger.info(f"Criando dados de sequência com tamanho {sequence_length}...")
+            state = IncrementalFeatureState.load(self.feature_state_path)
+        except Exception as e:
+            logger.warning(f"Estado incremental das features inválido em {self.feature_state_path}: {str(e)}")
+            return None
+        
+        # O estado precisa corresponder a um prefixo do histórico atual
+        if state.janelas != self.feature_engine.janelas or state.last_concurso is None:
+            return None
+        if store.index(state.last_concurso) != state.count - 1:
+            return None
+        if state.counter.last_mask != store.masks[state.count - 1]:
+            return None
+        
+        return state
+    
+    def _append_processed_rows(self, store, state):
+        """
+        Calcula as features dos concursos novos e as acrescenta a lotofacil_processed.csv
+        
+        Args:
+            store (LotofacilDrawStore): Histórico de sorteios
+            state (IncrementalFeatureState): Estado consistente com o início do histórico
+            
+        Returns:
+            bool: True se os dados foram processados com sucesso
+        """
+        inicio = state.count
+        
+        if inicio == len(store):
+            logger.info("Nenhum concurso novo. Dados processados mantidos.")
+            return True
+        
+        # Atualizar o estado sorteio a sorteio (custo constante por concurso)
+        blocos = state.update_many(store.concursos[inicio:], store.masks[inicio:])
+        
+        # Acrescentar apenas as novas linhas (no CSV e, se estiver atualizado, no cache)
+        df_novos = self.feature_engine.frame(store, blocos, inicio)
+        cache_atualizado = self.feature_cache.is_fresh(self.processed_data_path)
+        df_novos.to_csv(self.processed_data_path, mode='a', header=False, index=False)
+        if cache_atualizado:
+            self.feature_cache.append(df_novos, self.processed_data_path)
+        state.save(self.feature_state_path)
+        
+        logger.info(f"{len(df_novos)} linhas acrescentadas a {self.processed_data_path}")
+        
+        return True
+    
+    def _feature_params(self):
+        """Parâmetros que, junto com o histórico, determinam as features"""
+        return {'janelas': list(self.feature_engine.janelas)}
+    
+    def _mark_features(self, store):
+        """Registra a versão do histórico a partir da qual as features foram calculadas"""
+        self.stage_cache.mark('features', dataset_version(store), self._feature_params(), linhas=len(store))
+    
+    def _processed_up_to_date(self):
+        """
+        Verifica se os dados processados foram calculados a partir do histórico atual
+        
+        Returns:
+            bool: True se não há nada a reprocessar
+        """
+        try:
+            if not os.path.exists(self.processed_data_path) or not os.path.exists(self.feature_state_path):
+                return False
+            store = LotofacilDrawStore.load_or_build(self.store_path, self.raw_data_path)
+            if store is None:
+                return False
+            return self.stage_cache.is_current('features', dataset_version(store), self._feature_params())
+        except Exception as e:
+            logger.warning(f"Erro ao verificar dados processados: {str(e)}")
+            return False
+    
+    def verify_processed_data(self):
+        """
+        Verifica se lotofacil_processed.csv coincide com um recálculo completo em lote
+        
+        Returns:
+            bool: True se os dados processados estão consistentes
+        """
+        try:
+            store = LotofacilDrawStore.load_or_build(self.store_path, self.raw_data_path)
+            esperado = self.feature_engine.build(store)
+            atual = pd.read_csv(self.processed_data_path)
+            
+            colunas = [c for c in esperado.columns if c != 'data']
+            consistente = (
+                len(atual) == len(esperado)
+                and list(atual.columns) == list(esperado.columns)
+                and np.allclose(atual[colunas].to_numpy(dtype=float), esperado[colunas].to_numpy(dtype=float))
+            )
+            
+            if not consistente:
+                logger.warning("Dados processados divergem do recálculo em lote.")
+            
+            return consistente
+        except Exception as e:
+            logger.error(f"Erro ao verificar dados processados: {str(e)}")
+            return False
+    
+    def load_feature_blocks(self, blocos=None):
+        """
+        Carrega blocos de features processadas ('dezena', 'freq_10', 'atraso', ...)
+        
+        Usa o cache binário por memory map quando ele corresponde ao CSV; caso
+        contrário, lê lotofacil_processed.csv e reconstrói o cache.
+        
+        Args:
+            blocos (list): Nomes dos blocos a carregar (padrão: todos)
             
-            # Verificar se o arquivo de dados processados existe
+        Returns:
+            dict: Nome do bloco -> array NumPy (somente leitura) ou None se não houver dados
+        """
+        if not self.feature_cache.is_fresh(self.processed_data_path):
             if not os.path.exists(self.processed_data_path):
                 logger.error(f"Arquivo de dados processados não encontrado: {self.processed_data_path}")
-                return None, None
+                return None
             
-            # Carregar dados
-            df = pd.read_csv(self.processed_data_path)
+            logger.info("Cache de features desatualizado. Reconstruindo a partir do CSV...")
+            df = pd.read_csv(self.processed_data_path, dtype={'data': str})
+            self.feature_cache.write(df, self.processed_data_path)
+        
+        return self.feature_cache.load(blocos)
+    
+    def create_sequence_data(self, sequence_length=5, materialize=False):
+        """
+        Cria dados de sequência para treinamento de modelos LSTM
+        
+        Args:
+            sequence_length (int): Tamanho da sequência de concursos anteriores
+            materialize (bool): Se True, retorna cópias em vez de views somente leitura
             
-            # Selecionar apenas as colunas de dezenas
-            dezenas_cols = [f'dezena_{i}' for i in range(1, 26)]
-            dezenas_df = df[dezenas_cols]
+        Returns:
+            tuple: (X, y) onde X são as sequências de entrada e y são os alvos
+        """
+        try:
+            logger.info(f"Criando dados de sequência com tamanho {sequence_length}...")
             
-            # Criar sequências
-            X = []
-            y = []
+            # Carregar apenas o bloco de dezenas (memory map do cache)
+            blocos = self.load_feature_blocks(['dezena'])
             
-            for i in range(len(dezenas_df) - sequence_length):
-                X.append(dezenas_df.iloc[i:i+sequence_length].values)
-                y.append(dezenas_df.iloc[i+sequence_length].values)
+            if blocos is None:
+                return None, None
             
-            # Converter para arrays numpy
-            X = np.array(X)
-            y = np.array(y)
+            # Criar sequências como views sobre a matriz contígua
+            X, y = sequence_windows(blocos['dezena'], sequence_length, materialize=materialize)
             
             logger.info(f"Dados de sequência criados com sucesso: X shape {X.shape}, y shape {y.shape}")
             
@@ -298,16 +662,96 @@ class LotofacilDataCollector:
             logger.error(f"Erro ao criar dados de sequência: {str(e)}")
             return None, None
     
-    def run(self):
+    def get_dataset_version(self):
+        """
+        Obtém a versão atual do histórico, para uso como chave de cache pelos consumidores
+        
+        Returns:
+            str: Versão publicada ('<último concurso>-<hash>') ou None se não houver histórico
+        """
+        try:
+            publicada = read_dataset_version(self.dataset_version_path)
+            if publicada is not None:
+                return publicada['version']
+            
+            # Versão ainda não publicada: calcular a partir do histórico local
+            if not os.path.exists(self.store_path) and not os.path.exists(self.raw_data_path):
+                return None
+            return dataset_version(LotofacilDrawStore.load_or_build(self.store_path, self.raw_data_path))
+        except Exception as e:
+            logger.error(f"Erro ao obter versão do histórico: {str(e)}")
+            return None
+    
+    def publish_shared_history(self):
+        """
+        Publica o histórico atual e sua versão para os serviços
+        
+        Returns:
+            bool: True se o histórico foi publicado com sucesso, False caso contrário
+        """
+        try:
+            store = LotofacilDrawStore.load_or_build(self.store_path, self.raw_data_path)
+            versao = SharedDrawHistory.publish(store, self.shared_history_path)
+            self.dataset_version = write_dataset_version(store, self.dataset_version_path)['version']
+            
+            logger.info(f"Histórico compartilhado na versão {versao}: {len(store)} concursos ({self.dataset_version})")
+            
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao publicar histórico compartilhado: {str(e)}")
+            return False
+    
+    def update_cooccurrence_index(self):
+        """
+        Atualiza o índice de coocorrência gravado com os concursos novos do histórico
+        
+        Returns:
+            bool: True se o índice está atualizado, False caso contrário
+        """
+        try:
+            store = LotofacilDrawStore.load_or_build(self.store_path, self.raw_data_path)
+            index = LotofacilCooccurrenceIndex.load_or_build(store, self.cooccurrence_path)
+            
+            logger.info(f"Índice de coocorrência atualizado até o concurso {index.last_concurso}")
+            
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao atualizar índice de coocorrência: {str(e)}")
+            return False
+    
+    def run(self, incremental=False):
         """
         Executa o processo completo de coleta e processamento de dados
         
+        Args:
+            incremental (bool): Se True, baixa apenas os concursos novos
+            
         Returns:
             bool: True se o processo foi concluído com sucesso, False caso contrário
         """
         try:
-            # Tentar obter dados da API
-            api_success = self.fetch_data_from_api()
+            if incremental:
+                novos = self.sync_incremental()
+                
+                # Nada mudou: evitar reprocessar os dados
+                if novos == 0 and self._processed_up_to_date():
+                    logger.info("Nenhum concurso novo. Dados processados mantidos.")
+                    self.update_cooccurrence_index()
+                    self.publish_shared_history()
+                    return True
+                
+                api_success = novos is not None
+            else:
+                # Tentar obter dados da API
+                self.last_fetch_status = None
+                api_success = self.fetch_data_from_api()
+                
+                # Histórico inalterado (304 ou corpo idêntico): evitar reprocessar os dados
+                if api_success and self.last_fetch_status != 'modified' and self._processed_up_to_date():
+                    logger.info(f"Histórico inalterado. Dados processados mantidos. Cache HTTP: {self.http_cache.stats()}")
+                    self.update_cooccurrence_index()
+                    self.publish_shared_history()
+                    return True
             
             # Se falhar, tentar obter dados da web
             if not api_success:
@@ -318,13 +762,17 @@ class LotofacilDataCollector:
                     logger.error("Falha ao obter dados da web. Processo interrompido.")
                     return False
             
-            # Processar dados para machine learning
-            ml_success = self.process_data_for_ml()
+            # Processar dados para machine learning (recalcular tudo se o histórico foi substituído)
+            ml_success = self.process_data_for_ml(incremental=incremental and api_success)
             
             if not ml_success:
                 logger.error("Falha ao processar dados para machine learning. Processo interrompido.")
                 return False
             
+            # Disponibilizar os concursos novos para os serviços em execução
+            self.update_cooccurrence_index()
+            self.publish_shared_history()
+            
             logger.info("Processo de coleta e processamento de dados concluído com sucesso.")
             return True
         except Exception as e:
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Versão endereçada por conteúdo do histórico da Lotofácil
+
+A versão do conjunto de dados combina o último concurso com um hash BLAKE2b das
+colunas do histórico (concursos, máscaras e datas): dois históricos têm a mesma
+versão se e somente se têm o mesmo conteúdo. O coletor a publica junto com o
+histórico e os consumidores (features, modelos, ciclos, previsões) registram em
+um manifesto a versão a partir da qual cada etapa foi calculada, podendo pular a
+etapa enquanto essa versão continuar atual.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+import numpy as np
+from datetime import datetime
+
+logger = logging.getLogger('dataset_version')
+
+# Caminho padrão da versão publicada pelo coletor
+DATASET_VERSION_PATH = '/home/ubuntu/lotofacil/data/historico/lotofacil_version.json'
+
+
+def _write_json(path, conteudo):
+    """Grava um arquivo JSON de forma atômica"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(conteudo, f, ensure_ascii=False, indent=4)
+    os.replace(tmp_path, path)
+
+
+def dataset_version(store):
+    """
+    Calcula a versão de um histórico
+    
+    Args:
+        store (LotofacilDrawStore): Histórico de sorteios
+    
+    Returns:
+        str: Versão no formato '<último concurso>-<hash>'
+    """
+    h = hashlib.blake2b(digest_size=12)
+    for coluna in (store.concursos, store.masks, store.datas):
+        h.update(np.ascontiguousarray(coluna, dtype='<u4').data)
+    
+    return f"{store.last_concurso or 0}-{h.hexdigest()}"
+
+
+def write_dataset_version(store, path=DATASET_VERSION_PATH):
+    """
+    Publica a versão de um histórico
+    
+    Args:
+        store (LotofacilDrawStore): Histórico de sorteios
+        path (str): Caminho do arquivo de versão
+    
+    Returns:
+        dict: Versão publicada (version, concurso, size, updated_at)
+    """
+    versao = dataset_version(store)
+    
+    atual = read_dataset_version(path)
+    if atual is not None and atual['version'] == versao:
+        return atual
+    
+    conteudo = {
+        'version': versao,
+        'concurso': store.last_concurso,
+        'size': len(store),
+        'updated_at': datetime.now().isoformat()
+    }
+    _write_json(path, conteudo)
+    
+    logger.info(f"Versão do histórico publicada: {versao}")
+    
+    return conteudo
+
+
+def read_dataset_version(path=DATASET_VERSION_PATH):
+    """
+    Lê a versão publicada do histórico
+    
+    Args:
+        path (str): Caminho do arquivo de versão
+    
+    Returns:
+        dict: Versão publicada ou None se não existir
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"Versão do histórico inválida em {path}: {str(e)}")
+        return None
+
+
+class VersionedCache:
+    """Manifesto das etapas calculadas e da versão do histórico usada em cada uma"""
+    
+    def __init__(self, manifest_path):
+        """
+        Inicializa o manifesto
+        
+        Args:
+            manifest_path (str): Caminho do arquivo JSON do manifesto
+        """
+        self.manifest_path = manifest_path
+        self._lock = threading.Lock()
+    
+    def _read(self):
+        """Lê o manifesto completo"""
+        if not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Manifesto de versões inválido em {self.manifest_path}: {str(e)}")
+            return {}
+    
+    def get(self, etapa):
+        """
+        Obtém o registro de uma etapa
+        
+        Args:
+            etapa (str): Nome da etapa (ex.: 'features', 'model', 'predictions')
+        
+        Returns:
+            dict: Registro (dataset_version, params, updated_at, ...) ou None
+        """
+        return self._read().get(etapa)
+    
+    def is_current(self, etapa, versao, params=None):
+        """
+        Verifica se uma etapa foi calculada a partir da versão informada
+        
+        Args:
+            etapa (str): Nome da etapa
+            versao (str): Versão atual do histórico
+            params (dict): Parâmetros que também determinam o resultado da etapa
+        
+        Returns:
+            bool: True se a etapa pode ser reaproveitada
+        """
+        if versao is None:
+            return False
+        registro = self.get(etapa)
+        # Comparar como gravado em JSON (tuplas viram listas)
+        return (registro is not None
+                and registro.get('dataset_version') == versao
+                and registro.get('params') == json.loads(json.dumps(params or {})))
+    
+    def mark(self, etapa, versao, params=None, **info):
+        """
+        Registra que uma etapa foi calculada a partir de uma versão
+        
+        Args:
+            etapa (str): Nome da etapa
+            versao (str): Versão do histórico usada
+            params (dict): Parâmetros que também determinam o resultado da etapa
+            **info: Informações adicionais guardadas no registro
+        
+        Returns:
+            dict: Registro gravado
+        """
+        registro = dict(info, dataset_version=versao, params=params or {},
+                        updated_at=datetime.now().isoformat())
+        with self._lock:
+            manifesto = self._read()
+            manifesto[etapa] = registro
+            _write_json(self.manifest_path, manifesto)
+        return registro
+    
+    def invalidate(self, etapa=None):
+        """
+        Remove o registro de uma etapa (ou de todas)
+        
+        Args:
+            etapa (str): Nome da etapa (None para todas)
+        """
+        with self._lock:
+            manifesto = self._read() if etapa is not None else {}
+            manifesto.pop(etapa, None)
+            _write_json(self.manifest_path, manifesto)
@@ -0,0 +1,573 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Armazenamento compacto do histórico de sorteios da Lotofácil
+
+Cada sorteio é guardado como uma máscara de 25 bits (bit i = dezena i + 1) em um
+array NumPy uint32 contíguo, indexado pelo número do concurso. O formato em disco
+é um cabeçalho fixo seguido de registros de 12 bytes (concurso, máscara, data).
+"""
+
+import os
+import struct
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger('draw_store')
+
+# Parâmetros do jogo
+NUM_DEZENAS = 25
+DEZENAS_POR_SORTEIO = 15
+
+# Potências de 2 de cada dezena (bit 0 = dezena 1)
+BITS_DEZENAS = np.left_shift(np.uint32(1), np.arange(NUM_DEZENAS, dtype=np.uint32))
+
+# Valores das dezenas (1 a 25)
+VALORES_DEZENAS = np.arange(1, NUM_DEZENAS + 1, dtype=np.int64)
+
+# Máscara com todas as dezenas pares
+MASCARA_PARES = int(BITS_DEZENAS[1::2].sum())
+
+# Moldura do volante 5x5 (as 16 dezenas das bordas); as 9 restantes formam o centro
+MOLDURA = (1, 2, 3, 4, 5, 6, 10, 11, 15, 16, 20, 21, 22, 23, 24, 25)
+MASCARA_MOLDURA = int(BITS_DEZENAS[[d - 1 for d in MOLDURA]].sum())
+
+# Tabela de popcount para 16 bits (usada quando np.bitwise_count não está disponível)
+_POPCOUNT_16 = np.array([bin(i).count('1') for i in range(1 << 16)], dtype=np.uint8)
+
+
+def popcount(valores):
+    """
+    Conta os bits ligados de cada elemento de um array de máscaras
+    
+    Args:
+        valores (numpy.ndarray): Array de máscaras uint32
+    
+    Returns:
+        numpy.ndarray: Array uint8 com a quantidade de bits ligados
+    """
+    valores = np.asarray(valores, dtype=np.uint32)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(valores)
+    return _POPCOUNT_16[valores & 0xFFFF] + _POPCOUNT_16[valores >> 16]
+
+
+def dezenas_to_mask(dezenas):
+    """
+    Converte uma lista de dezenas em máscara de bits
+    
+    Args:
+        dezenas (list): Dezenas entre 1 e 25 (int ou str)
+    
+    Returns:
+        int: Máscara de 25 bits
+    """
+    mascara = 0
+    for dezena in dezenas:
+        mascara |= 1 << (int(dezena) - 1)
+    return mascara
+
+
+def mask_to_dezenas(mascara):
+    """
+    Converte uma máscara de bits em lista ordenada de dezenas
+    
+    Args:
+        mascara (int): Máscara de 25 bits
+    
+    Returns:
+        list: Dezenas sorteadas em ordem crescente
+    """
+    mascara = int(mascara)
+    return [i + 1 for i in range(NUM_DEZENAS) if (mascara >> i) & 1]
+
+
+def masks_to_matrix(mascaras, dtype=np.uint8):
+    """
+    Expande um array de máscaras na matriz indicadora (n_sorteios x 25)
+    
+    Args:
+        mascaras (numpy.ndarray): Array de máscaras uint32
+        dtype: Tipo da matriz resultante
+    
+    Returns:
+        numpy.ndarray: Matriz com 1 na coluna j se a dezena j + 1 foi sorteada
+    """
+    mascaras = np.asarray(mascaras, dtype=np.uint32)
+    matriz = (mascaras[:, None] >> np.arange(NUM_DEZENAS, dtype=np.uint32)) & np.uint32(1)
+    return matriz.astype(dtype, copy=False)
+
+
+def matrix_to_masks(matriz):
+    """
+    Compacta uma matriz indicadora (n_sorteios x 25) em máscaras de bits
+    
+    Args:
+        matriz (numpy.ndarray): Matriz indicadora
+    
+    Returns:
+        numpy.ndarray: Array de máscaras uint32
+    """
+    matriz = np.asarray(matriz).astype(np.uint32, copy=False)
+    return (matriz * BITS_DEZENAS).sum(axis=1, dtype=np.uint32)
+
+
+def parse_dezenas_column(dezenas):
+    """
+    Converte a coluna 'dezenas' do CSV (ex.: "01,02,...") em máscaras, de uma só vez
+    
+    Args:
+        dezenas (pandas.Series): Série de strings separadas por vírgula
+    
+    Returns:
+        numpy.ndarray: Array de máscaras uint32
+    """
+    if len(dezenas) == 0:
+        return np.zeros(0, dtype=np.uint32)
+    
+    valores = dezenas.astype(str).str.split(',', expand=True).astype(np.int64).to_numpy()
+    return np.bitwise_or.reduce(np.left_shift(np.uint32(1), (valores - 1).astype(np.uint32)), axis=1)
+
+
+def encode_data(data):
+    """
+    Converte uma data 'dd/mm/aaaa' em inteiro aaaammdd (0 se ausente ou inválida)
+    
+    Args:
+        data (str): Data do concurso
+    
+    Returns:
+        int: Data codificada
+    """
+    try:
+        dia, mes, ano = str(data).split('/')
+        return int(ano) * 10000 + int(mes) * 100 + int(dia)
+    except (ValueError, AttributeError):
+        return 0
+
+
+def decode_data(valor):
+    """
+    Converte um inteiro aaaammdd de volta para 'dd/mm/aaaa'
+    
+    Args:
+        valor (int): Data codificada
+    
+    Returns:
+        str: Data formatada ou None se ausente
+    """
+    valor = int(valor)
+    if valor == 0:
+        return None
+    return f"{valor % 100:02d}/{(valor // 100) % 100:02d}/{valor // 10000}"
+
+
+class LotofacilDrawStore:
+    """Histórico de sorteios da Lotofácil em máscaras de bits"""
+    
+    # Formato do arquivo: magic, versão, reservado, número de registros
+    MAGIC = b'LTFD'
+    VERSAO = 1
+    HEADER = struct.Struct('<4sHHI')
+    REGISTRO = np.dtype([('concurso', '<u4'), ('mascara', '<u4'), ('data', '<u4')])
+    
+    def __init__(self, path=None):
+        """
+        Inicializa um histórico vazio
+        
+        Args:
+            path (str): Caminho do arquivo binário associado (opcional)
+        """
+        self.path = path
+        
+        # Quantidade de registros já gravados em self.path
+        self._persisted = 0
+        
+        # Arrays contíguos (apenas os primeiros self._size elementos são válidos)
+        self._size = 0
+        self._concursos = np.zeros(0, dtype=np.uint32)
+        self._masks = np.zeros(0, dtype=np.uint32)
+        self._datas = np.zeros(0, dtype=np.uint32)
+    
+    def __len__(self):
+        return self._size
+    
+    @property
+    def concursos(self):
+        """numpy.ndarray: Números dos concursos em ordem crescente"""
+        return self._concursos[:self._size]
+    
+    @property
+    def masks(self):
+        """numpy.ndarray: Máscaras de bits dos sorteios, alinhadas a concursos"""
+        return self._masks[:self._size]
+    
+    @property
+    def datas(self):
+        """numpy.ndarray: Datas codificadas como aaaammdd"""
+        return self._datas[:self._size]
+    
+    @property
+    def last_concurso(self):
+        """int: Último concurso armazenado (None se vazio)"""
+        return int(self._concursos[self._size - 1]) if self._size else None
+    
+    def index(self, concurso):
+        """
+        Obtém a posição de um concurso no histórico
+        
+        Args:
+            concurso (int): Número do concurso
+        
+        Returns:
+            int: Posição do concurso ou None se não existir
+        """
+        pos = int(np.searchsorted(self.concursos, concurso))
+        if pos < self._size and self._concursos[pos] == concurso:
+            return pos
+        return None
+    
+    def get(self, concurso):
+        """
+        Obtém a máscara de um concurso
+        
+        Args:
+            concurso (int): Número do concurso
+        
+        Returns:
+            int: Máscara de bits ou None se o concurso não existir
+        """
+        pos = self.index(concurso)
+        return None if pos is None else int(self._masks[pos])
+    
+    def dezenas(self, concurso):
+        """
+        Obtém as dezenas sorteadas em um concurso
+        
+        Args:
+            concurso (int): Número do concurso
+        
+        Returns:
+            list: Dezenas sorteadas ou None se o concurso não existir
+        """
+        mascara = self.get(concurso)
+        return None if mascara is None else mask_to_dezenas(mascara)
+    
+    def data_str(self, pos):
+        """
+        Obtém a data de um sorteio pela posição
+        
+        Args:
+            pos (int): Posição no histórico
+        
+        Returns:
+            str: Data no formato 'dd/mm/aaaa'
+        """
+        return decode_data(self._datas[pos])
+    
+    def _reserve(self, capacidade):
+        """Garante capacidade nos arrays internos (crescimento geométrico)"""
+        if capacidade <= len(self._masks):
+            return
+        
+        nova = max(capacidade, 2 * len(self._masks), 64)
+        for nome in ('_concursos', '_masks', '_datas'):
+            antigo = getattr(self, nome)
+            novo = np.zeros(nova, dtype=np.uint32)
+            novo[:self._size] = antigo[:self._size]
+            setattr(self, nome, novo)
+    
+    def extend(self, concursos, mascaras, datas=None):
+        """
+        Acrescenta sorteios ao final do histórico
+        
+        Concursos já armazenados ou fora de ordem são descartados.
+        
+        Args:
+            concursos (array-like): Números dos concursos
+            mascaras (array-like): Máscaras de bits
+            datas (array-like): Datas codificadas como aaaammdd (opcional)
+        
+        Returns:
+            int: Quantidade de sorteios acrescentados
+        """
+        concursos = np.asarray(concursos, dtype=np.uint32)
+        mascaras = np.asarray(mascaras, dtype=np.uint32)
+        datas = np.zeros(len(concursos), dtype=np.uint32) if datas is None else np.asarray(datas, dtype=np.uint32)
+        
+        if len(concursos) == 0:
+            return 0
+        
+        # Ordenar e manter apenas concursos novos e únicos
+        ordem = np.argsort(concursos, kind='stable')
+        concursos, mascaras, datas = concursos[ordem], mascaras[ordem], datas[ordem]
+        novos = np.ones(len(concursos), dtype=bool)
+        novos[1:] = concursos[1:] != concursos[:-1]
+        if self._size:
+            novos &= concursos > self._concursos[self._size - 1]
+        concursos, mascaras, datas = concursos[novos], mascaras[novos], datas[novos]
+        
+        n = len(concursos)
+        if n == 0:
+            return 0
+        
+        self._reserve(self._size + n)
+        self._concursos[self._size:self._size + n] = concursos
+        self._masks[self._size:self._size + n] = mascaras
+        self._datas[self._size:self._size + n] = datas
+        self._size += n
+        
+        return n
+    
+    def append(self, concurso, dezenas, data=None):
+        """
+        Acrescenta um sorteio ao final do histórico
+        
+        Args:
+            concurso (int): Número do concurso
+            dezenas (list or int): Dezenas sorteadas ou máscara já calculada
+            data (str): Data no formato 'dd/mm/aaaa' (opcional)
+        
+        Returns:
+            bool: True se o sorteio foi acrescentado, False se já existia
+        """
+        mascara = dezenas if isinstance(dezenas, (int, np.integer)) else dezenas_to_mask(dezenas)
+        return self.extend([concurso], [mascara], [encode_data(data)]) == 1
+    
+    def indicator_matrix(self, dtype=np.uint8):
+        """
+        Obtém a matriz indicadora (n_sorteios x 25) do histórico
+        
+        Args:
+            dtype: Tipo da matriz resultante
+        
+        Returns:
+            numpy.ndarray: Matriz indicadora
+        """
+        return masks_to_matrix(self.masks, dtype=dtype)
+    
+    def estatisticas(self):
+        """
+        Calcula pares, ímpares e soma de cada sorteio
+        
+        Returns:
+            tuple: (pares, impares, soma) como arrays NumPy
+        """
+        pares = popcount(self.masks & np.uint32(MASCARA_PARES)).astype(np.int64)
+        quantidade = popcount(self.masks).astype(np.int64)
+        soma = self.indicator_matrix(dtype=np.int64) @ VALORES_DEZENAS
+        return pares, quantidade - pares, soma
+    
+    def to_dataframe(self, inicio=0, fim=None):
+        """
+        Converte o histórico (ou as posições inicio..fim-1) para o formato de lotofacil_raw.csv
+        
+        Args:
+            inicio (int): Primeira posição
+            fim (int): Posição final exclusiva (padrão: fim do histórico)
+        
+        Returns:
+            pandas.DataFrame: DataFrame com concurso, data, dezenas, pares, impares e soma
+        """
+        fim = len(self) if fim is None else fim
+        mascaras = self.masks[inicio:fim]
+        
+        pares = popcount(mascaras & np.uint32(MASCARA_PARES)).astype(np.int64)
+        quantidade = popcount(mascaras).astype(np.int64)
+        soma = masks_to_matrix(mascaras, dtype=np.int64) @ VALORES_DEZENAS
+        
+        return pd.DataFrame({
+            'concurso': self.concursos[inicio:fim].astype(np.int64),
+            'data': [decode_data(d) for d in self.datas[inicio:fim]],
+            'dezenas': [','.join(f'{d:02d}' for d in mask_to_dezenas(m)) for m in mascaras],
+            'pares': pares,
+            'impares': quantidade - pares,
+            'soma': soma
+        })
+    
+    def to_csv(self, csv_path, inicio=0, append=False, bloco=4096):
+        """
+        Grava o histórico no formato de lotofacil_raw.csv, em blocos de linhas
+        
+        Args:
+            csv_path (str): Caminho do CSV
+            inicio (int): Primeira posição a gravar
+            append (bool): Se True, acrescenta ao final do CSV existente
+            bloco (int): Linhas convertidas por vez (limita a memória usada)
+        """
+        cabecalho = not (append and os.path.exists(csv_path))
+        modo = 'a' if append else 'w'
+        
+        if inicio >= len(self):
+            if not append:
+                self.to_dataframe(0, 0).to_csv(csv_path, index=False)
+            return
+        
+        for pos in range(inicio, len(self), bloco):
+            self.to_dataframe(pos, min(pos + bloco, len(self))).to_csv(csv_path, mode=modo, header=cabecalho, index=False)
+            cabecalho = False
+            modo = 'a'
+    
+    @classmethod
+    def from_dataframe(cls, df, path=None):
+        """
+        Cria o histórico a partir de um DataFrame no formato de lotofacil_raw.csv
+        
+        Args:
+            df (pandas.DataFrame): DataFrame com as colunas 'concurso' e 'dezenas'
+            path (str): Caminho do arquivo binário associado (opcional)
+        
+        Returns:
+            LotofacilDrawStore: Histórico carregado
+        """
+        store = cls(path)
+        if 'data' in df.columns:
+            datas = [encode_data(d) for d in df['data']]
+        else:
+            datas = None
+        store.extend(df['concurso'].to_numpy(), parse_dezenas_column(df['dezenas']), datas)
+        return store
+    
+    @classmethod
+    def from_csv(cls, csv_path, path=None):
+        """
+        Cria o histórico a partir de lotofacil_raw.csv
+        
+        Args:
+            csv_path (str): Caminho do CSV
+            path (str): Caminho do arquivo binário associado (opcional)
+        
+        Returns:
+            LotofacilDrawStore: Histórico carregado
+        """
+        df = pd.read_csv(csv_path, dtype={'dezenas': str, 'data': str})
+        return cls.from_dataframe(df, path)
+    
+    def save(self, path=None):
+        """
+        Grava o histórico em disco de forma atômica
+        
+        Args:
+            path (str): Caminho do arquivo (padrão: self.path)
+        
+        Returns:
+            str: Caminho do arquivo gravado
+        """
+        path = path or self.path
+        if path is None:
+            raise ValueError("Caminho do histórico binário não definido")
+        
+        registros = np.empty(self._size, dtype=self.REGISTRO)
+        registros['concurso'] = self.concursos
+        registros['mascara'] = self.masks
+        registros['data'] = self.datas
+        
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(self.HEADER.pack(self.MAGIC, self.VERSAO, 0, self._size))
+            f.write(registros.tobytes())
+        os.replace(tmp_path, path)
+        
+        self.path = path
+        self._persisted = self._size
+        logger.info(f"Histórico binário salvo em {path}: {self._size} concursos")
+        
+        return path
+    
+    def flush(self):
+        """
+        Grava em disco apenas os sorteios acrescentados desde a última gravação
+        
+        Os registros novos são escritos no fim do arquivo e só depois o contador do
+        cabeçalho é atualizado, de modo que uma interrupção no meio da escrita não
+        corrompe os registros anteriores.
+        
+        Returns:
+            int: Quantidade de registros gravados
+        """
+        if self.path is None:
+            raise ValueError("Caminho do histórico binário não definido")
+        
+        novos = self._size - self._persisted
+        if novos == 0:
+            return 0
+        
+        if self._persisted == 0 or not os.path.exists(self.path):
+            self.save()
+            return novos
+        
+        registros = np.empty(novos, dtype=self.REGISTRO)
+        registros['concurso'] = self._concursos[self._persisted:self._size]
+        registros['mascara'] = self._masks[self._persisted:self._size]
+        registros['data'] = self._datas[self._persisted:self._size]
+        
+        with open(self.path, 'r+b') as f:
+            f.seek(self.HEADER.size + self._persisted * self.REGISTRO.itemsize)
+            f.write(registros.tobytes())
+            f.truncate()
+            f.flush()
+            f.seek(0)
+            f.write(self.HEADER.pack(self.MAGIC, self.VERSAO, 0, self._size))
+        
+        self._persisted = self._size
+        logger.info(f"{novos} concursos acrescentados ao histórico binário {self.path}")
+        
+        return novos
+    
+    @classmethod
+    def load(cls, path):
+        """
+        Carrega o histórico de um arquivo binário
+        
+        Args:
+            path (str): Caminho do arquivo
+        
+        Returns:
+            LotofacilDrawStore: Histórico carregado
+        """
+        with open(path, 'rb') as f:
+            magic, versao, _, total = cls.HEADER.unpack(f.read(cls.HEADER.size))
+            if magic != cls.MAGIC or versao != cls.VERSAO:
+                raise ValueError(f"Arquivo de histórico inválido: {path}")
+            registros = np.fromfile(f, dtype=cls.REGISTRO, count=total)
+        
+        if len(registros) != total:
+            raise ValueError(f"Arquivo de histórico truncado: {path}")
+        
+        store = cls(path)
+        store._concursos = np.ascontiguousarray(registros['concurso'])
+        store._masks = np.ascontiguousarray(registros['mascara'])
+        store._datas = np.ascontiguousarray(registros['data'])
+        store._size = total
+        store._persisted = total
+        
+        return store
+    
+    @classmethod
+    def load_or_build(cls, path, csv_path):
+        """
+        Carrega o histórico binário, reconstruindo-o a partir do CSV se estiver desatualizado
+        
+        Args:
+            path (str): Caminho do arquivo binário
+            csv_path (str): Caminho de lotofacil_raw.csv
+        
+        Returns:
+            LotofacilDrawStore: Histórico carregado ou None se não houver dados
+        """
+        binario_existe = os.path.exists(path)
+        csv_existe = os.path.exists(csv_path)
+        
+        if binario_existe and (not csv_existe or os.path.getmtime(path) >= os.path.getmtime(csv_path)):
+            return cls.load(path)
+        
+        if not csv_existe:
+            return None
+        
+        logger.info(f"Reconstruindo histórico binário a partir de {csv_path}")
+        store = cls.from_csv(csv_path, path)
+        store.save()
+        
+        return store
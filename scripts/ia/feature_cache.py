@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cache binário colunar das features processadas da Lotofácil
+
+Cada bloco de features (dezena, freq_10, freq_30, atraso, ...) é gravado em um
+arquivo .npy próprio, que pode ser aberto por memory map. Um cabeçalho JSON
+registra as colunas de cada bloco e o tamanho/data de modificação do CSV de
+origem, permitindo saber se o cache ainda corresponde a lotofacil_processed.csv.
+"""
+
+import os
+import io
+import json
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger('feature_cache')
+
+# Colunas de identificação e estatísticas de cada sorteio
+COLUNAS_META = ['concurso', 'pares', 'impares', 'soma']
+
+# Tipos dos blocos de features (demais blocos usam float64)
+TIPOS_BLOCOS = {
+    'meta': np.int64,
+    'dezena': np.uint8,
+    'atraso': np.int64
+}
+
+
+def agrupar_colunas(colunas):
+    """
+    Agrupa as colunas de lotofacil_processed.csv em blocos
+    
+    Colunas no formato '<prefixo>_<dezena>' formam o bloco '<prefixo>'
+    (ex.: freq_10_1 ... freq_10_25 -> 'freq_10').
+    
+    Args:
+        colunas (list): Nomes das colunas
+    
+    Returns:
+        dict: Nome do bloco -> lista de colunas
+    """
+    blocos = {'meta': [c for c in COLUNAS_META if c in colunas]}
+    if 'data' in colunas:
+        blocos['data'] = ['data']
+    
+    for coluna in colunas:
+        if coluna in COLUNAS_META or coluna == 'data':
+            continue
+        prefixo = coluna.rsplit('_', 1)[0]
+        blocos.setdefault(prefixo, []).append(coluna)
+    
+    return blocos
+
+
+class ProcessedFeatureCache:
+    """Classe para o cache colunar das features processadas"""
+    
+    VERSAO = 1
+    
+    def __init__(self, cache_dir):
+        """
+        Inicializa o cache
+        
+        Args:
+            cache_dir (str): Diretório dos arquivos .npy e do cabeçalho
+        """
+        self.cache_dir = cache_dir
+        self.header_path = os.path.join(cache_dir, 'header.json')
+    
+    def _block_path(self, nome):
+        """Caminho do arquivo .npy de um bloco"""
+        return os.path.join(self.cache_dir, f'{nome}.npy')
+    
+    def _fonte(self, csv_path):
+        """Identificação do CSV de origem (tamanho e data de modificação)"""
+        stat = os.stat(csv_path)
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    
+    def header(self):
+        """
+        Lê o cabeçalho do cache
+        
+        Returns:
+            dict: Cabeçalho ou None se o cache não existir
+        """
+        if not os.path.exists(self.header_path):
+            return None
+        with open(self.header_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def _write_header(self, colunas, linhas, csv_path):
+        """Grava o cabeçalho de forma atômica (o cache só é válido depois dele)"""
+        header = {
+            'versao': self.VERSAO,
+            'linhas': linhas,
+            'colunas': colunas,
+            'blocos': agrupar_colunas(colunas),
+            'fonte': self._fonte(csv_path)
+        }
+        tmp_path = f"{self.header_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(header, f, ensure_ascii=False)
+        os.replace(tmp_path, self.header_path)
+    
+    def _invalidate(self):
+        """Remove o cabeçalho, invalidando o cache antes de alterar os blocos"""
+        if os.path.exists(self.header_path):
+            os.remove(self.header_path)
+    
+    def is_fresh(self, csv_path):
+        """
+        Verifica se o cache corresponde ao CSV de origem
+        
+        Args:
+            csv_path (str): Caminho de lotofacil_processed.csv
+        
+        Returns:
+            bool: True se o cache pode ser usado no lugar do CSV
+        """
+        try:
+            header = self.header()
+            if header is None or header.get('versao') != self.VERSAO or not os.path.exists(csv_path):
+                return False
+            return header['fonte'] == self._fonte(csv_path)
+        except Exception as e:
+            logger.warning(f"Cabeçalho do cache inválido: {str(e)}")
+            return False
+    
+    def _block_array(self, df, nome, colunas):
+        """Converte as colunas de um bloco em array NumPy com o tipo do bloco"""
+        if nome == 'data':
+            return df['data'].fillna('').astype(str).to_numpy(dtype='U10')
+        return np.ascontiguousarray(df[colunas].to_numpy(dtype=TIPOS_BLOCOS.get(nome, np.float64)))
+    
+    def write(self, df, csv_path):
+        """
+        Grava todas as features no cache
+        
+        Args:
+            df (pandas.DataFrame): Features no formato de lotofacil_processed.csv
+            csv_path (str): Caminho do CSV correspondente (já gravado)
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._invalidate()
+        
+        blocos = agrupar_colunas(list(df.columns))
+        for nome, colunas in blocos.items():
+            np.save(self._block_path(nome), self._block_array(df, nome, colunas))
+        
+        self._write_header(list(df.columns), len(df), csv_path)
+        logger.info(f"Cache de features gravado em {self.cache_dir}: {len(df)} linhas")
+    
+    def _append_block(self, nome, array):
+        """
+        Acrescenta linhas a um .npy existente, reescrevendo apenas o cabeçalho do arquivo
+        
+        Returns:
+            bool: True se foi possível acrescentar no próprio arquivo
+        """
+        path = self._block_path(nome)
+        with open(path, 'r+b') as f:
+            versao = np.lib.format.read_magic(f)
+            if versao != (1, 0):
+                return False
+            shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            inicio_dados = f.tell()
+            if fortran or dtype != array.dtype or shape[1:] != array.shape[1:]:
+                return False
+            
+            # O novo cabeçalho precisa ocupar exatamente o mesmo espaço
+            novo = io.BytesIO()
+            np.lib.format.write_array_header_1_0(novo, {
+                'descr': np.lib.format.dtype_to_descr(dtype),
+                'fortran_order': False,
+                'shape': (shape[0] + len(array),) + shape[1:]
+            })
+            if len(novo.getvalue()) != inicio_dados:
+                return False
+            
+            f.seek(inicio_dados + shape[0] * dtype.itemsize * int(np.prod(shape[1:], dtype=np.int64)))
+            f.write(np.ascontiguousarray(array).tobytes())
+            f.truncate()
+            f.seek(0)
+            f.write(novo.getvalue())
+        
+        return True
+    
+    def append(self, df_novos, csv_path):
+        """
+        Acrescenta linhas novas ao cache, se ele estava atualizado antes do CSV receber as mesmas linhas
+        
+        Args:
+            df_novos (pandas.DataFrame): Linhas acrescentadas ao CSV
+            csv_path (str): Caminho do CSV correspondente (já atualizado)
+        
+        Returns:
+            bool: True se o cache foi atualizado; False se precisa ser reconstruído
+        """
+        header = self.header()
+        if header is None or header['colunas'] != list(df_novos.columns):
+            return False
+        
+        self._invalidate()
+        for nome, colunas in header['blocos'].items():
+            if not self._append_block(nome, self._block_array(df_novos, nome, colunas)):
+                return False
+        
+        self._write_header(header['colunas'], header['linhas'] + len(df_novos), csv_path)
+        return True
+    
+    def load(self, blocos=None, mmap=True):
+        """
+        Abre os blocos do cache
+        
+        Args:
+            blocos (list): Nomes dos blocos a abrir (padrão: todos)
+            mmap (bool): Se True, abre os arquivos por memory map (somente leitura)
+        
+        Returns:
+            dict: Nome do bloco -> array NumPy
+        """
+        header = self.header()
+        nomes = blocos if blocos is not None else list(header['blocos'])
+        modo = 'r' if mmap else None
+        return {nome: np.load(self._block_path(nome), mmap_mode=modo) for nome in nomes}
+    
+    def load_frame(self):
+        """
+        Reconstrói o DataFrame completo a partir do cache
+        
+        Returns:
+            pandas.DataFrame: Features no formato de lotofacil_processed.csv
+        """
+        header = self.header()
+        partes = []
+        for nome, array in self.load(mmap=False).items():
+            partes.append(pd.DataFrame(array.reshape(len(array), -1), columns=header['blocos'][nome]))
+        return pd.concat(partes, axis=1)[header['colunas']]
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Construção vetorizada das features de machine learning da Lotofácil
+
+Todas as features são derivadas da matriz indicadora (n_sorteios x 25) obtida das
+máscaras de bits do histórico, sem percorrer linhas ou colunas em Python.
+"""
+
+import os
+import logging
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from draw_store import NUM_DEZENAS, masks_to_matrix
+from windowed_counter import WindowedCounter
+
+logger = logging.getLogger('feature_engine')
+
+# Janelas padrão das frequências móveis
+JANELAS_PADRAO = (10, 30)
+
+
+def rolling_frequency(matriz, janela):
+    """
+    Calcula a frequência móvel de cada dezena (equivalente a rolling(janela, min_periods=1).mean())
+    
+    Args:
+        matriz (numpy.ndarray): Matriz indicadora (n_sorteios x 25)
+        janela (int): Tamanho da janela em concursos
+    
+    Returns:
+        numpy.ndarray: Matriz float64 (n_sorteios x 25) com as frequências
+    """
+    n = len(matriz)
+    acumulado = np.zeros((n + 1, matriz.shape[1]), dtype=np.int64)
+    np.cumsum(matriz, axis=0, out=acumulado[1:])
+    
+    fim = np.arange(1, n + 1)
+    inicio = np.maximum(fim - janela, 0)
+    somas = acumulado[fim] - acumulado[inicio]
+    
+    return somas / (fim - inicio)[:, None]
+
+
+def atraso_matrix(matriz):
+    """
+    Calcula o atraso de cada dezena: concursos desde a última aparição (0 se sorteada)
+    
+    Dezenas que ainda não apareceram contam o número de concursos desde o início.
+    
+    Args:
+        matriz (numpy.ndarray): Matriz indicadora (n_sorteios x 25)
+    
+    Returns:
+        numpy.ndarray: Matriz int64 (n_sorteios x 25) com os atrasos
+    """
+    n = len(matriz)
+    indices = np.arange(n, dtype=np.int64)[:, None]
+    
+    # Índice da última aparição de cada dezena até cada concurso (-1 se nunca)
+    ultima = np.where(matriz.astype(bool), indices, -1)
+    np.maximum.accumulate(ultima, axis=0, out=ultima)
+    
+    return indices - ultima
+
+
+def sequence_windows(matriz, sequence_length, materialize=False):
+    """
+    Cria as janelas de sequência (X, y) para o LSTM sem copiar os dados
+    
+    X[i] corresponde às linhas i..i+sequence_length-1 da matriz e y[i] à linha
+    seguinte. Ambos são views somente leitura sobre a mesma matriz contígua, de modo
+    que a memória usada é O(n) independentemente de sequence_length.
+    
+    Args:
+        matriz (numpy.ndarray): Matriz (n_sorteios x n_features)
+        sequence_length (int): Tamanho da sequência de concursos anteriores
+        materialize (bool): Se True, retorna cópias contíguas e graváveis
+    
+    Returns:
+        tuple: (X, y) com formatos (n - sequence_length, sequence_length, n_features)
+            e (n - sequence_length, n_features)
+    """
+    matriz = np.ascontiguousarray(matriz)
+    n, n_features = matriz.shape
+    
+    if n <= sequence_length:
+        X = np.empty((0, sequence_length, n_features), dtype=matriz.dtype)
+        y = np.empty((0, n_features), dtype=matriz.dtype)
+        return X, y
+    
+    # sliding_window_view coloca a janela no último eixo: (n - L, n_features, L)
+    X = sliding_window_view(matriz[:-1], sequence_length, axis=0).transpose(0, 2, 1)
+    y = matriz[sequence_length:].view()
+    y.flags.writeable = False
+    
+    if materialize:
+        # copy() e não ascontiguousarray: uma janela já contígua (sequence_length = 1) voltaria como view
+        return X.copy(), y.copy()
+    
+    return X, y
+
+
+class LotofacilFeatureEngine:
+    """Classe para construção em lote das features de machine learning"""
+    
+    def __init__(self, janelas=JANELAS_PADRAO):
+        """
+        Inicializa o construtor de features
+        
+        Args:
+            janelas (tuple): Janelas das frequências móveis
+        """
+        self.janelas = tuple(janelas)
+    
+    def columns(self):
+        """
+        Obtém os nomes das colunas de features, na ordem de lotofacil_processed.csv
+        
+        Returns:
+            list: Nomes das colunas
+        """
+        dezenas = range(1, NUM_DEZENAS + 1)
+        colunas = ['concurso', 'data'] + [f'dezena_{i}' for i in dezenas] + ['pares', 'impares', 'soma']
+        for janela in self.janelas:
+            colunas += [f'freq_{janela}_{i}' for i in dezenas]
+        colunas += [f'atraso_{i}' for i in dezenas]
+        return colunas
+    
+    def build_blocks(self, mascaras):
+        """
+        Calcula os blocos de features a partir das máscaras dos sorteios
+        
+        Args:
+            mascaras (numpy.ndarray): Máscaras de bits em ordem de concurso
+        
+        Returns:
+            dict: Blocos (n_sorteios x 25) 'dezenas', 'freq_<janela>' e 'atraso'
+        """
+        matriz = masks_to_matrix(mascaras, dtype=np.int64)
+        
+        blocos = {'dezenas': matriz}
+        for janela in self.janelas:
+            blocos[f'freq_{janela}'] = rolling_frequency(matriz, janela)
+        blocos['atraso'] = atraso_matrix(matriz)
+        
+        return blocos
+    
+    def frame(self, store, blocos, inicio=0):
+        """
+        Monta o DataFrame de features para os sorteios a partir da posição inicio
+        
+        Args:
+            store (LotofacilDrawStore): Histórico de sorteios
+            blocos (dict): Blocos calculados para as posições inicio..len(store)-1
+            inicio (int): Posição do primeiro sorteio dos blocos
+        
+        Returns:
+            pandas.DataFrame: Features no formato de lotofacil_processed.csv
+        """
+        matriz = blocos['dezenas']
+        dezenas = range(1, NUM_DEZENAS + 1)
+        
+        # Estatísticas dos sorteios
+        pares = matriz[:, 1::2].sum(axis=1)
+        soma = matriz @ np.arange(1, NUM_DEZENAS + 1)
+        impares = matriz.sum(axis=1) - pares
+        
+        partes = [
+            pd.DataFrame({
+                'concurso': store.concursos[inicio:].astype(np.int64),
+                'data': [store.data_str(i) for i in range(inicio, len(store))]
+            }),
+            pd.DataFrame(matriz, columns=[f'dezena_{i}' for i in dezenas]),
+            pd.DataFrame({'pares': pares, 'impares': impares, 'soma': soma})
+        ]
+        for janela in self.janelas:
+            partes.append(pd.DataFrame(blocos[f'freq_{janela}'], columns=[f'freq_{janela}_{i}' for i in dezenas]))
+        partes.append(pd.DataFrame(blocos['atraso'], columns=[f'atraso_{i}' for i in dezenas]))
+        
+        return pd.concat(partes, axis=1)
+    
+    def build(self, store):
+        """
+        Constrói o DataFrame completo de features a partir do histórico
+        
+        Args:
+            store (LotofacilDrawStore): Histórico de sorteios
+        
+        Returns:
+            pandas.DataFrame: Features no formato de lotofacil_processed.csv
+        """
+        logger.info(f"Construindo features para {len(store)} concursos...")
+        
+        return self.frame(store, self.build_blocks(store.masks))
+
+
+class IncrementalFeatureState:
+    """Estado das features móveis mantido incrementalmente, sorteio a sorteio"""
+    
+    def __init__(self, janelas=JANELAS_PADRAO):
+        """
+        Inicializa um estado vazio
+        
+        Args:
+            janelas (tuple): Janelas das frequências móveis
+        """
+        self.janelas = tuple(janelas)
+        
+        # Contagens das janelas e última aparição de cada dezena (buffer circular de max(janelas) concursos)
+        self.counter = WindowedCounter(max(self.janelas))
+        
+        # Último concurso processado
+        self.last_concurso = None
+    
+    @property
+    def count(self):
+        """Quantidade de sorteios processados"""
+        return self.counter.count
+    
+    def update(self, concurso, mascara):
+        """
+        Acrescenta um sorteio e calcula suas features em O(25) por janela
+        
+        Args:
+            concurso (int): Número do concurso
+            mascara (int): Máscara de bits do sorteio
+        
+        Returns:
+            dict: Blocos de uma linha 'dezenas', 'freq_<janela>' e 'atraso'
+        """
+        linha = self.counter.append(mascara)
+        
+        blocos = {'dezenas': linha[None, :]}
+        for janela in self.janelas:
+            blocos[f'freq_{janela}'] = self.counter.frequencies(janela)[None, :]
+        blocos['atraso'] = self.counter.delays()[None, :]
+        
+        self.last_concurso = int(concurso)
+        
+        return blocos
+    
+    def update_many(self, concursos, mascaras):
+        """
+        Acrescenta vários sorteios em sequência
+        
+        Args:
+            concursos (array-like): Números dos concursos
+            mascaras (array-like): Máscaras de bits
+        
+        Returns:
+            dict: Blocos empilhados com uma linha por sorteio
+        """
+        linhas = [self.update(c, m) for c, m in zip(concursos, mascaras)]
+        if not linhas:
+            return None
+        return {nome: np.vstack([linha[nome] for linha in linhas]) for nome in linhas[0]}
+    
+    @classmethod
+    def from_masks(cls, concursos, mascaras, janelas=JANELAS_PADRAO):
+        """
+        Reconstrói o estado a partir do histórico completo (modo em lote)
+        
+        Args:
+            concursos (numpy.ndarray): Números dos concursos
+            mascaras (numpy.ndarray): Máscaras de bits em ordem de concurso
+            janelas (tuple): Janelas das frequências móveis
+        
+        Returns:
+            IncrementalFeatureState: Estado equivalente a ter processado todos os sorteios
+        """
+        state = cls(janelas)
+        if len(mascaras) == 0:
+            return state
+        
+        state.counter.extend(mascaras)
+        state.last_concurso = int(concursos[-1])
+        
+        return state
+    
+    def save(self, path):
+        """
+        Grava o estado em disco
+        
+        Args:
+            path (str): Caminho do arquivo .npz
+        """
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            janelas=np.array(self.janelas),
+            last_concurso=-1 if self.last_concurso is None else self.last_concurso,
+            **self.counter.snapshot()
+        )
+        os.replace(tmp_path, path)
+    
+    @classmethod
+    def load(cls, path):
+        """
+        Carrega o estado gravado em disco
+        
+        Args:
+            path (str): Caminho do arquivo .npz
+        
+        Returns:
+            IncrementalFeatureState: Estado carregado
+        """
+        with np.load(path) as dados:
+            state = cls(tuple(int(j) for j in dados['janelas']))
+            state.counter = WindowedCounter.from_arrays(dados['acumulados'], dados['ring'], dados['last_seen'], int(dados['count']))
+            ultimo = int(dados['last_concurso'])
+            state.last_concurso = None if ultimo < 0 else ultimo
+        return state
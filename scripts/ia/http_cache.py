@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cache em disco das respostas HTTP das APIs de resultados da Lotofácil
+
+Para cada URL são guardados os validadores da última resposta processada (ETag e
+Last-Modified) e o hash SHA-256 do corpo. As próximas consultas enviam requisições
+condicionais; uma resposta 304, ou um corpo idêntico ao anterior, permite pular a
+leitura, o processamento e a gravação dos dados.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger('http_cache')
+
+# Situações possíveis de uma resposta em relação ao cache
+NAO_MODIFICADO = 'not_modified'
+INALTERADO = 'unchanged'
+MODIFICADO = 'modified'
+
+
+class CachedResponse:
+    """Resposta de uma fonte avaliada contra o cache"""
+    
+    def __init__(self, url, status, etag=None, last_modified=None, sha256=None, size=None, data=None):
+        """
+        Inicializa a resposta
+        
+        Args:
+            url (str): URL consultada
+            status (str): NAO_MODIFICADO, INALTERADO ou MODIFICADO
+            etag (str): Cabeçalho ETag da resposta
+            last_modified (str): Cabeçalho Last-Modified da resposta
+            sha256 (str): Hash do corpo
+            size (int): Tamanho do corpo em bytes
+            data (object): Corpo validado (apenas quando MODIFICADO) ou resultado
+                da leitura em streaming
+        """
+        self.url = url
+        self.status = status
+        self.etag = etag
+        self.last_modified = last_modified
+        self.sha256 = sha256
+        self.size = size
+        self.data = data
+    
+    @property
+    def modified(self):
+        """True se o conteúdo mudou desde a última resposta processada"""
+        return self.status == MODIFICADO
+
+
+class HttpResponseCache:
+    """Classe para o cache de validadores HTTP das fontes de dados"""
+    
+    VERSAO = 1
+    
+    def __init__(self, cache_dir):
+        """
+        Inicializa o cache
+        
+        Args:
+            cache_dir (str): Diretório das entradas do cache
+        """
+        self.cache_dir = cache_dir
+        self.stats_path = os.path.join(cache_dir, 'stats.json')
+        self._lock = threading.Lock()
+    
+    def _entry_path(self, url):
+        """Caminho do arquivo de uma entrada"""
+        chave = hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f'{chave}.json')
+    
+    @staticmethod
+    def _write_json(path, conteudo):
+        """Grava um arquivo JSON de forma atômica"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(conteudo, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    
+    def entry(self, url):
+        """
+        Lê a entrada de uma URL
+        
+        Args:
+            url (str): URL da fonte
+        
+        Returns:
+            dict: Entrada (etag, last_modified, sha256, ...) ou None se não existir
+        """
+        path = self._entry_path(url)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entrada = json.load(f)
+            if entrada.get('versao') != self.VERSAO or entrada.get('url') != url:
+                return None
+            return entrada
+        except Exception as e:
+            logger.warning(f"Entrada do cache HTTP inválida para {url}: {str(e)}")
+            return None
+    
+    def conditional_headers(self, url):
+        """
+        Monta os cabeçalhos condicionais de uma requisição
+        
+        Args:
+            url (str): URL da fonte
+        
+        Returns:
+            dict: If-None-Match e/ou If-Modified-Since (vazio se não houver entrada)
+        """
+        entrada = self.entry(url)
+        headers = {}
+        if entrada is None:
+            return headers
+        if entrada.get('etag'):
+            headers['If-None-Match'] = entrada['etag']
+        if entrada.get('last_modified'):
+            headers['If-Modified-Since'] = entrada['last_modified']
+        return headers
+    
+    def read(self, url, response, validar=None, condicional=True):
+        """
+        Avalia uma resposta contra o cache, sem alterá-lo
+        
+        Usado como função de leitura do HedgedFetcher; exceções de validar tornam a
+        resposta inválida e fazem a busca seguir para a próxima fonte.
+        
+        Args:
+            url (str): URL consultada
+            response (requests.Response): Resposta recebida (200 ou 304)
+            validar (callable): Função bytes -> dados, aplicada apenas a conteúdo novo
+            condicional (bool): Se False, todo conteúdo é tratado como novo
+        
+        Returns:
+            CachedResponse: Resposta avaliada
+        """
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        entrada = self.entry(url) if condicional else None
+        
+        if response.status_code == 304:
+            return self._not_modified(url, response, entrada)
+        
+        corpo = response.content
+        sha256 = hashlib.sha256(corpo).hexdigest()
+        
+        if entrada is not None and entrada['sha256'] == sha256:
+            return CachedResponse(url, INALTERADO, etag, last_modified, sha256, len(corpo))
+        
+        data = validar(corpo) if validar is not None else corpo
+        return CachedResponse(url, MODIFICADO, etag, last_modified, sha256, len(corpo), data)
+    
+    def read_stream(self, url, response, consumir, condicional=True, chunk_size=64 * 1024):
+        """
+        Avalia uma resposta lida em streaming, calculando o hash enquanto ela é consumida
+        
+        Ao contrário de read, o corpo é sempre entregue a consumir (o hash só é
+        conhecido no fim); quando o conteúdo é INALTERADO, o resultado de consumir
+        fica em data para que quem chamou possa descartá-lo.
+        
+        Args:
+            url (str): URL consultada
+            response (requests.Response): Resposta aberta com stream=True (200 ou 304)
+            consumir (callable): Função que consome um iterador de blocos de bytes
+            condicional (bool): Se False, todo conteúdo é tratado como novo
+            chunk_size (int): Tamanho dos blocos lidos da conexão
+        
+        Returns:
+            CachedResponse: Resposta avaliada
+        """
+        entrada = self.entry(url) if condicional else None
+        
+        if response.status_code == 304:
+            return self._not_modified(url, response, entrada)
+        
+        sha256 = hashlib.sha256()
+        tamanho = 0
+        
+        def blocos():
+            nonlocal tamanho
+            for bloco in response.iter_content(chunk_size):
+                sha256.update(bloco)
+                tamanho += len(bloco)
+                yield bloco
+        
+        data = consumir(blocos())
+        digest = sha256.hexdigest()
+        status = INALTERADO if entrada is not None and entrada['sha256'] == digest else MODIFICADO
+        
+        return CachedResponse(url, status, response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                              digest, tamanho, data)
+    
+    @staticmethod
+    def _not_modified(url, response, entrada):
+        """Monta a resposta para um 304, mantendo os validadores da entrada"""
+        if entrada is None:
+            raise ValueError("Resposta 304 sem entrada no cache")
+        return CachedResponse(url, NAO_MODIFICADO, response.headers.get('ETag') or entrada.get('etag'),
+                              response.headers.get('Last-Modified') or entrada.get('last_modified'),
+                              entrada['sha256'], entrada['size'])
+    
+    def commit(self, resposta):
+        """
+        Registra uma resposta como processada (chamar apenas após o processamento concluir)
+        
+        Args:
+            resposta (CachedResponse): Resposta avaliada por read
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._write_json(self._entry_path(resposta.url), {
+            'versao': self.VERSAO,
+            'url': resposta.url,
+            'etag': resposta.etag,
+            'last_modified': resposta.last_modified,
+            'sha256': resposta.sha256,
+            'size': resposta.size,
+            'updated_at': datetime.now().isoformat()
+        })
+    
+    def invalidate(self, url):
+        """
+        Remove a entrada de uma URL, forçando o próximo download completo
+        
+        Args:
+            url (str): URL da fonte
+        """
+        path = self._entry_path(url)
+        if os.path.exists(path):
+            os.remove(path)
+    
+    def stats(self):
+        """
+        Obtém os contadores acumulados do cache
+        
+        Returns:
+            dict: hits (304), content_hits (corpo idêntico), misses e hit_rate
+        """
+        stats = {'hits': 0, 'content_hits': 0, 'misses': 0}
+        if os.path.exists(self.stats_path):
+            try:
+                with open(self.stats_path, 'r', encoding='utf-8') as f:
+                    stats.update(json.load(f))
+            except Exception as e:
+                logger.warning(f"Contadores do cache HTTP inválidos: {str(e)}")
+        
+        total = stats['hits'] + stats['content_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['content_hits']) / total if total else None
+        return stats
+    
+    def record(self, resposta):
+        """
+        Contabiliza a resposta vencedora de uma busca
+        
+        Args:
+            resposta (CachedResponse): Resposta avaliada por read
+        """
+        contador = {NAO_MODIFICADO: 'hits', INALTERADO: 'content_hits', MODIFICADO: 'misses'}[resposta.status]
+        with self._lock:
+            stats = self.stats()
+            stats.pop('hit_rate')
+            stats[contador] += 1
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._write_json(self.stats_path, stats)
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Busca concorrente com hedge entre as fontes de dados da Lotofácil
+
+A primeira fonte é consultada imediatamente e as demais entram após um atraso
+configurável (hedge_delay), ou todas ao mesmo tempo com hedge_delay=0. A primeira
+resposta válida vence e as demais requisições são descartadas.
+"""
+
+import time
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+logger = logging.getLogger('http_fetcher')
+
+
+class FetchCancelled(Exception):
+    """Requisição descartada porque outra fonte já respondeu"""
+
+
+class HedgedFetcher:
+    """Classe para busca HTTP concorrente com hedge entre várias fontes"""
+    
+    def __init__(self, sources, hedge_delay=2.0, timeout=30, pool_size=4):
+        """
+        Inicializa o buscador
+        
+        Args:
+            sources (dict): Nome da fonte -> URL base, em ordem de prioridade
+            hedge_delay (float): Segundos de espera antes de acionar a próxima fonte
+            timeout (float): Timeout de cada requisição em segundos
+            pool_size (int): Conexões mantidas por host no pool compartilhado
+        """
+        self.sources = dict(sources)
+        self.hedge_delay = hedge_delay
+        self.timeout = timeout
+        
+        # Sessão com pool de conexões compartilhado entre as threads
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max(len(self.sources), 1), pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        self.executor = ThreadPoolExecutor(max_workers=max(len(self.sources), 1) * 2,
+                                           thread_name_prefix='hedged_fetch')
+        
+        # Estatísticas de latência por fonte
+        self._lock = threading.Lock()
+        self.stats = {nome: self._empty_stats() for nome in self.sources}
+    
+    @staticmethod
+    def _empty_stats():
+        """Estrutura inicial das estatísticas de uma fonte"""
+        return {
+            'requests': 0,
+            'successes': 0,
+            'failures': 0,
+            'cancelled': 0,
+            'wins': 0,
+            'total_latency': 0.0,
+            'min_latency': None,
+            'max_latency': None,
+            'last_latency': None
+        }
+    
+    def _record(self, nome, resultado, latencia=None):
+        """Registra o resultado de uma requisição nas estatísticas"""
+        with self._lock:
+            stats = self.stats.setdefault(nome, self._empty_stats())
+            stats[resultado] += 1
+            if latencia is not None:
+                stats['total_latency'] += latencia
+                stats['last_latency'] = latencia
+                stats['min_latency'] = latencia if stats['min_latency'] is None else min(stats['min_latency'], latencia)
+                stats['max_latency'] = latencia if stats['max_latency'] is None else max(stats['max_latency'], latencia)
+    
+    def _request(self, nome, url, parse, cancel, headers, stream, abertas):
+        """
+        Executa uma requisição em uma thread do pool
+        
+        Em streaming, a resposta é registrada em abertas para que possa ser fechada
+        (interrompendo a leitura do corpo) quando outra fonte vencer.
+        
+        Returns:
+            object: Resultado de parse(response) (ou a própria resposta)
+        """
+        if cancel.is_set():
+            raise FetchCancelled(nome)
+        
+        with self._lock:
+            self.stats.setdefault(nome, self._empty_stats())['requests'] += 1
+        
+        inicio = time.perf_counter()
+        response = None
+        try:
+            response = self.session.get(url, timeout=self.timeout, headers=headers, stream=stream)
+            if stream:
+                abertas.append(response)
+            
+            # Outra fonte já venceu: liberar a conexão sem ler o corpo
+            if cancel.is_set():
+                response.close()
+                raise FetchCancelled(nome)
+            
+            # 304 só é válido em resposta a uma requisição condicional
+            condicional = bool(headers) and ('If-None-Match' in headers or 'If-Modified-Since' in headers)
+            if response.status_code != 200 and not (response.status_code == 304 and condicional):
+                raise requests.HTTPError(f"status {response.status_code}", response=response)
+            
+            resultado = parse(response) if parse is not None else response
+            self._record(nome, 'successes', time.perf_counter() - inicio)
+            return resultado
+        except FetchCancelled:
+            self._record(nome, 'cancelled')
+            raise
+        except Exception:
+            if response is not None:
+                response.close()
+            
+            # Leitura interrompida porque outra fonte já venceu
+            if cancel.is_set():
+                self._record(nome, 'cancelled')
+                raise FetchCancelled(nome)
+            
+            self._record(nome, 'failures', time.perf_counter() - inicio)
+            raise
+    
+    def fetch(self, urls=None, parse=None, headers=None, stream=False):
+        """
+        Consulta as fontes com hedge e retorna a primeira resposta válida
+        
+        Args:
+            urls (dict): Nome da fonte -> URL (padrão: URLs base de self.sources)
+            parse (callable or dict): Função aplicada à resposta (ou nome -> função);
+                exceções a tornam inválida
+            headers (dict or callable): Cabeçalhos fixos ou função nome -> cabeçalhos
+            stream (bool): Se True, o corpo não é lido antes de parse
+        
+        Returns:
+            tuple: (nome da fonte vencedora, resultado) ou (None, None) se todas falharem
+        """
+        urls = dict(urls) if urls is not None else dict(self.sources)
+        pendentes = list(urls.items())
+        cancel = threading.Event()
+        futures = {}
+        abertas = []
+        
+        def disparar():
+            nome, url = pendentes.pop(0)
+            cabecalhos = headers(nome) if callable(headers) else headers
+            leitura = parse.get(nome) if isinstance(parse, dict) else parse
+            futures[self.executor.submit(self._request, nome, url, leitura, cancel, cabecalhos, stream, abertas)] = nome
+        
+        disparar()
+        try:
+            while futures:
+                # Aguardar a fonte atual; se demorar mais que hedge_delay, acionar a próxima
+                espera = self.hedge_delay if pendentes else None
+                concluidos, _ = wait(list(futures), timeout=espera, return_when=FIRST_COMPLETED)
+                
+                if not concluidos:
+                    disparar()
+                    continue
+                
+                for future in concluidos:
+                    nome = futures.pop(future)
+                    try:
+                        resultado = future.result()
+                    except Exception as e:
+                        logger.warning(f"Falha ao consultar a fonte {nome}: {str(e)}")
+                        continue
+                    
+                    self._record(nome, 'wins')
+                    return nome, resultado
+                
+                # Todas as fontes em andamento falharam: acionar a próxima imediatamente
+                if not futures and pendentes:
+                    disparar()
+            
+            return None, None
+        finally:
+            # Descartar as requisições perdedoras (e interromper as leituras em streaming)
+            cancel.set()
+            for future in futures:
+                future.cancel()
+            for response in abertas:
+                response.close()
+    
+    def latency_stats(self):
+        """
+        Obtém um resumo das estatísticas de latência por fonte
+        
+        Returns:
+            dict: Nome da fonte -> contadores e latências (em segundos)
+        """
+        with self._lock:
+            resumo = {}
+            for nome, stats in self.stats.items():
+                concluidas = stats['successes'] + stats['failures']
+                resumo[nome] = dict(stats)
+                resumo[nome]['mean_latency'] = stats['total_latency'] / concluidas if concluidas else None
+            return resumo
+    
+    def close(self):
+        """Encerra o pool de threads e a sessão HTTP"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
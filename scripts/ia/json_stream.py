@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Leitura incremental de arrays JSON
+
+Permite percorrer o histórico completo retornado pela API elemento a elemento,
+à medida que os blocos da resposta chegam, sem manter o texto inteiro nem a lista
+decodificada em memória.
+"""
+
+import json
+import codecs
+
+# Caracteres de espaço em branco permitidos pelo JSON
+ESPACOS = ' \t\n\r'
+
+
+def _pular_espacos(texto, pos):
+    """Avança pos até o próximo caractere que não seja espaço em branco"""
+    while pos < len(texto) and texto[pos] in ESPACOS:
+        pos += 1
+    return pos
+
+
+def iter_json_array(blocos, encoding='utf-8'):
+    """
+    Itera sobre os elementos de um array JSON lido em blocos de bytes
+    
+    A memória usada é limitada ao maior elemento mais um bloco, independentemente
+    do tamanho do array. O iterador só termina depois de consumir todos os blocos,
+    de modo que quem os produz (ex.: um cálculo de hash) vê o corpo inteiro.
+    
+    Args:
+        blocos (iterable): Blocos de bytes (ex.: response.iter_content())
+        encoding (str): Codificação do texto
+    
+    Yields:
+        object: Cada elemento do array, já decodificado
+    
+    Raises:
+        ValueError: Se o conteúdo não for um array JSON válido e completo
+    """
+    decoder = json.JSONDecoder()
+    texto_decoder = codecs.getincrementaldecoder(encoding)()
+    
+    buffer = ''
+    estado = 'inicio'
+    
+    for bloco in blocos:
+        buffer += texto_decoder.decode(bloco)
+        pos = 0
+        
+        while True:
+            pos = _pular_espacos(buffer, pos)
+            if pos == len(buffer):
+                break
+            
+            if estado == 'inicio':
+                if buffer[pos] != '[':
+                    raise ValueError("Conteúdo não é um array JSON")
+                pos += 1
+                estado = 'primeiro'
+            
+            elif estado in ('primeiro', 'elemento'):
+                if estado == 'primeiro' and buffer[pos] == ']':
+                    pos += 1
+                    estado = 'fim'
+                    continue
+                
+                try:
+                    elemento, fim = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    # Elemento incompleto: aguardar o próximo bloco
+                    break
+                
+                # Um número só termina em um delimitador (pode continuar no próximo bloco)
+                if not isinstance(elemento, (dict, list, str)) and (fim == len(buffer) or buffer[fim] not in ',]' + ESPACOS):
+                    break
+                
+                pos = fim
+                estado = 'separador'
+                yield elemento
+            
+            elif estado == 'separador':
+                if buffer[pos] == ',':
+                    estado = 'elemento'
+                elif buffer[pos] == ']':
+                    estado = 'fim'
+                else:
+                    raise ValueError(f"Separador inválido no array JSON: {buffer[pos]!r}")
+                pos += 1
+            
+            else:
+                raise ValueError("Conteúdo após o fim do array JSON")
+        
+        buffer = buffer[pos:]
+    
+    buffer += texto_decoder.decode(b'', final=True)
+    
+    if estado != 'fim':
+        raise ValueError("Array JSON incompleto")
+    if buffer[_pular_espacos(buffer, 0):]:
+        raise ValueError("Conteúdo após o fim do array JSON")
@@ -50,7 +50,7 @@ class LotofacilLSTMAPI:
             'end_time': None
         }
     
-    def start_training(self, epochs=100, batch_size=32, sequence_length=5):
+    def start_training(self, epochs=100, batch_size=32, sequence_length=5, force=False):
         """
         Inicia o treinamento do modelo LSTM
         
@@ -58,6 +58,7 @@ class LotofacilLSTMAPI:
             epochs (int): Número de épocas
             batch_size (int): Tamanho do batch
             sequence_length (int): Tamanho da sequência de concursos anteriores
+            force (bool): Se True, treina mesmo que o modelo salvo corresponda ao histórico atual
             
         Returns:
             dict: Status do treinamento
@@ -95,6 +96,14 @@ class LotofacilLSTMAPI:
                         self.training_status['end_time'] = datetime.now().isoformat()
                         return
                     
+                    # Modelo já treinado com a versão atual do histórico
+                    if not force and self.lstm.load_current_model(sequence_length, epochs, batch_size):
+                        self.training_status['is_training'] = False
+                        self.training_status['progress'] = 100
+                        self.training_status['message'] = 'Modelo já treinado com a versão atual do histórico'
+                        self.training_status['end_time'] = datetime.now().isoformat()
+                        return
+                    
                     # Construir modelo
                     self.training_status['message'] = 'Construindo modelo...'
                     self.training_status['progress'] = 10
@@ -336,6 +345,7 @@ def train_model():
     - epochs (int): Número de épocas (opcional, padrão: 100)
     - batch_size (int): Tamanho do batch (opcional, padrão: 32)
     - sequence_length (int): Tamanho da sequência (opcional, padrão: 5)
+    - force (bool): Treinar mesmo sem mudanças no histórico (opcional, padrão: false)
     
     Retorna um JSON com o status do treinamento
     """
@@ -345,8 +355,10 @@ def train_model():
         epochs = data.get('epochs', 100)
         batch_size = data.get('batch_size', 32)
         sequence_length = data.get('sequence_length', 5)
+        force = bool(data.get('force', False))
         
-        result = lstm_api.start_training(epochs=epochs, batch_size=batch_size, sequence_length=sequence_length)
+        result = lstm_api.start_training(epochs=epochs, batch_size=batch_size, sequence_length=sequence_length,
+                                         force=force)
         
         return jsonify(result)
     except Exception as e:
@@ -22,6 +22,10 @@ from datetime import datetime
 
 # Importar o coletor de dados
 from data_collector import LotofacilDataCollector
+from dataset_version import VersionedCache
+from draw_store import LotofacilDrawStore, dezenas_to_mask
+from repeat_index import DrawRepeatIndex
+from shared_history import SharedDrawHistory
 
 # Configuração de logging
 logging.basicConfig(
@@ -64,6 +68,117 @@ class LotofacilLSTM:
         
         # Coletor de dados
         self.data_collector = LotofacilDataCollector()
+        
+        # Versão do histórico usada no treino e nas previsões salvas
+        self.versions = VersionedCache(os.path.join(self.models_dir, 'versions.json'))
+        self.dataset_version = None
+        
+        # Índice de repetições do histórico (reconstruído quando a versão muda)
+        self.repeat_index = None
+        self.repeat_index_version = None
+        
+        # Histórico compartilhado entre os serviços (mapeado somente leitura)
+        self.historico_compartilhado = None
+    
+    def _carregar_compartilhado(self):
+        """
+        Obtém o histórico compartilhado entre os serviços, sem cópia
+        
+        Returns:
+            LotofacilDrawStore: Histórico na versão mais recente ou None se não publicado
+        """
+        if self.historico_compartilhado is None:
+            self.historico_compartilhado = SharedDrawHistory.attach(self.data_collector.shared_history_path)
+            if self.historico_compartilhado is None:
+                return None
+        elif self.historico_compartilhado.refresh():
+            logger.info(f"Histórico compartilhado atualizado (versão {self.historico_compartilhado.version})")
+        
+        if len(self.historico_compartilhado) == 0:
+            return None
+        
+        return self.historico_compartilhado.snapshot()
+    
+    def get_repeat_index(self):
+        """
+        Obtém o índice de repetições do histórico atual
+        
+        Usa o histórico compartilhado entre os serviços; o histórico local só é
+        carregado enquanto nenhum histórico compartilhado foi publicado.
+        
+        Returns:
+            DrawRepeatIndex: Índice dos sorteios passados ou None se não houver histórico
+        """
+        try:
+            store = self._carregar_compartilhado()
+            if store is not None:
+                # A versão do arquivo compartilhado muda a cada publicação (verificação em custo constante)
+                versao = ('compartilhado', self.historico_compartilhado.version)
+                if self.repeat_index is None or versao != self.repeat_index_version:
+                    self.repeat_index = DrawRepeatIndex.from_store(store)
+                    self.repeat_index_version = versao
+                return self.repeat_index
+            
+            versao = self.data_collector.get_dataset_version()
+            if self.repeat_index is None or versao is None or versao != self.repeat_index_version:
+                store = LotofacilDrawStore.load_or_build(self.data_collector.store_path, self.data_collector.raw_data_path)
+                self.repeat_index = DrawRepeatIndex.from_store(store)
+                self.repeat_index_version = versao
+            return self.repeat_index
+        except Exception as e:
+            logger.error(f"Erro ao carregar índice de repetições: {str(e)}")
+            return None
+    
+    def model_params(self, sequence_length, epochs, batch_size):
+        """
+        Parâmetros que, junto com o histórico, determinam o modelo treinado
+        
+        Returns:
+            dict: Parâmetros do treinamento
+        """
+        return {
+            'l1_reg': self.l1_reg,
+            'l2_reg': self.l2_reg,
+            'sequence_length': int(sequence_length),
+            'epochs': int(epochs),
+            'batch_size': int(batch_size)
+        }
+    
+    def load_current_model(self, sequence_length=5, epochs=100, batch_size=32):
+        """
+        Carrega o modelo salvo se ele foi treinado com a versão atual do histórico
+        
+        Args:
+            sequence_length (int): Tamanho da sequência de concursos anteriores
+            epochs (int): Número de épocas
+            batch_size (int): Tamanho do batch
+            
+        Returns:
+            bool: True se o modelo salvo está atualizado e foi carregado
+        """
+        try:
+            if self.dataset_version is None:
+                self.dataset_version = self.data_collector.get_dataset_version()
+            
+            final_model_path = os.path.join(self.models_dir, 'final_model.h5')
+            params = self.model_params(sequence_length, epochs, batch_size)
+            
+            if not os.path.exists(final_model_path) or not self.versions.is_current('model', self.dataset_version, params):
+                return False
+            
+            self.model = tf.keras.models.load_model(final_model_path)
+            
+            history_path = os.path.join(self.models_dir, 'training_history.json')
+            if os.path.exists(history_path):
+                with open(history_path, 'r', encoding='utf-8') as f:
+                    self.history = json.load(f)
+            
+            logger.info(f"Modelo treinado com a versão atual do histórico ({self.dataset_version}) carregado. Treinamento ignorado.")
+            
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao carregar modelo salvo: {str(e)}")
+            return False
     
     def build_model(self, input_shape):
         """
@@ -123,8 +238,9 @@ class LotofacilLSTM:
         try:
             logger.info("Preparando dados para treinamento...")
             
-            # Executar coleta e processamento de dados
-            self.data_collector.run()
+            # Executar coleta e processamento de dados (apenas concursos novos)
+            self.data_collector.run(incremental=True)
+            self.dataset_version = self.data_collector.get_dataset_version()
             
             # Criar dados de sequência
             X, y = self.data_collector.create_sequence_data(sequence_length=sequence_length)
@@ -215,6 +331,9 @@ class LotofacilLSTM:
             self.model.save(final_model_path)
             logger.info(f"Modelo final salvo em {final_model_path}")
             
+            # Registrar a versão do histórico usada no treino
+            self.versions.mark('model', self.dataset_version, self.model_params(X_train.shape[1], epochs, batch_size))
+            
             return history
         except Exception as e:
             logger.error(f"Erro ao treinar modelo: {str(e)}")
@@ -294,20 +413,25 @@ class LotofacilLSTM:
                 logger.error("Modelo não treinado.")
                 return None
             
-            # Carregar dados processados
-            processed_data_path = self.data_collector.processed_data_path
-            if not os.path.exists(processed_data_path):
-                logger.error(f"Arquivo de dados processados não encontrado: {processed_data_path}")
+            # Reaproveitar as previsões do mesmo modelo para a mesma versão do histórico
+            predictions_path = os.path.join(self.models_dir, 'predictions.json')
+            versao = self.data_collector.get_dataset_version()
+            modelo = self.versions.get('model')
+            params = {'num_predictions': num_predictions, 'model': modelo['updated_at'] if modelo else None}
+            
+            if os.path.exists(predictions_path) and self.versions.is_current('predictions', versao, params):
+                with open(predictions_path, 'r', encoding='utf-8') as f:
+                    predictions = json.load(f)['predictions']
+                logger.info(f"Previsões da versão {versao} reaproveitadas de {predictions_path}")
+                return predictions
+            
+            # Carregar o bloco de dezenas dos dados processados (memory map do cache)
+            blocos = self.data_collector.load_feature_blocks(['dezena'])
+            if blocos is None:
                 return None
             
-            df = pd.read_csv(processed_data_path)
-            
-            # Selecionar apenas as colunas de dezenas
-            dezenas_cols = [f'dezena_{i}' for i in range(1, 26)]
-            dezenas_df = df[dezenas_cols]
-            
             # Obter os últimos 5 concursos
-            last_5_draws = dezenas_df.tail(5).values
+            last_5_draws = np.asarray(blocos['dezena'][-5:])
             
             # Redimensionar para o formato esperado pelo modelo
             X_pred = np.array([last_5_draws])
@@ -328,19 +452,27 @@ class LotofacilLSTM:
             predictions = []
             predictions.append(top_15_dezenas)
             
+            # Índice para descartar previsões que repetem (ou quase repetem) um sorteio passado
+            repeat_index = self.get_repeat_index()
+            
             # Para previsões adicionais, vamos perturbar ligeiramente as probabilidades
             for _ in range(num_predictions - 1):
-                # Adicionar ruído às probabilidades
-                noisy_prediction = prediction + np.random.normal(0, 0.1, prediction.shape)
-                
-                # Garantir que as probabilidades estejam entre 0 e 1
-                noisy_prediction = np.clip(noisy_prediction, 0, 1)
-                
-                # Obter as 15 dezenas com maior probabilidade
-                top_15_indices = np.argsort(noisy_prediction)[-15:]
-                
-                # Converter índices para dezenas (1-25)
-                top_15_dezenas = [i + 1 for i in top_15_indices]
+                for _ in range(10):
+                    # Adicionar ruído às probabilidades
+                    noisy_prediction = prediction + np.random.normal(0, 0.1, prediction.shape)
+                    
+                    # Garantir que as probabilidades estejam entre 0 e 1
+                    noisy_prediction = np.clip(noisy_prediction, 0, 1)
+                    
+                    # Obter as 15 dezenas com maior probabilidade
+                    top_15_indices = np.argsort(noisy_prediction)[-15:]
+                    
+                    # Converter índices para dezenas (1-25)
+                    top_15_dezenas = [int(i) + 1 for i in top_15_indices]
+                    
+                    # Sortear novamente se o jogo tiver 14 ou 15 acertos com algum concurso
+                    if repeat_index is None or not repeat_index.is_repeat(dezenas_to_mask(top_15_dezenas)):
+                        break
                 
                 # Ordenar dezenas
                 top_15_dezenas.sort()
@@ -353,9 +485,9 @@ class LotofacilLSTM:
                 'predictions': predictions
             }
             
-            predictions_path = os.path.join(self.models_dir, 'predictions.json')
             with open(predictions_path, 'w', encoding='utf-8') as f:
                 json.dump(predictions_data, f, ensure_ascii=False, indent=4)
+            self.versions.mark('predictions', versao, params)
             
             logger.info(f"Previsões concluídas e salvas em {predictions_path}")
             
@@ -413,7 +545,7 @@ class LotofacilLSTM:
             logger.error(f"Erro ao plotar histórico de treinamento: {str(e)}")
             return None
     
-    def run_full_pipeline(self, sequence_length=5, epochs=100, batch_size=32):
+    def run_full_pipeline(self, sequence_length=5, epochs=100, batch_size=32, force=False):
         """
         Executa o pipeline completo: preparação de dados, treinamento, avaliação e previsão
         
@@ -421,6 +553,7 @@ class LotofacilLSTM:
             sequence_length (int): Tamanho da sequência de concursos anteriores
             epochs (int): Número de épocas
             batch_size (int): Tamanho do batch
+            force (bool): Se True, treina mesmo que o modelo salvo corresponda ao histórico atual
             
         Returns:
             dict: Resultados do pipeline
@@ -435,15 +568,17 @@ class LotofacilLSTM:
                 logger.error("Falha ao preparar dados. Pipeline interrompido.")
                 return None
             
-            # Construir modelo
-            self.build_model(input_shape=(X_train.shape[1], X_train.shape[2]))
-            
-            # Treinar modelo
-            history = self.train(X_train, y_train, X_test, y_test, epochs=epochs, batch_size=batch_size)
-            
-            if history is None:
-                logger.error("Falha ao treinar modelo. Pipeline interrompido.")
-                return None
+            # Treinar apenas se o histórico mudou desde o último treinamento
+            if force or not self.load_current_model(sequence_length, epochs, batch_size):
+                # Construir modelo
+                self.build_model(input_shape=(X_train.shape[1], X_train.shape[2]))
+                
+                # Treinar modelo
+                history = self.train(X_train, y_train, X_test, y_test, epochs=epochs, batch_size=batch_size)
+                
+                if history is None:
+                    logger.error("Falha ao treinar modelo. Pipeline interrompido.")
+                    return None
             
             # Avaliar modelo
             metrics = self.evaluate(X_test, y_test)
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Busca dos sorteios históricos mais parecidos com um jogo
+
+A distância entre dois jogos é a distância de Hamming das máscaras de 25 bits.
+Como todo jogo tem 15 dezenas, ela vale 2 x (15 - acertos): os mais parecidos
+são os de mais acertos.
+
+Em históricos pequenos a busca confere todos os sorteios (AND + popcount). Em
+históricos grandes ela percorre anéis em volta do jogo: o anel r contém os
+C(15, r) x C(10, r) jogos com exatamente r dezenas trocadas, procurados por
+acesso direto a uma tabela indexada pela posição de cada jogo na ordem das
+3.268.760 combinações (ranking colexicográfico). Os anéis 0 a 2 já contêm
+todos os sorteios com 13 ou mais acertos, então a consulta raramente precisa ir
+além deles.
+"""
+
+import logging
+import numpy as np
+from math import comb
+from itertools import combinations
+
+from draw_store import NUM_DEZENAS, DEZENAS_POR_SORTEIO, BITS_DEZENAS
+from draw_store import masks_to_matrix, popcount, dezenas_to_mask, mask_to_dezenas
+
+logger = logging.getLogger('nearest_draws')
+
+# Menor número de acertos informado como premiação relevante
+MIN_ACERTOS = 13
+
+# Maior anel percorrido antes de recorrer à conferência de todos os sorteios
+RAIO_MAXIMO = 3
+
+# Abaixo deste tamanho de histórico a conferência direta é mais rápida que os anéis
+LIMITE_FORCA_BRUTA = 15_000
+
+# Número de jogos possíveis (posições do ranking)
+TOTAL_COMBINACOES = comb(NUM_DEZENAS, DEZENAS_POR_SORTEIO)
+
+
+def _tabelas_ranking():
+    """
+    Pré-calcula a contribuição de cada byte da máscara para o ranking
+    
+    A posição de um jogo na ordem crescente das máscaras é a soma de C(p, i + 1)
+    para a i-ésima dezena sorteada, na posição de bit p. A contribuição de um
+    byte depende apenas do seu valor e de quantos bits ligados vêm antes dele.
+    """
+    bytes_mascara = (NUM_DEZENAS + 7) // 8
+    tabelas = np.zeros((bytes_mascara, DEZENAS_POR_SORTEIO + 1, 256), dtype=np.int64)
+    for j in range(bytes_mascara):
+        for anteriores in range(DEZENAS_POR_SORTEIO + 1):
+            for valor in range(256):
+                bits = [8 * j + b for b in range(8) if valor >> b & 1]
+                tabelas[j, anteriores, valor] = sum(comb(p, anteriores + i + 1) for i, p in enumerate(bits))
+    return tabelas
+
+
+_RANKING = _tabelas_ranking()
+
+
+def combination_rank(mascaras):
+    """
+    Calcula a posição de cada jogo na ordem crescente das máscaras de 15 dezenas
+    
+    Args:
+        mascaras (array-like): Máscaras uint32 de jogos de 15 dezenas
+    
+    Returns:
+        numpy.ndarray: Posições entre 0 e 3.268.759
+    """
+    mascaras = np.asarray(mascaras, dtype=np.uint32)
+    posicoes = np.zeros(mascaras.shape, dtype=np.int64)
+    anteriores = np.zeros(mascaras.shape, dtype=np.intp)
+    for j in range(_RANKING.shape[0]):
+        valor = (mascaras >> np.uint32(8 * j)) & np.uint32(0xFF)
+        posicoes += _RANKING[j, np.minimum(anteriores, DEZENAS_POR_SORTEIO), valor]
+        anteriores += popcount(valor)
+    return posicoes
+
+
+def _combinacoes(n, r):
+    """Índices das combinações de r elementos entre n"""
+    indices = list(combinations(range(n), r))
+    return np.array(indices, dtype=np.intp).reshape(len(indices), r)
+
+
+def _mascara_jogo(jogo):
+    """Converte um jogo (dezenas ou máscara) em máscara, validando as 15 dezenas"""
+    if np.isscalar(jogo):
+        mascara = int(jogo)
+    else:
+        dezenas = [int(d) for d in jogo]
+        if len(set(dezenas)) != len(dezenas) or not all(1 <= d <= NUM_DEZENAS for d in dezenas):
+            raise ValueError("O jogo deve ter 15 dezenas distintas entre 1 e 25")
+        mascara = dezenas_to_mask(dezenas)
+    
+    if mascara < 0 or mascara >> NUM_DEZENAS or bin(mascara).count('1') != DEZENAS_POR_SORTEIO:
+        raise ValueError("O jogo deve ter 15 dezenas distintas entre 1 e 25")
+    return mascara
+
+
+class NearestDrawIndex:
+    """Índice para busca dos sorteios mais parecidos com um jogo"""
+    
+    def __init__(self, mascaras, concursos=None, limite_forca_bruta=LIMITE_FORCA_BRUTA):
+        """
+        Constrói o índice
+        
+        Args:
+            mascaras (array-like): Máscaras uint32 dos sorteios
+            concursos (array-like): Números dos concursos (padrão: posição + 1)
+            limite_forca_bruta (int): Tamanho do histórico a partir do qual a busca usa os anéis
+        """
+        self.masks = np.ascontiguousarray(mascaras, dtype=np.uint32)
+        if concursos is None:
+            concursos = np.arange(1, len(self.masks) + 1)
+        self.concursos = np.asarray(concursos, dtype=np.int64)
+        self.limite_forca_bruta = limite_forca_bruta
+        
+        # Sorteios agrupados pelo ranking do jogo: os do jogo p estão em _ordem[_inicio[p]:_inicio[p + 1]]
+        self._ordem = None
+        self._inicio = None
+        if len(self.masks) >= limite_forca_bruta:
+            ranking = combination_rank(self.masks)
+            self._ordem = np.argsort(ranking, kind='stable')
+            self._inicio = np.zeros(TOTAL_COMBINACOES + 1, dtype=np.int32)
+            np.cumsum(np.bincount(ranking, minlength=TOTAL_COMBINACOES), out=self._inicio[1:])
+        
+        # Combinações de dezenas trocadas de cada anel
+        self._aneis = [(_combinacoes(DEZENAS_POR_SORTEIO, r), _combinacoes(NUM_DEZENAS - DEZENAS_POR_SORTEIO, r))
+                       for r in range(RAIO_MAXIMO + 1)]
+    
+    @classmethod
+    def from_store(cls, store, **kwargs):
+        """
+        Constrói o índice a partir de um histórico
+        
+        Args:
+            store (LotofacilDrawStore): Histórico de sorteios
+        
+        Returns:
+            NearestDrawIndex: Índice do histórico
+        """
+        return cls(store.masks, store.concursos, **kwargs)
+    
+    def __len__(self):
+        return len(self.masks)
+    
+    def _anel(self, dentro, fora, mascara, r):
+        """Posições dos sorteios com exatamente r dezenas trocadas em relação ao jogo"""
+        comb_dentro, comb_fora = self._aneis[r]
+        trocas_dentro = np.bitwise_or.reduce(dentro[comb_dentro], axis=1) if r else np.zeros(1, dtype=np.uint32)
+        trocas_fora = np.bitwise_or.reduce(fora[comb_fora], axis=1) if r else np.zeros(1, dtype=np.uint32)
+        anel = (np.uint32(mascara) ^ trocas_dentro[:, None] ^ trocas_fora[None, :]).ravel()
+        
+        ranking = combination_rank(anel)
+        inicio = self._inicio[ranking]
+        fim = self._inicio[ranking + 1]
+        # Um mesmo jogo pode ter saído em mais de um concurso: expandir cada intervalo encontrado
+        quantidades = fim - inicio
+        total = int(quantidades.sum())
+        deslocamentos = np.arange(total) - np.repeat(np.cumsum(quantidades) - quantidades, quantidades)
+        return self._ordem[np.repeat(inicio, quantidades) + deslocamentos]
+    
+    def _acertos(self, mascara, k):
+        """Posições e acertos de um conjunto de sorteios que contém os k mais próximos do jogo"""
+        if self._inicio is not None:
+            matriz = masks_to_matrix(np.array([mascara], dtype=np.uint32))[0]
+            dentro = BITS_DEZENAS[np.flatnonzero(matriz)]
+            fora = BITS_DEZENAS[np.flatnonzero(matriz == 0)]
+            
+            posicoes, acertos = [], []
+            for r in range(RAIO_MAXIMO + 1):
+                encontrados = self._anel(dentro, fora, mascara, r)
+                posicoes.append(encontrados)
+                acertos.append(np.full(len(encontrados), DEZENAS_POR_SORTEIO - r, dtype=np.int64))
+                if r >= DEZENAS_POR_SORTEIO - MIN_ACERTOS and sum(len(p) for p in posicoes) >= k:
+                    return np.concatenate(posicoes), np.concatenate(acertos)
+        
+        posicoes = np.arange(len(self.masks))
+        return posicoes, popcount(self.masks & np.uint32(mascara)).astype(np.int64)
+    
+    def nearest(self, jogo, k=10):
+        """
+        Busca os k sorteios mais parecidos com um jogo
+        
+        Args:
+            jogo (list or int): Lista de 15 dezenas ou máscara do jogo
+            k (int): Número de sorteios retornados
+        
+        Returns:
+            dict: Jogo, k sorteios mais próximos (concurso, acertos, distância) e, por número
+                de acertos (13 a 15), os concursos em que o jogo teria sido premiado
+        
+        Raises:
+            ValueError: Se o jogo não tiver 15 dezenas distintas entre 1 e 25
+        """
+        mascara = _mascara_jogo(jogo)
+        posicoes, acertos = self._acertos(mascara, k)
+        concursos = self.concursos[posicoes]
+        
+        # Mais acertos primeiro; empates pelo concurso mais recente
+        ordem = np.lexsort((-concursos, -acertos))
+        
+        return {
+            'jogo': mask_to_dezenas(mascara),
+            'similares': [
+                {
+                    'concurso': int(concursos[i]),
+                    'acertos': int(acertos[i]),
+                    'distancia': 2 * (DEZENAS_POR_SORTEIO - int(acertos[i]))
+                }
+                for i in ordem[:k]
+            ],
+            'premiados': {
+                str(faixa): np.sort(concursos[acertos == faixa]).tolist()
+                for faixa in range(MIN_ACERTOS, DEZENAS_POR_SORTEIO + 1)
+            }
+        }
+    
+    def nearest_many(self, jogos, k=10):
+        """
+        Busca os sorteios mais parecidos com cada jogo de um lote
+        
+        Args:
+            jogos (list): Jogos (listas de 15 dezenas ou máscaras)
+            k (int): Número de sorteios retornados por jogo
+        
+        Returns:
+            list: Resultado de nearest para cada jogo
+        """
+        return [self.nearest(jogo, k) for jogo in jogos]
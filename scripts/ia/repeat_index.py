@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Índice de repetições do histórico da Lotofácil
+
+Responde se um jogo já foi sorteado (consulta exata em O(1) por um conjunto de
+máscaras) e se ele está a poucas dezenas de diferença de algum sorteio passado.
+
+Para a consulta mais comum, "14 acertos com algum sorteio", os 150 vizinhos de
+cada sorteio (uma dezena trocada) são pré-calculados em um array ordenado, e um
+lote de candidatos é filtrado por busca binária vetorizada. Para distâncias
+maiores é usado multi-index hashing: dois jogos com até k dezenas trocadas
+diferem em no máximo 2k bits, então, com a máscara dividida em 2k + 1 segmentos,
+pelo menos um segmento é idêntico. Só os sorteios que compartilham algum
+segmento com o jogo são conferidos.
+"""
+
+import logging
+import numpy as np
+
+from draw_store import NUM_DEZENAS, DEZENAS_POR_SORTEIO, BITS_DEZENAS, masks_to_matrix, popcount
+
+logger = logging.getLogger('repeat_index')
+
+# Dezenas fora de um sorteio
+DEZENAS_FORA = NUM_DEZENAS - DEZENAS_POR_SORTEIO
+
+# Acima deste número de sorteios os vizinhos não são pré-calculados (150 máscaras por sorteio);
+# a consulta passa a procurar os vizinhos de cada jogo entre os sorteios
+LIMITE_VIZINHOS = 50_000
+
+
+def neighbor_masks(mascaras):
+    """
+    Calcula os jogos a uma dezena de diferença (14 acertos) de cada sorteio
+    
+    Args:
+        mascaras (array-like): Máscaras uint32 dos sorteios
+    
+    Returns:
+        numpy.ndarray: Máscaras uint32 (n_sorteios x 150)
+    """
+    mascaras = np.asarray(mascaras, dtype=np.uint32)
+    if not (popcount(mascaras) == DEZENAS_POR_SORTEIO).all():
+        raise ValueError("Todos os sorteios devem ter 15 dezenas")
+    
+    matriz = masks_to_matrix(mascaras)
+    dentro = BITS_DEZENAS[np.nonzero(matriz)[1].reshape(len(mascaras), DEZENAS_POR_SORTEIO)]
+    fora = BITS_DEZENAS[np.nonzero(matriz == 0)[1].reshape(len(mascaras), DEZENAS_FORA)]
+    
+    # Trocar uma dezena sorteada por uma não sorteada
+    vizinhos = mascaras[:, None, None] ^ dentro[:, :, None] ^ fora[:, None, :]
+    return vizinhos.reshape(len(mascaras), -1)
+
+
+class DrawRepeatIndex:
+    """Índice de sorteios passados para consultas de repetição exata e aproximada"""
+    
+    def __init__(self, mascaras=(), concursos=None, limite_vizinhos=LIMITE_VIZINHOS):
+        """
+        Constrói o índice
+        
+        Args:
+            mascaras (array-like): Máscaras uint32 dos sorteios
+            concursos (array-like): Números dos concursos (padrão: posição + 1)
+            limite_vizinhos (int): Maior histórico com os vizinhos pré-calculados
+        """
+        self._masks = np.asarray(mascaras, dtype=np.uint32).copy()
+        if concursos is None:
+            concursos = np.arange(1, len(self._masks) + 1)
+        self._concursos = np.asarray(concursos, dtype=np.int64).copy()
+        
+        # Consulta exata: máscara -> primeiro concurso em que saiu
+        self._exatos = {}
+        for mascara, concurso in zip(self._masks.tolist(), self._concursos.tolist()):
+            self._exatos.setdefault(mascara, concurso)
+        self._ordenados = np.unique(self._masks)
+        
+        # Vizinhos a uma dezena de diferença, ordenados para busca binária (None em históricos grandes)
+        self._vizinhos = None
+        if len(self._masks) <= limite_vizinhos:
+            self._vizinhos = np.unique(neighbor_masks(self._masks)) if len(self._masks) else np.zeros(0, dtype=np.uint32)
+        
+        # Tabelas de multi-index hashing por número de dezenas trocadas (construídas sob demanda)
+        self._tabelas = {}
+    
+    @classmethod
+    def from_store(cls, store):
+        """
+        Constrói o índice a partir de um histórico
+        
+        Args:
+            store (LotofacilDrawStore): Histórico de sorteios
+        
+        Returns:
+            DrawRepeatIndex: Índice do histórico
+        """
+        return cls(store.masks, store.concursos)
+    
+    def __len__(self):
+        return len(self._masks)
+    
+    def update(self, mascara, concurso=None):
+        """
+        Acrescenta um sorteio ao índice
+        
+        Args:
+            mascara (int): Máscara do sorteio
+            concurso (int): Número do concurso (padrão: próximo número)
+        """
+        if concurso is None:
+            concurso = int(self._concursos[-1]) + 1 if len(self._concursos) else 1
+        mascara = int(mascara)
+        posicao = len(self._masks)
+        
+        self._masks = np.append(self._masks, np.uint32(mascara))
+        self._concursos = np.append(self._concursos, np.int64(concurso))
+        
+        if mascara not in self._exatos:
+            self._exatos[mascara] = int(concurso)
+            self._ordenados = np.union1d(self._ordenados, np.array([mascara], dtype=np.uint32))
+        if self._vizinhos is not None:
+            self._vizinhos = np.union1d(self._vizinhos, neighbor_masks([mascara])[0])
+        
+        for k, (limites, tabelas) in self._tabelas.items():
+            for (inicio, fim), tabela in zip(limites, tabelas):
+                tabela.setdefault((mascara >> inicio) & ((1 << (fim - inicio)) - 1), []).append(posicao)
+    
+    def contains(self, mascara):
+        """
+        Verifica se um jogo já foi sorteado (O(1))
+        
+        Args:
+            mascara (int): Máscara do jogo
+        
+        Returns:
+            bool: True se o jogo saiu em algum concurso
+        """
+        return int(mascara) in self._exatos
+    
+    def concurso(self, mascara):
+        """
+        Obtém o primeiro concurso em que um jogo foi sorteado
+        
+        Args:
+            mascara (int): Máscara do jogo
+        
+        Returns:
+            int: Número do concurso ou None se nunca saiu
+        """
+        return self._exatos.get(int(mascara))
+    
+    @staticmethod
+    def _member(ordenados, mascaras):
+        """Pertinência de cada máscara a um array ordenado (busca binária vetorizada)"""
+        mascaras = np.asarray(mascaras, dtype=np.uint32)
+        if len(ordenados) == 0:
+            return np.zeros(len(mascaras), dtype=bool)
+        posicoes = np.minimum(np.searchsorted(ordenados, mascaras), len(ordenados) - 1)
+        return ordenados[posicoes] == mascaras
+    
+    def contains_many(self, mascaras):
+        """
+        Verifica quais jogos de um lote já foram sorteados
+        
+        Args:
+            mascaras (array-like): Máscaras uint32 dos jogos
+        
+        Returns:
+            numpy.ndarray: Máscara booleana (True = repetição exata)
+        """
+        return self._member(self._ordenados, mascaras)
+    
+    def near_many(self, mascaras):
+        """
+        Verifica quais jogos de um lote têm 14 ou 15 acertos com algum sorteio
+        
+        Args:
+            mascaras (array-like): Máscaras uint32 dos jogos
+        
+        Returns:
+            numpy.ndarray: Máscara booleana (True = repetição exata ou a uma dezena)
+        """
+        mascaras = np.asarray(mascaras, dtype=np.uint32)
+        if self._vizinhos is not None:
+            return self._member(self._ordenados, mascaras) | self._member(self._vizinhos, mascaras)
+        
+        # Vizinhança é simétrica: procurar os 150 vizinhos de cada jogo entre os sorteios
+        if len(mascaras) == 0:
+            return np.zeros(0, dtype=bool)
+        vizinhos = self._member(self._ordenados, neighbor_masks(mascaras).ravel()).reshape(len(mascaras), -1)
+        return self._member(self._ordenados, mascaras) | vizinhos.any(axis=1)
+    
+    def _mih_tables(self, k):
+        """Tabelas de multi-index hashing para até k dezenas trocadas"""
+        if k not in self._tabelas:
+            cortes = np.linspace(0, NUM_DEZENAS, 2 * k + 2).astype(int)
+            limites = list(zip(cortes[:-1].tolist(), cortes[1:].tolist()))
+            tabelas = []
+            for inicio, fim in limites:
+                segmentos = ((self._masks >> np.uint32(inicio)) & np.uint32((1 << (fim - inicio)) - 1)).tolist()
+                tabela = {}
+                for posicao, segmento in enumerate(segmentos):
+                    tabela.setdefault(segmento, []).append(posicao)
+                tabelas.append(tabela)
+            self._tabelas[k] = (limites, tabelas)
+        return self._tabelas[k]
+    
+    def within(self, mascara, k=1):
+        """
+        Lista os sorteios com no máximo k dezenas de diferença de um jogo
+        
+        Args:
+            mascara (int): Máscara do jogo
+            k (int): Número máximo de dezenas trocadas (1 = 14 acertos)
+        
+        Returns:
+            list: Tuplas (concurso, acertos), dos mais próximos para os mais distantes
+        """
+        mascara = int(mascara)
+        limites, tabelas = self._mih_tables(k)
+        
+        candidatos = set()
+        for (inicio, fim), tabela in zip(limites, tabelas):
+            candidatos.update(tabela.get((mascara >> inicio) & ((1 << (fim - inicio)) - 1), ()))
+        if not candidatos:
+            return []
+        
+        posicoes = np.fromiter(candidatos, dtype=np.int64, count=len(candidatos))
+        acertos = popcount(self._masks[posicoes] & np.uint32(mascara)).astype(np.int64)
+        proximos = acertos >= DEZENAS_POR_SORTEIO - k
+        
+        ordem = np.lexsort((self._concursos[posicoes][proximos], -acertos[proximos]))
+        return [(int(c), int(a)) for c, a in zip(self._concursos[posicoes][proximos][ordem], acertos[proximos][ordem])]
+    
+    def is_repeat(self, mascara, k=1):
+        """
+        Verifica se um jogo repete (ou quase repete) algum sorteio
+        
+        Args:
+            mascara (int): Máscara do jogo
+            k (int): Número máximo de dezenas trocadas (0 = apenas repetição exata)
+        
+        Returns:
+            bool: True se algum sorteio tem pelo menos 15 - k acertos com o jogo
+        """
+        if k == 0:
+            return self.contains(mascara)
+        if k == 1:
+            return bool(self.near_many([mascara])[0])
+        return len(self.within(mascara, k)) > 0
+    
+    def filter_new(self, mascaras, k=1):
+        """
+        Seleciona os jogos de um lote que não repetem nenhum sorteio
+        
+        Args:
+            mascaras (array-like): Máscaras uint32 dos jogos
+            k (int): Número máximo de dezenas trocadas considerado repetição
+        
+        Returns:
+            numpy.ndarray: Máscara booleana (True = jogo novo)
+        """
+        mascaras = np.asarray(mascaras, dtype=np.uint32)
+        if k == 0:
+            return ~self.contains_many(mascaras)
+        if k == 1:
+            return ~self.near_many(mascaras)
+        return np.array([not self.is_repeat(m, k) for m in mascaras.tolist()], dtype=bool)
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Histórico de sorteios compartilhado entre processos por um arquivo mapeado em memória
+
+O coletor publica o histórico em um arquivo colunar (concursos, máscaras e datas)
+com capacidade reservada e um contador de versão no cabeçalho. Os serviços abrem o
+arquivo somente leitura por mmap: as páginas ficam no page cache do sistema e são
+compartilhadas por todos os processos, sem uma cópia por serviço.
+
+Concursos novos são acrescentados no próprio arquivo e publicados atualizando o
+contador de registros entre dois incrementos da versão (seqlock: versão ímpar
+indica escrita em andamento). Os leitores só precisam comparar a versão para
+enxergar os novos sorteios. Quando o histórico é substituído ou a capacidade se
+esgota, um arquivo novo toma o lugar do antigo, que é marcado como obsoleto para
+que os leitores se reconectem.
+
+Há um único publicador (o coletor ou o LotofacilSystem antes de iniciar os serviços).
+"""
+
+import os
+import mmap
+import time
+import struct
+import logging
+import numpy as np
+
+from draw_store import LotofacilDrawStore
+
+logger = logging.getLogger('shared_history')
+
+# Caminho padrão do histórico compartilhado
+SHARED_HISTORY_PATH = '/home/ubuntu/lotofacil/data/historico/lotofacil_shared.bin'
+
+
+class SharedDrawHistory:
+    """Classe para publicação e leitura do histórico compartilhado"""
+    
+    # Cabeçalho: magic, formato, flags, versão, registros, capacidade (64 bytes reservados)
+    MAGIC = b'LTFS'
+    FORMATO = 1
+    HEADER = struct.Struct('<4sHHQQQ')
+    TAMANHO_HEADER = 64
+    OFFSET_FLAGS = 6
+    OFFSET_VERSAO = 8
+    OFFSET_REGISTROS = 16
+    
+    # Flags do cabeçalho
+    OBSOLETO = 1
+    
+    # Capacidade mínima reservada ao recriar o arquivo
+    CAPACIDADE_MINIMA = 4096
+    
+    def __init__(self, path=SHARED_HISTORY_PATH):
+        """
+        Inicializa um leitor ainda não conectado
+        
+        Args:
+            path (str): Caminho do arquivo compartilhado
+        """
+        self.path = path
+        self.version = None
+        self._mm = None
+        self._colunas = None
+        self._size = 0
+    
+    @classmethod
+    def _offsets(cls, capacidade):
+        """Posições das colunas concursos, máscaras e datas no arquivo"""
+        return [cls.TAMANHO_HEADER + i * capacidade * 4 for i in range(3)]
+    
+    @classmethod
+    def _columns(cls, mm, capacidade):
+        """Views uint32 das três colunas sobre o mapeamento"""
+        return [np.frombuffer(mm, dtype=np.uint32, count=capacidade, offset=offset)
+                for offset in cls._offsets(capacidade)]
+    
+    @classmethod
+    def _read_state(cls, mm, tentativas=10000):
+        """
+        Lê versão, flags e número de registros de forma consistente (seqlock)
+        
+        Returns:
+            tuple: (versão, flags, registros, capacidade)
+        """
+        for _ in range(tentativas):
+            magic, formato, flags, versao, registros, capacidade = cls.HEADER.unpack_from(mm, 0)
+            if magic != cls.MAGIC or formato != cls.FORMATO:
+                raise ValueError("Arquivo de histórico compartilhado inválido")
+            if versao % 2 == 0 and struct.unpack_from('<Q', mm, cls.OFFSET_VERSAO)[0] == versao:
+                return versao, flags, registros, capacidade
+            time.sleep(0)
+        raise TimeoutError("Histórico compartilhado em escrita há tempo demais")
+    
+    @classmethod
+    def attach(cls, path=SHARED_HISTORY_PATH):
+        """
+        Conecta-se ao histórico compartilhado, somente leitura
+        
+        Args:
+            path (str): Caminho do arquivo compartilhado
+        
+        Returns:
+            SharedDrawHistory: Leitor conectado ou None se o arquivo não existir
+        """
+        leitor = cls(path)
+        try:
+            leitor._attach()
+            return leitor
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Falha ao abrir histórico compartilhado {path}: {str(e)}")
+            return None
+    
+    def _attach(self):
+        """Mapeia o arquivo atual em self.path"""
+        with open(self.path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        versao, _, registros, capacidade = self._read_state(mm)
+        
+        # Views antigas continuam válidas para quem ainda as usa; o mapeamento é
+        # liberado quando a última referência deixa de existir
+        self._mm = mm
+        self._colunas = self._columns(mm, capacidade)
+        self._size = registros
+        self.version = versao
+    
+    def refresh(self):
+        """
+        Verifica se há uma versão nova do histórico (custo constante)
+        
+        Returns:
+            bool: True se o histórico mudou desde a última verificação
+        """
+        versao, flags, registros, _ = self._read_state(self._mm)
+        
+        if flags & self.OBSOLETO:
+            logger.info(f"Histórico compartilhado substituído. Reconectando a {self.path}")
+            self._attach()
+            return True
+        
+        if versao == self.version:
+            return False
+        
+        self._size = registros
+        self.version = versao
+        return True
+    
+    def __len__(self):
+        return self._size
+    
+    def snapshot(self):
+        """
+        Obtém o histórico na versão atual, sem copiar os dados
+        
+        Os arrays do resultado são views somente leitura sobre o mapeamento; a
+        quantidade de sorteios fica fixa mesmo que novos concursos sejam publicados.
+        
+        Returns:
+            LotofacilDrawStore: Histórico somente leitura
+        """
+        store = LotofacilDrawStore()
+        store._concursos, store._masks, store._datas = (coluna[:self._size] for coluna in self._colunas)
+        store._size = self._size
+        return store
+    
+    @classmethod
+    def publish(cls, store, path=SHARED_HISTORY_PATH):
+        """
+        Publica o histórico, acrescentando no próprio arquivo quando possível
+        
+        Args:
+            store (LotofacilDrawStore): Histórico completo
+            path (str): Caminho do arquivo compartilhado
+        
+        Returns:
+            int: Versão publicada
+        """
+        n = len(store)
+        antigo = None
+        versao = 0
+        
+        if os.path.exists(path):
+            try:
+                with open(path, 'r+b') as f:
+                    antigo = mmap.mmap(f.fileno(), 0)
+                versao, _, registros, capacidade = cls._read_state(antigo)
+                concursos, mascaras, datas = cls._columns(antigo, capacidade)
+                
+                # O arquivo atual contém um prefixo do histórico e há espaço: acrescentar
+                if registros <= n <= capacidade \
+                        and np.array_equal(concursos[:registros], store.concursos[:registros]) \
+                        and np.array_equal(mascaras[:registros], store.masks[:registros]):
+                    if registros == n:
+                        return versao
+                    
+                    concursos[registros:n] = store.concursos[registros:]
+                    mascaras[registros:n] = store.masks[registros:]
+                    datas[registros:n] = store.datas[registros:]
+                    antigo.flush()
+                    
+                    # Seqlock: versão ímpar durante a troca do número de registros
+                    struct.pack_into('<Q', antigo, cls.OFFSET_VERSAO, versao + 1)
+                    struct.pack_into('<Q', antigo, cls.OFFSET_REGISTROS, n)
+                    struct.pack_into('<Q', antigo, cls.OFFSET_VERSAO, versao + 2)
+                    antigo.flush()
+                    
+                    logger.info(f"{n - registros} concursos publicados no histórico compartilhado (versão {versao + 2})")
+                    return versao + 2
+            except Exception as e:
+                logger.warning(f"Histórico compartilhado existente descartado: {str(e)}")
+        
+        versao = cls._rewrite(store, path, versao + 2)
+        
+        # Avisar os leitores do arquivo antigo que devem se reconectar
+        if antigo is not None:
+            try:
+                flags = struct.unpack_from('<H', antigo, cls.OFFSET_FLAGS)[0]
+                struct.pack_into('<H', antigo, cls.OFFSET_FLAGS, flags | cls.OBSOLETO)
+                antigo.flush()
+            except Exception as e:
+                logger.warning(f"Falha ao marcar histórico compartilhado antigo: {str(e)}")
+        
+        return versao
+    
+    @classmethod
+    def _rewrite(cls, store, path, versao):
+        """Cria um arquivo novo com folga de capacidade e o coloca no lugar do atual"""
+        n = len(store)
+        capacidade = max(2 * n, cls.CAPACIDADE_MINIMA)
+        
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            cabecalho = cls.HEADER.pack(cls.MAGIC, cls.FORMATO, 0, versao, n, capacidade)
+            f.write(cabecalho.ljust(cls.TAMANHO_HEADER, b'\0'))
+            for coluna in (store.concursos, store.masks, store.datas):
+                bloco = np.zeros(capacidade, dtype='<u4')
+                bloco[:n] = coluna
+                f.write(bloco.tobytes())
+        os.replace(tmp_path, path)
+        
+        logger.info(f"Histórico compartilhado recriado em {path}: {n} concursos, capacidade {capacidade} (versão {versao})")
+        return versao
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Estatísticas por dezena e por sorteio do histórico da Lotofácil
+
+Todas as estatísticas (frequência, atraso atual e máximo de cada dezena,
+distribuições de pares, soma, moldura e centro) são calculadas em uma única
+passada vetorizada sobre as máscaras de bits do histórico. O resultado é
+guardado em memória e em disco junto com a versão do histórico, de modo que
+consultas repetidas não recalculam nada até que o coletor publique uma nova
+versão.
+"""
+
+import os
+import json
+import logging
+import threading
+import numpy as np
+from datetime import datetime
+
+from draw_store import NUM_DEZENAS, DEZENAS_POR_SORTEIO, VALORES_DEZENAS, MASCARA_PARES, MASCARA_MOLDURA
+from draw_store import masks_to_matrix, popcount
+from dataset_version import dataset_version, _write_json
+from windowed_counter import WindowedCounter
+
+logger = logging.getLogger('statistics_engine')
+
+# Caminho padrão do cache das estatísticas
+ESTATISTICAS_PATH = '/home/ubuntu/lotofacil/data/historico/lotofacil_estatisticas.json'
+
+# Faixas da distribuição da soma das dezenas (de 120 a 270, em faixas de 10)
+SOMA_MINIMA = sum(range(1, DEZENAS_POR_SORTEIO + 1))
+LARGURA_FAIXA_SOMA = 10
+
+# Janelas (últimos N concursos) com a contagem de cada dezena
+JANELAS_ESTATISTICAS = (5, 10, 15, 30, 100)
+
+
+def _distribuicao(valores, tamanho):
+    """Contagem de cada valor entre 0 e tamanho - 1, com chaves em texto (formato JSON)"""
+    contagem = np.bincount(valores, minlength=tamanho)
+    return {str(i): int(n) for i, n in enumerate(contagem)}
+
+
+def compute_statistics(store, janela=None):
+    """
+    Calcula as estatísticas do histórico em uma única passada
+    
+    Args:
+        store (LotofacilDrawStore): Histórico de sorteios
+        janela (int): Considerar apenas os últimos N concursos (None para todos)
+    
+    Returns:
+        dict: Estatísticas por dezena e distribuições por sorteio
+    
+    Raises:
+        ValueError: Se a janela não for positiva
+    """
+    mascaras = np.asarray(store.masks, dtype=np.uint32)
+    if janela is not None:
+        if janela < 1:
+            raise ValueError("janela deve ser um número positivo de concursos")
+        mascaras = mascaras[-janela:]
+    n = len(mascaras)
+    
+    matriz = masks_to_matrix(mascaras, dtype=bool)
+    frequencia = matriz.sum(axis=0)
+    
+    # Posições em que cada dezena saiu, agrupadas por dezena e em ordem crescente
+    dezenas, posicoes = np.nonzero(matriz.T)
+    anteriores = np.empty_like(posicoes)
+    anteriores[1:] = posicoes[:-1]
+    primeiras = np.ones(len(posicoes), dtype=bool)
+    primeiras[1:] = dezenas[1:] != dezenas[:-1]
+    anteriores[primeiras] = -1
+    
+    # Atraso = concursos seguidos sem a dezena; o atraso atual conta até o último concurso
+    atraso_maximo = np.zeros(NUM_DEZENAS, dtype=np.int64)
+    np.maximum.at(atraso_maximo, dezenas, posicoes - anteriores - 1)
+    ultima = np.full(NUM_DEZENAS, -1, dtype=np.int64)
+    np.maximum.at(ultima, dezenas, posicoes)
+    atraso_atual = n - 1 - ultima
+    atraso_maximo = np.maximum(atraso_maximo, atraso_atual)
+    
+    pares = popcount(mascaras & np.uint32(MASCARA_PARES)).astype(np.intp)
+    moldura = popcount(mascaras & np.uint32(MASCARA_MOLDURA)).astype(np.intp)
+    soma = matriz.astype(np.int64) @ VALORES_DEZENAS
+    
+    faixas_soma = (soma - SOMA_MINIMA) // LARGURA_FAIXA_SOMA
+    num_faixas = (sum(range(NUM_DEZENAS - DEZENAS_POR_SORTEIO + 1, NUM_DEZENAS + 1)) - SOMA_MINIMA) // LARGURA_FAIXA_SOMA + 1
+    contagem_soma = np.bincount(faixas_soma, minlength=num_faixas)
+    rotulos_soma = [f"{SOMA_MINIMA + LARGURA_FAIXA_SOMA * i}-{SOMA_MINIMA + LARGURA_FAIXA_SOMA * (i + 1) - 1}"
+                    for i in range(num_faixas)]
+    
+    return {
+        'concursos': n,
+        'janela': janela,
+        'ultimo_concurso': int(store.concursos[-1]) if len(store) else None,
+        'dezenas': [
+            {
+                'dezena': i + 1,
+                'frequencia': int(frequencia[i]),
+                'percentual': round(100.0 * frequencia[i] / n, 2) if n else 0.0,
+                'atraso_atual': int(atraso_atual[i]),
+                'atraso_maximo': int(atraso_maximo[i])
+            }
+            for i in range(NUM_DEZENAS)
+        ],
+        'paridade': {
+            'distribuicao': _distribuicao(pares, DEZENAS_POR_SORTEIO + 1),
+            'media_pares': round(float(pares.mean()), 2) if n else None
+        },
+        'soma': {
+            'distribuicao': dict(zip(rotulos_soma, contagem_soma.tolist())),
+            'faixa_mais_comum': rotulos_soma[int(contagem_soma.argmax())] if n else None,
+            'media': round(float(soma.mean()), 2) if n else None,
+            'minimo': int(soma.min()) if n else None,
+            'maximo': int(soma.max()) if n else None
+        },
+        'moldura': {
+            'distribuicao': _distribuicao(moldura, DEZENAS_POR_SORTEIO + 1),
+            'media': round(float(moldura.mean()), 2) if n else None
+        },
+        'centro': {
+            'distribuicao': _distribuicao(DEZENAS_POR_SORTEIO - moldura, DEZENAS_POR_SORTEIO + 1),
+            'media': round(float(DEZENAS_POR_SORTEIO - moldura.mean()), 2) if n else None
+        }
+    }
+
+
+class StatisticsEngine:
+    """Estatísticas do histórico com cache por versão do conjunto de dados"""
+    
+    def __init__(self, cache_path=ESTATISTICAS_PATH):
+        """
+        Inicializa o motor de estatísticas
+        
+        Args:
+            cache_path (str): Caminho do arquivo JSON com as estatísticas da versão atual
+        """
+        self.cache_path = cache_path
+        self.dataset_version = None
+        self._estatisticas = None
+        self._lock = threading.Lock()
+        
+        # Contagens das janelas, acompanhando o histórico concurso a concurso
+        self.contador = WindowedCounter(max(JANELAS_ESTATISTICAS))
+    
+    def _load_cache(self):
+        """Lê as estatísticas gravadas em disco"""
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return None
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Cache de estatísticas inválido em {self.cache_path}: {str(e)}")
+            return None
+    
+    def _compute(self, store, janela, versao):
+        """Calcula as estatísticas de uma janela com as contagens de JANELAS_ESTATISTICAS"""
+        estatisticas = compute_statistics(store, janela)
+        self.contador.sync(store)
+        estatisticas['janelas'] = {
+            str(j): self.contador.counts(j).tolist() for j in JANELAS_ESTATISTICAS
+        }
+        estatisticas['dataset_version'] = versao
+        estatisticas['updated_at'] = datetime.now().isoformat()
+        return estatisticas
+    
+    def get(self, store, janela=None):
+        """
+        Obtém as estatísticas do histórico, calculando-as apenas se a versão mudou
+        
+        Só o histórico completo e as janelas de JANELAS_ESTATISTICAS são guardados em
+        cache; outras janelas são calculadas a cada consulta, para que o cache não
+        cresça com os valores pedidos pelos clientes.
+        
+        Args:
+            store (LotofacilDrawStore): Histórico de sorteios
+            janela (int): Considerar apenas os últimos N concursos (None para todos)
+        
+        Returns:
+            dict: Estatísticas (ver compute_statistics), contagem de cada dezena nas janelas
+                de JANELAS_ESTATISTICAS em 'janelas' e a versão do histórico em 'dataset_version'
+        
+        Raises:
+            ValueError: Se a janela não for positiva
+        """
+        if janela is not None and janela < 1:
+            raise ValueError("janela deve ser um número positivo de concursos")
+        
+        versao = dataset_version(store)
+        chave = str(janela or 'todos')
+        
+        with self._lock:
+            if self.dataset_version != versao:
+                cache = self._load_cache()
+                if cache is not None and cache.get('dataset_version') == versao:
+                    self._estatisticas = cache['estatisticas']
+                else:
+                    self._estatisticas = {}
+                self.dataset_version = versao
+            
+            if janela is not None and janela not in JANELAS_ESTATISTICAS:
+                return self._compute(store, janela, versao)
+            
+            if chave not in self._estatisticas:
+                self._estatisticas[chave] = self._compute(store, janela, versao)
+                
+                if self.cache_path:
+                    _write_json(self.cache_path, {'dataset_version': versao, 'estatisticas': self._estatisticas})
+                logger.info(f"Estatísticas calculadas para a versão {versao} (janela: {chave})")
+            
+            return self._estatisticas[chave]
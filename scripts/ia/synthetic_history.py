@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Gerador vetorizado de históricos sintéticos da Lotofácil
+
+Produz sorteios válidos (15 dezenas distintas entre 1 e 25) em lotes NumPy,
+diretamente como máscaras de bits, para testes de carga e de escala com históricos
+muito maiores que o real. A mesma semente gera sempre o mesmo histórico,
+independentemente do tamanho dos lotes.
+"""
+
+import argparse
+import logging
+import numpy as np
+
+from draw_store import NUM_DEZENAS, DEZENAS_POR_SORTEIO, BITS_DEZENAS, LotofacilDrawStore
+
+logger = logging.getLogger('synthetic_history')
+
+# A Lotofácil é sorteada de segunda a sábado
+DIAS_SORTEIO = '1111110'
+
+
+def encode_datas(datas):
+    """
+    Converte um array datetime64[D] em inteiros aaaammdd
+    
+    Args:
+        datas (numpy.ndarray): Datas dos concursos
+    
+    Returns:
+        numpy.ndarray: Datas codificadas (uint32)
+    """
+    meses = datas.astype('datetime64[M]')
+    ano = meses.astype('datetime64[Y]').astype(np.int64) + 1970
+    mes = meses.astype(np.int64) % 12 + 1
+    dia = (datas - meses).astype(np.int64) + 1
+    return (ano * 10000 + mes * 100 + dia).astype(np.uint32)
+
+
+class SyntheticHistoryGenerator:
+    """Classe para geração de históricos sintéticos em lotes"""
+    
+    def __init__(self, seed=42, primeiro_concurso=1, data_inicial='2003-09-29', lote=1_000_000):
+        """
+        Inicializa o gerador
+        
+        Args:
+            seed (int): Semente do gerador aleatório (None para não reproduzível)
+            primeiro_concurso (int): Número do primeiro concurso gerado
+            data_inicial (str): Data do primeiro concurso (aaaa-mm-dd)
+            lote (int): Concursos gerados por vez (limita a memória usada)
+        """
+        self.seed = seed
+        self.primeiro_concurso = primeiro_concurso
+        self.data_inicial = np.busday_offset(np.datetime64(data_inicial, 'D'), 0, roll='forward',
+                                             weekmask=DIAS_SORTEIO)
+        self.lote = lote
+    
+    def masks(self, rng, quantidade):
+        """
+        Sorteia um lote de máscaras com 15 dezenas distintas
+        
+        Args:
+            rng (numpy.random.Generator): Gerador aleatório
+            quantidade (int): Número de sorteios
+        
+        Returns:
+            numpy.ndarray: Máscaras uint32
+        """
+        # As 15 menores de 25 chaves uniformes formam uma amostra sem reposição
+        chaves = rng.random((quantidade, NUM_DEZENAS))
+        escolhidas = np.argpartition(chaves, DEZENAS_POR_SORTEIO - 1, axis=1)[:, :DEZENAS_POR_SORTEIO]
+        return BITS_DEZENAS[escolhidas].sum(axis=1, dtype=np.uint32)
+    
+    def batches(self, num_concursos):
+        """
+        Gera o histórico em lotes
+        
+        Args:
+            num_concursos (int): Número total de concursos
+        
+        Yields:
+            tuple: (concursos, mascaras, datas) como arrays uint32
+        """
+        rng = np.random.default_rng(self.seed)
+        
+        for inicio in range(0, num_concursos, self.lote):
+            quantidade = min(self.lote, num_concursos - inicio)
+            posicoes = np.arange(inicio, inicio + quantidade)
+            
+            concursos = (self.primeiro_concurso + posicoes).astype(np.uint32)
+            datas = encode_datas(np.busday_offset(self.data_inicial, posicoes, weekmask=DIAS_SORTEIO))
+            
+            yield concursos, self.masks(rng, quantidade), datas
+    
+    def store(self, num_concursos, path=None):
+        """
+        Gera o histórico como LotofacilDrawStore
+        
+        Args:
+            num_concursos (int): Número de concursos
+            path (str): Caminho do arquivo binário associado (opcional)
+        
+        Returns:
+            LotofacilDrawStore: Histórico sintético
+        """
+        store = LotofacilDrawStore(path)
+        for concursos, mascaras, datas in self.batches(num_concursos):
+            store.extend(concursos, mascaras, datas)
+        return store
+    
+    def dataframe(self, num_concursos):
+        """
+        Gera o histórico no formato de lotofacil_raw.csv
+        
+        Args:
+            num_concursos (int): Número de concursos
+        
+        Returns:
+            pandas.DataFrame: Histórico sintético
+        """
+        return self.store(num_concursos).to_dataframe()
+    
+    def write(self, num_concursos, csv_path=None, store_path=None):
+        """
+        Grava o histórico em CSV e/ou no formato binário
+        
+        Args:
+            num_concursos (int): Número de concursos
+            csv_path (str): Caminho do CSV no formato de lotofacil_raw.csv
+            store_path (str): Caminho do histórico binário
+        
+        Returns:
+            LotofacilDrawStore: Histórico gravado
+        """
+        store = self.store(num_concursos, store_path)
+        
+        if csv_path is not None:
+            store.to_csv(csv_path)
+        if store_path is not None:
+            store.save()
+        
+        logger.info(f"Histórico sintético com {num_concursos} concursos gravado")
+        
+        return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Gerador de históricos sintéticos da Lotofácil')
+    parser.add_argument('--concursos', type=int, default=1_000_000, help='Número de concursos')
+    parser.add_argument('--seed', type=int, default=42, help='Semente do gerador aleatório')
+    parser.add_argument('--csv', help='Caminho do CSV no formato de lotofacil_raw.csv')
+    parser.add_argument('--store', help='Caminho do histórico binário')
+    args = parser.parse_args()
+    
+    gerado = SyntheticHistoryGenerator(seed=args.seed).write(args.concursos, args.csv, args.store)
+    print(f"{len(gerado)} concursos gerados (último: {gerado.last_concurso})")
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Contagem de dezenas em janelas móveis dos últimos concursos
+
+Um buffer circular guarda as contagens acumuladas de cada dezena após cada
+sorteio. A contagem dos últimos N concursos é a diferença entre duas linhas do
+buffer, de modo que acrescentar um sorteio custa O(25) e consultar qualquer
+janela (5, 10, 15, 30, 100...) até a capacidade do buffer também custa O(25),
+sem manter somas separadas por janela.
+"""
+
+import logging
+import numpy as np
+
+from draw_store import NUM_DEZENAS, masks_to_matrix
+
+logger = logging.getLogger('windowed_counter')
+
+# Capacidade padrão (maior janela consultável)
+CAPACIDADE_PADRAO = 1000
+
+
+class WindowedCounter:
+    """Contagens por dezena nas janelas dos últimos concursos, atualizadas sorteio a sorteio"""
+    
+    def __init__(self, capacidade=CAPACIDADE_PADRAO):
+        """
+        Inicializa um contador vazio
+        
+        Args:
+            capacidade (int): Maior janela consultável (em concursos)
+        """
+        if capacidade < 1:
+            raise ValueError("A capacidade deve ser de pelo menos 1 concurso")
+        self.capacidade = int(capacidade)
+        
+        # Linha t % (capacidade + 1): contagens acumuladas após os t primeiros sorteios
+        self.acumulados = np.zeros((self.capacidade + 1, NUM_DEZENAS), dtype=np.int64)
+        
+        # Últimas máscaras, na posição t % capacidade
+        self.ring = np.zeros(self.capacidade, dtype=np.uint32)
+        
+        # Quantidade de sorteios processados e índice da última aparição de cada dezena
+        self.count = 0
+        self.last_seen = np.full(NUM_DEZENAS, -1, dtype=np.int64)
+        
+        # Último concurso incorporado por sync
+        self.last_concurso = None
+    
+    def __len__(self):
+        return self.count
+    
+    @property
+    def last_mask(self):
+        """Máscara do último sorteio acrescentado (None se vazio)"""
+        if self.count == 0:
+            return None
+        return int(self.ring[(self.count - 1) % self.capacidade])
+    
+    def append(self, mascara):
+        """
+        Acrescenta um sorteio em O(25)
+        
+        Args:
+            mascara (int): Máscara de bits do sorteio
+        
+        Returns:
+            numpy.ndarray: Linha indicadora (25 posições) do sorteio
+        """
+        t = self.count
+        linha = masks_to_matrix([mascara], dtype=np.int64)[0]
+        
+        linhas = self.capacidade + 1
+        np.add(self.acumulados[t % linhas], linha, out=self.acumulados[(t + 1) % linhas])
+        self.ring[t % self.capacidade] = mascara
+        self.last_seen[linha.astype(bool)] = t
+        self.count = t + 1
+        
+        return linha
+    
+    def extend(self, mascaras):
+        """
+        Acrescenta vários sorteios em sequência (vetorizado)
+        
+        Args:
+            mascaras (array-like): Máscaras de bits em ordem de concurso
+        """
+        mascaras = np.asarray(mascaras, dtype=np.uint32)
+        n = len(mascaras)
+        if n == 0:
+            return
+        
+        # Apenas as últimas capacidade + 1 linhas acumuladas continuam no buffer
+        matriz = masks_to_matrix(mascaras, dtype=np.int64)
+        acumulados = self.acumulados[self.count % (self.capacidade + 1)] + np.cumsum(matriz, axis=0)
+        posicoes = np.arange(self.count + 1, self.count + n + 1)
+        ultimas = slice(max(0, n - self.capacidade - 1), n)
+        self.acumulados[posicoes[ultimas] % (self.capacidade + 1)] = acumulados[ultimas]
+        
+        recentes = slice(max(0, n - self.capacidade), n)
+        self.ring[np.arange(self.count, self.count + n)[recentes] % self.capacidade] = mascaras[recentes]
+        
+        # Última aparição: posição da última linha com a dezena sorteada
+        aparicoes = matriz[::-1].astype(bool)
+        vistas = aparicoes.any(axis=0)
+        self.last_seen = np.where(vistas, self.count + n - 1 - aparicoes.argmax(axis=0), self.last_seen)
+        
+        self.count += n
+    
+    def sync(self, store):
+        """
+        Sincroniza o contador com um histórico
+        
+        Se o último concurso incorporado ainda está no histórico com a mesma máscara,
+        apenas os concursos seguintes são acrescentados (O(25) cada). Caso contrário
+        o contador é refeito com os últimos concursos que cabem no buffer.
+        
+        Args:
+            store (LotofacilDrawStore): Histórico de sorteios
+        
+        Returns:
+            bool: True se a sincronização foi incremental
+        """
+        posicao = store.index(self.last_concurso) if self.last_concurso is not None else None
+        incremental = posicao is not None and self.last_mask == int(store.masks[posicao])
+        
+        if incremental:
+            self.extend(store.masks[posicao + 1:])
+        else:
+            self.acumulados[:] = 0
+            self.ring[:] = 0
+            self.last_seen = np.full(NUM_DEZENAS, -1, dtype=np.int64)
+            self.count = 0
+            self.extend(store.masks[-self.capacidade:])
+        
+        self.last_concurso = int(store.concursos[-1]) if len(store) else None
+        return incremental
+    
+    @classmethod
+    def from_masks(cls, mascaras, capacidade=CAPACIDADE_PADRAO):
+        """
+        Constrói o contador a partir de um histórico
+        
+        Args:
+            mascaras (array-like): Máscaras de bits em ordem de concurso
+            capacidade (int): Maior janela consultável
+        
+        Returns:
+            WindowedCounter: Contador equivalente a ter acrescentado todos os sorteios
+        """
+        contador = cls(capacidade)
+        contador.extend(mascaras)
+        return contador
+    
+    def _janela(self, janela):
+        """Número de sorteios efetivamente cobertos por uma janela"""
+        if janela > self.capacidade:
+            raise ValueError(f"Janela de {janela} concursos maior que a capacidade ({self.capacidade})")
+        if janela < 1:
+            raise ValueError("A janela deve ter pelo menos 1 concurso")
+        return min(int(janela), self.count)
+    
+    def counts(self, janela):
+        """
+        Conta quantas vezes cada dezena saiu nos últimos concursos, em O(25)
+        
+        Args:
+            janela (int): Número de concursos (até a capacidade)
+        
+        Returns:
+            numpy.ndarray: Contagem de cada dezena (25 posições)
+        """
+        n = self._janela(janela)
+        linhas = self.capacidade + 1
+        return self.acumulados[self.count % linhas] - self.acumulados[(self.count - n) % linhas]
+    
+    def frequencies(self, janela):
+        """
+        Calcula a frequência de cada dezena nos últimos concursos
+        
+        Equivale a rolling(janela, min_periods=1).mean() na última linha do histórico.
+        
+        Args:
+            janela (int): Número de concursos (até a capacidade)
+        
+        Returns:
+            numpy.ndarray: Frequência de cada dezena entre 0 e 1 (25 posições)
+        """
+        n = self._janela(janela)
+        if n == 0:
+            return np.zeros(NUM_DEZENAS)
+        return self.counts(janela) / n
+    
+    def delays(self):
+        """
+        Calcula há quantos concursos cada dezena não sai
+        
+        Returns:
+            numpy.ndarray: Atraso de cada dezena (0 = saiu no último concurso)
+        """
+        return self.count - 1 - self.last_seen
+    
+    def window_masks(self, janela):
+        """
+        Obtém as máscaras dos últimos concursos, da mais antiga para a mais recente
+        
+        Args:
+            janela (int): Número de concursos (até a capacidade)
+        
+        Returns:
+            numpy.ndarray: Máscaras uint32 (sem cópia quando a janela não dá a volta no buffer)
+        """
+        n = self._janela(janela)
+        inicio = (self.count - n) % self.capacidade
+        if inicio + n <= self.capacidade:
+            return self.ring[inicio:inicio + n]
+        return np.concatenate([self.ring[inicio:], self.ring[:inicio + n - self.capacidade]])
+    
+    def snapshot(self):
+        """
+        Obtém uma visão somente leitura do estado, sem cópia
+        
+        Returns:
+            dict: Arrays 'acumulados', 'ring' e 'last_seen' (somente leitura) e 'count'
+        """
+        visoes = {}
+        for nome in ('acumulados', 'ring', 'last_seen'):
+            visao = getattr(self, nome).view()
+            visao.flags.writeable = False
+            visoes[nome] = visao
+        visoes['count'] = self.count
+        return visoes
+    
+    @classmethod
+    def from_arrays(cls, acumulados, ring, last_seen, count):
+        """
+        Reconstrói o contador a partir dos arrays de snapshot (ex.: lidos de um .npz)
+        
+        Args:
+            acumulados (numpy.ndarray): Buffer de contagens acumuladas
+            ring (numpy.ndarray): Buffer de máscaras
+            last_seen (numpy.ndarray): Última aparição de cada dezena
+            count (int): Quantidade de sorteios processados
+        
+        Returns:
+            WindowedCounter: Contador restaurado
+        """
+        contador = cls(len(ring))
+        contador.acumulados = np.array(acumulados, dtype=np.int64)
+        contador.ring = np.array(ring, dtype=np.uint32)
+        contador.last_seen = np.array(last_seen, dtype=np.int64)
+        contador.count = int(count)
+        return contador
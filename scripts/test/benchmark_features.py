@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark do construtor vetorizado de features contra a implementação anterior com pandas
+"""
+
+import sys
+import time
+import argparse
+import warnings
+import numpy as np
+import pandas as pd
+
+# Adicionar diretório dos módulos de IA ao path
+sys.path.append('/home/ubuntu/lotofacil/scripts/ia')
+
+from feature_engine import LotofacilFeatureEngine
+from synthetic_history import SyntheticHistoryGenerator
+
+
+def features_pandas(df):
+    """
+    Implementação anterior de process_data_for_ml (uma passada de apply por coluna)
+    
+    Mantém a comparação por texto original: com dezenas zeradas à esquerda ('01'...'09'),
+    formato gravado pela API principal, as colunas dezena_1..dezena_9 ficavam sempre em 0.
+    """
+    warnings.simplefilter('ignore', pd.errors.PerformanceWarning)
+    
+    df_processed = pd.DataFrame()
+    df_processed['concurso'] = df['concurso']
+    df_processed['data'] = df['data']
+    
+    for i in range(1, 26):
+        df_processed[f'dezena_{i}'] = df['dezenas'].apply(
+            lambda x: 1 if str(i) in x.split(',') else 0
+        )
+    
+    df_processed['pares'] = df['pares']
+    df_processed['impares'] = df['impares']
+    df_processed['soma'] = df['soma']
+    
+    for i in range(1, 26):
+        df_processed[f'freq_10_{i}'] = df_processed[f'dezena_{i}'].rolling(window=10, min_periods=1).mean()
+    
+    for i in range(1, 26):
+        df_processed[f'freq_30_{i}'] = df_processed[f'dezena_{i}'].rolling(window=30, min_periods=1).mean()
+    
+    for i in range(1, 26):
+        col_name = f'dezena_{i}'
+        df_processed[f'atraso_{i}'] = df_processed[col_name].cumsum()
+        df_processed[f'atraso_{i}'] = df_processed[f'atraso_{i}'].diff().fillna(0)
+        df_processed[f'atraso_{i}'] = df_processed[f'atraso_{i}'].apply(lambda x: 0 if x > 0 else 1)
+        df_processed[f'atraso_{i}'] = df_processed[f'atraso_{i}'].cumsum()
+    
+    return df_processed
+
+
+def run_benchmark(num_concursos=100000):
+    """
+    Executa o benchmark e verifica que as features equivalentes coincidem
+    
+    Args:
+        num_concursos (int): Tamanho do histórico sintético
+    
+    Returns:
+        dict: Tempos de cada implementação e ganho obtido
+    """
+    print(f"Gerando histórico sintético com {num_concursos} concursos...")
+    store = SyntheticHistoryGenerator(seed=42).store(num_concursos)
+    df = store.to_dataframe()
+    engine = LotofacilFeatureEngine()
+    
+    inicio = time.perf_counter()
+    esperado = features_pandas(df)
+    tempo_pandas = time.perf_counter() - inicio
+    
+    inicio = time.perf_counter()
+    obtido = engine.build(store)
+    tempo_vetorizado = time.perf_counter() - inicio
+    
+    # Dezenas 10 a 25 e suas frequências devem coincidir (o atraso agora é zerado a cada aparição)
+    sufixos = tuple(f'_{i}' for i in range(10, 26))
+    colunas = [c for c in esperado.columns if c.startswith(('dezena_', 'freq_')) and c.endswith(sufixos)]
+    assert np.allclose(esperado[colunas].to_numpy(dtype=float), obtido[colunas].to_numpy(dtype=float)), \
+        "Features vetorizadas divergem da implementação anterior"
+    
+    # Dezenas 1 a 9: a implementação anterior não as reconhecia no formato zerado à esquerda
+    corrigidas = [f'dezena_{i}' for i in range(1, 10)]
+    divergencias = int((esperado[corrigidas].to_numpy() != obtido[corrigidas].to_numpy()).sum())
+    assert esperado[corrigidas].to_numpy().sum() == 0, "Implementação anterior reconheceu dezenas zeradas à esquerda"
+    print(f"dezena_1..dezena_9: {divergencias} marcações ausentes na implementação anterior (corrigidas)")
+    
+    resultado = {
+        'num_concursos': num_concursos,
+        'pandas_s': round(tempo_pandas, 4),
+        'vetorizado_s': round(tempo_vetorizado, 4),
+        'ganho': round(tempo_pandas / tempo_vetorizado, 1),
+        'divergencias_1_9': divergencias
+    }
+    
+    print(f"pandas: {resultado['pandas_s']}s | vetorizado: {resultado['vetorizado_s']}s | ganho: {resultado['ganho']}x")
+    
+    return resultado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark do construtor de features da Lotofácil')
+    parser.add_argument('--concursos', type=int, default=100000, help='Tamanho do histórico sintético')
+    args = parser.parse_args()
+    
+    run_benchmark(args.concursos)
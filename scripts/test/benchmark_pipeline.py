@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark do pipeline de dados com históricos sintéticos grandes
+
+Mede o tempo de execução e o pico de memória (tracemalloc) das etapas do
+pipeline (leitura da resposta da API, features, sequências do LSTM e estratégia
+de ciclo) para históricos de 1 mil, 100 mil e 1 milhão de concursos, grava os
+resultados em JSON e compara duas execuções para identificar regressões.
+
+Uso:
+    python benchmark_pipeline.py --tamanhos 1000 100000 --saida resultado.json
+    python benchmark_pipeline.py --comparar base.json resultado.json --tolerancia 0.2
+"""
+
+import os
+import gc
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+# Adicionar diretórios dos módulos de IA e das estratégias ao path
+sys.path.append('/home/ubuntu/lotofacil/scripts/ia')
+sys.path.append('/home/ubuntu/lotofacil/scripts/estrategias')
+
+from data_collector import LotofacilDataCollector
+from draw_store import LotofacilDrawStore, masks_to_matrix
+from feature_cache import ProcessedFeatureCache
+from dataset_version import VersionedCache
+from synthetic_history import SyntheticHistoryGenerator
+from ciclo_dezenas_fora import CicloDezenasFora
+
+# Tamanhos padrão dos históricos sintéticos
+TAMANHOS_PADRAO = (1_000, 100_000, 1_000_000)
+
+# Diretório padrão dos resultados
+RESULTADOS_DIR = '/home/ubuntu/lotofacil/data/benchmarks'
+
+# Tamanho dos blocos da resposta simulada da API
+TAMANHO_BLOCO = 1 << 16
+
+
+def api_payload(store):
+    """
+    Gera o corpo da resposta da API principal para um histórico
+    
+    Args:
+        store (LotofacilDrawStore): Histórico de sorteios
+    
+    Returns:
+        bytes: JSON com a lista de concursos (concurso, data, dezenas)
+    """
+    dezenas = np.nonzero(masks_to_matrix(store.masks))[1].reshape(len(store), -1) + 1
+    concursos = [
+        {
+            'concurso': int(concurso),
+            'data': f"{data % 100:02d}/{data // 100 % 100:02d}/{data // 10000}",
+            'dezenas': [f'{d:02d}' for d in linha]
+        }
+        for concurso, data, linha in zip(store.concursos.tolist(), store.datas.tolist(), dezenas.tolist())
+    ]
+    return json.dumps(concursos).encode('utf-8')
+
+
+def criar_coletor(diretorio):
+    """Cria um coletor que grava apenas no diretório do benchmark"""
+    collector = LotofacilDataCollector()
+    collector.raw_data_path = os.path.join(diretorio, 'lotofacil_raw.csv')
+    collector.processed_data_path = os.path.join(diretorio, 'lotofacil_processed.csv')
+    collector.json_data_path = os.path.join(diretorio, 'lotofacil_data.json')
+    collector.store_path = os.path.join(diretorio, 'lotofacil_draws.bin')
+    collector.feature_state_path = os.path.join(diretorio, 'lotofacil_features_state.npz')
+    collector.feature_cache = ProcessedFeatureCache(os.path.join(diretorio, 'lotofacil_processed_cache'))
+    collector.shared_history_path = os.path.join(diretorio, 'lotofacil_shared.bin')
+    collector.dataset_version_path = os.path.join(diretorio, 'lotofacil_version.json')
+    collector.stage_cache = VersionedCache(os.path.join(diretorio, 'lotofacil_stages.json'))
+    return collector
+
+
+def criar_ciclo(diretorio, collector):
+    """Cria a estratégia de ciclo sobre os arquivos do benchmark"""
+    ciclo = CicloDezenasFora()
+    ciclo.data_path = collector.raw_data_path
+    ciclo.store_path = collector.store_path
+    ciclo.shared_history_path = collector.shared_history_path
+    ciclo.ciclos_path = os.path.join(diretorio, 'ciclos_dezenas.json')
+    ciclo.versions = VersionedCache(os.path.join(diretorio, 'versions.json'))
+    return ciclo
+
+
+def exigir(funcao, nome):
+    """Envolve uma etapa para que uma falha (None, False ou (None, None)) interrompa o benchmark"""
+    def executar():
+        resultado = funcao()
+        if resultado is None or resultado is False or (isinstance(resultado, tuple) and resultado[0] is None):
+            raise RuntimeError(f"A etapa {nome} falhou (ver logs)")
+        return resultado
+    return executar
+
+
+def medir(funcao, preparar=None, memoria=True):
+    """
+    Mede o tempo de execução e o pico de memória de uma etapa
+    
+    O tempo é medido sem tracemalloc (que deixa a execução mais lenta); o pico de
+    memória vem de uma segunda execução, precedida da mesma preparação.
+    
+    Args:
+        funcao (callable): Etapa medida
+        preparar (callable): Preparação executada antes de cada medição (não medida)
+        memoria (bool): Se True, mede também o pico de memória
+    
+    Returns:
+        dict: tempo_s e pico_mb (None se a memória não foi medida)
+    """
+    if preparar is not None:
+        preparar()
+    gc.collect()
+    inicio = time.perf_counter()
+    funcao()
+    tempo = time.perf_counter() - inicio
+    
+    pico = None
+    if memoria:
+        if preparar is not None:
+            preparar()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            funcao()
+            pico = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    
+    return {
+        'tempo_s': round(tempo, 4),
+        'pico_mb': round(pico / 2 ** 20, 2) if pico is not None else None
+    }
+
+
+def run_size(num_concursos, seed=42, memoria=True):
+    """
+    Executa todas as etapas do pipeline para um tamanho de histórico
+    
+    Args:
+        num_concursos (int): Tamanho do histórico sintético
+        seed (int): Semente do gerador
+        memoria (bool): Se True, mede também o pico de memória
+    
+    Returns:
+        dict: Medições de cada etapa
+    """
+    with tempfile.TemporaryDirectory(prefix='benchmark_pipeline_') as diretorio:
+        collector = criar_coletor(diretorio)
+        ciclo = criar_ciclo(diretorio, collector)
+        
+        print(f"Gerando histórico sintético com {num_concursos} concursos...")
+        store = SyntheticHistoryGenerator(seed=seed).write(num_concursos, collector.raw_data_path, collector.store_path)
+        payload = api_payload(store)
+        blocos = [payload[i:i + TAMANHO_BLOCO] for i in range(0, len(payload), TAMANHO_BLOCO)]
+        
+        # Ciclo iniciado nos primeiros concursos, para que atualizar_ciclo percorra o histórico
+        inicio_ciclo = LotofacilDrawStore()
+        inicio_ciclo.extend(store.concursos[:10], store.masks[:10], store.datas[:10])
+        
+        def fetch():
+            tmp_path, recebido = collector._consume_history('benchmark', iter(blocos))
+            os.remove(tmp_path)
+            return len(recebido) == num_concursos
+        
+        def preparar_ciclo():
+            ciclo.versions.invalidate()
+            ciclo.ciclo_atual = None
+            ciclo.iniciar_ciclo(inicio_ciclo)
+        
+        def preparar_jogos():
+            ciclo.indice_repeticoes = None
+        
+        etapas = [
+            ('fetch', fetch, None),
+            ('process_data_for_ml', lambda: collector.process_data_for_ml(), None),
+            ('create_sequence_data', lambda: collector.create_sequence_data(5), None),
+            ('identificar_dezenas_fora', lambda: ciclo.identificar_dezenas_fora(store, 10), lambda: setattr(ciclo, 'contador', None)),
+            ('atualizar_ciclo', lambda: ciclo.atualizar_ciclo(store), preparar_ciclo),
+            ('gerar_jogos', lambda: ciclo.gerar_jogos(100), preparar_jogos)
+        ]
+        
+        resultados = {}
+        for nome, funcao, preparar in etapas:
+            resultados[nome] = medir(exigir(funcao, nome), preparar, memoria)
+            print(f"  {nome}: {resultados[nome]['tempo_s']}s | pico {resultados[nome]['pico_mb']} MB")
+        
+        return resultados
+
+
+def run_benchmark(tamanhos=TAMANHOS_PADRAO, saida=None, seed=42, memoria=True):
+    """
+    Executa o benchmark para cada tamanho de histórico e grava os resultados
+    
+    Args:
+        tamanhos (tuple): Tamanhos dos históricos sintéticos
+        saida (str): Caminho do JSON de resultados (padrão: RESULTADOS_DIR/pipeline_<data>.json)
+        seed (int): Semente do gerador
+        memoria (bool): Se True, mede também o pico de memória
+    
+    Returns:
+        dict: Ambiente de execução e medições por tamanho e etapa
+    """
+    resultado = {
+        'data': datetime.now().isoformat(),
+        'ambiente': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'plataforma': platform.platform(),
+            'processadores': os.cpu_count()
+        },
+        'seed': seed,
+        'resultados': {}
+    }
+    
+    for num_concursos in tamanhos:
+        resultado['resultados'][str(num_concursos)] = run_size(num_concursos, seed, memoria)
+    
+    if saida is None:
+        os.makedirs(RESULTADOS_DIR, exist_ok=True)
+        saida = os.path.join(RESULTADOS_DIR, f"pipeline_{datetime.now().strftime('%Y%m%d%H%M%S')}.json")
+    
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=4)
+    
+    print(f"Resultados gravados em {saida}")
+    
+    return resultado
+
+
+def comparar(base_path, novo_path, tolerancia=0.2):
+    """
+    Compara duas execuções do benchmark
+    
+    Args:
+        base_path (str): JSON da execução de referência
+        novo_path (str): JSON da execução comparada
+        tolerancia (float): Aumento relativo aceito antes de apontar regressão (0.2 = 20%)
+    
+    Returns:
+        list: Regressões encontradas (tamanho, etapa, métrica, valor base, valor novo)
+    """
+    with open(base_path, 'r', encoding='utf-8') as f:
+        base = json.load(f)['resultados']
+    with open(novo_path, 'r', encoding='utf-8') as f:
+        novo = json.load(f)['resultados']
+    
+    regressoes = []
+    print(f"{'tamanho':>10} {'etapa':<26} {'tempo base':>11} {'tempo novo':>11} {'razão':>7} {'pico base':>10} {'pico novo':>10}")
+    
+    for tamanho in sorted(set(base) & set(novo), key=int):
+        for etapa in base[tamanho]:
+            if etapa not in novo[tamanho]:
+                continue
+            antes, depois = base[tamanho][etapa], novo[tamanho][etapa]
+            razao = depois['tempo_s'] / antes['tempo_s'] if antes['tempo_s'] else float('inf')
+            
+            marcas = []
+            for metrica in ('tempo_s', 'pico_mb'):
+                if antes.get(metrica) is None or depois.get(metrica) is None:
+                    continue
+                if depois[metrica] > antes[metrica] * (1 + tolerancia):
+                    regressoes.append((int(tamanho), etapa, metrica, antes[metrica], depois[metrica]))
+                    marcas.append(metrica)
+            
+            print(f"{tamanho:>10} {etapa:<26} {antes['tempo_s']:>11.4f} {depois['tempo_s']:>11.4f} {razao:>7.2f} "
+                  f"{str(antes.get('pico_mb')):>10} {str(depois.get('pico_mb')):>10}"
+                  f"{'  REGRESSÃO (' + ', '.join(marcas) + ')' if marcas else ''}")
+    
+    print(f"\n{len(regressoes)} regressões acima de {tolerancia:.0%}")
+    
+    return regressoes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark do pipeline de dados da Lotofácil')
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=list(TAMANHOS_PADRAO), help='Tamanhos dos históricos sintéticos')
+    parser.add_argument('--saida', default=None, help='Caminho do JSON de resultados')
+    parser.add_argument('--seed', type=int, default=42, help='Semente do gerador')
+    parser.add_argument('--sem-memoria', action='store_true', help='Não medir o pico de memória')
+    parser.add_argument('--comparar', nargs=2, metavar=('BASE', 'NOVO'), help='Compara dois arquivos de resultados')
+    parser.add_argument('--tolerancia', type=float, default=0.2, help='Aumento relativo aceito na comparação')
+    args = parser.parse_args()
+    
+    if args.comparar:
+        sys.exit(1 if comparar(*args.comparar, tolerancia=args.tolerancia) else 0)
+    
+    run_benchmark(args.tamanhos, args.saida, args.seed, not args.sem_memoria)
@@ -0,0 +1,876 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Testes offline da coleta de dados da Lotofácil, usando servidores HTTP locais
+no lugar da API principal e da API alternativa
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Adicionar diretório dos módulos de IA ao path
+sys.path.append('/home/ubuntu/lotofacil/scripts/ia')
+
+from http_fetcher import HedgedFetcher
+from data_collector import LotofacilDataCollector
+from draw_store import LotofacilDrawStore
+from feature_cache import ProcessedFeatureCache
+from feature_engine import sequence_windows
+from http_cache import HttpResponseCache
+from json_stream import iter_json_array
+from synthetic_history import SyntheticHistoryGenerator
+from draw_store import popcount, mask_to_dezenas
+from cooccurrence import LotofacilCooccurrenceIndex
+from shared_history import SharedDrawHistory
+from dataset_version import dataset_version, VersionedCache
+from repeat_index import DrawRepeatIndex
+from nearest_draws import NearestDrawIndex, combination_rank
+from statistics_engine import StatisticsEngine, compute_statistics
+from windowed_counter import WindowedCounter
+
+
+def gerar_concursos(quantidade, primeiro=1):
+    """Gera concursos no formato da API principal"""
+    concursos = []
+    for numero in range(primeiro, primeiro + quantidade):
+        dezenas = sorted(((numero * 7 + i) % 25) + 1 for i in range(15))
+        concursos.append({
+            'concurso': numero,
+            'data': '01/01/2025',
+            'dezenas': [f'{d:02d}' for d in dezenas]
+        })
+    return concursos
+
+
+class LocalLotofacilServer:
+    """Servidor HTTP local que imita a API de resultados da Lotofácil"""
+    
+    def __init__(self, concursos, delay=0.0, status=200, etag=True):
+        """
+        Inicializa o servidor
+        
+        Args:
+            concursos (list): Concursos servidos em /api/lotofacil
+            delay (float): Atraso de cada resposta em segundos
+            status (int): Código de status das respostas
+            etag (bool): Se True, envia ETag e responde 304 a requisições condicionais
+        """
+        self.concursos = concursos
+        self.delay = delay
+        self.status = status
+        self.etag = etag
+        self.requests = []
+        self.not_modified = 0
+        
+        servidor = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                servidor.requests.append(self.path)
+                time.sleep(servidor.delay)
+                
+                corpo = servidor.responder(self.path)
+                if corpo is None or servidor.status != 200:
+                    self.send_response(servidor.status if servidor.status != 200 else 404)
+                    self.end_headers()
+                    return
+                
+                etag = f'"{hashlib.sha1(corpo).hexdigest()[:16]}"'
+                if servidor.etag and self.headers.get('If-None-Match') == etag:
+                    servidor.not_modified += 1
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                if servidor.etag:
+                    self.send_header('ETag', etag)
+                self.send_header('Content-Length', str(len(corpo)))
+                self.end_headers()
+                try:
+                    self.wfile.write(corpo)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+            
+            def log_message(self, *args):
+                pass
+        
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+    
+    @property
+    def url(self):
+        """URL base equivalente a api_url"""
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/api/lotofacil"
+    
+    def responder(self, path):
+        """Monta o corpo da resposta para um caminho"""
+        partes = path.rstrip('/').split('/')
+        if partes[-1] == 'lotofacil':
+            return json.dumps(self.concursos).encode('utf-8')
+        if partes[-1] == 'latest':
+            return json.dumps(self.concursos[-1]).encode('utf-8')
+        for concurso in self.concursos:
+            if str(concurso['concurso']) == partes[-1]:
+                return json.dumps(concurso).encode('utf-8')
+        return None
+    
+    def __enter__(self):
+        self.thread.start()
+        return self
+    
+    def __exit__(self, *args):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def test_fetch_fonte_mais_rapida():
+    """Testa que, em paralelo, vence a fonte que responde primeiro"""
+    print("Testando busca em paralelo...")
+    
+    concursos = gerar_concursos(10)
+    with LocalLotofacilServer(concursos, delay=0.5) as lenta, LocalLotofacilServer(concursos) as rapida:
+        fetcher = HedgedFetcher({'principal': lenta.url, 'alternativa': rapida.url}, hedge_delay=0)
+        
+        inicio = time.perf_counter()
+        fonte, data = fetcher.fetch(parse=lambda r: r.json())
+        duracao = time.perf_counter() - inicio
+        
+        assert fonte == 'alternativa', f"Fonte vencedora inesperada: {fonte}"
+        assert data == concursos, "Dados divergentes"
+        assert duracao < 0.4, f"A busca esperou a fonte lenta ({duracao:.2f}s)"
+        
+        fetcher.close()
+    
+    print("✓ Fonte mais rápida venceu sem esperar a mais lenta")
+    return True
+
+
+def test_fetch_hedge_apos_atraso():
+    """Testa que a fonte alternativa só é acionada depois de hedge_delay"""
+    print("Testando hedge após atraso...")
+    
+    concursos = gerar_concursos(10)
+    with LocalLotofacilServer(concursos) as principal, LocalLotofacilServer(concursos) as alternativa:
+        fetcher = HedgedFetcher({'principal': principal.url, 'alternativa': alternativa.url}, hedge_delay=0.3)
+        fonte, _ = fetcher.fetch(parse=lambda r: r.json())
+        assert fonte == 'principal', "A fonte principal rápida deveria vencer"
+        assert len(alternativa.requests) == 0, "A fonte alternativa não deveria ser consultada"
+        
+        principal.delay = 1.0
+        inicio = time.perf_counter()
+        fonte, _ = fetcher.fetch(parse=lambda r: r.json())
+        duracao = time.perf_counter() - inicio
+        assert fonte == 'alternativa', "A fonte alternativa deveria vencer após o hedge"
+        assert 0.3 <= duracao < 0.9, f"Duração inesperada do hedge: {duracao:.2f}s"
+        
+        stats = fetcher.latency_stats()
+        assert stats['principal']['wins'] == 1 and stats['alternativa']['wins'] == 1, "Contadores de vitórias incorretos"
+        assert stats['alternativa']['mean_latency'] is not None, "Latência não registrada"
+        
+        fetcher.close()
+    
+    print("✓ Hedge acionado apenas quando a fonte principal atrasou")
+    return True
+
+
+def test_fetch_falha_principal():
+    """Testa que uma falha da fonte principal aciona a alternativa imediatamente"""
+    print("Testando falha da fonte principal...")
+    
+    concursos = gerar_concursos(10)
+    with LocalLotofacilServer(concursos, status=500) as principal, LocalLotofacilServer(concursos) as alternativa:
+        fetcher = HedgedFetcher({'principal': principal.url, 'alternativa': alternativa.url}, hedge_delay=5)
+        
+        inicio = time.perf_counter()
+        fonte, data = fetcher.fetch(parse=lambda r: r.json())
+        duracao = time.perf_counter() - inicio
+        
+        assert fonte == 'alternativa' and data == concursos, "A fonte alternativa deveria responder"
+        assert duracao < 1, f"A falha não acionou a alternativa imediatamente ({duracao:.2f}s)"
+        assert fetcher.latency_stats()['principal']['failures'] == 1, "Falha não registrada"
+        
+        alternativa.status = 500
+        assert fetcher.fetch(parse=lambda r: r.json()) == (None, None), "Todas as fontes falharam"
+        
+        fetcher.close()
+    
+    print("✓ Falha da fonte principal tratada sem esperar o hedge")
+    return True
+
+
+def criar_coletor(diretorio, principal=None, alternativa=None):
+    """Cria um coletor que grava em um diretório temporário e consulta os servidores locais (se informados)"""
+    collector = LotofacilDataCollector()
+    collector.raw_data_path = os.path.join(diretorio, 'lotofacil_raw.csv')
+    collector.processed_data_path = os.path.join(diretorio, 'lotofacil_processed.csv')
+    collector.json_data_path = os.path.join(diretorio, 'lotofacil_data.json')
+    collector.store_path = os.path.join(diretorio, 'lotofacil_draws.bin')
+    collector.feature_state_path = os.path.join(diretorio, 'lotofacil_features_state.npz')
+    collector.feature_cache = ProcessedFeatureCache(os.path.join(diretorio, 'lotofacil_processed_cache'))
+    collector.http_cache = HttpResponseCache(os.path.join(diretorio, 'http_cache'))
+    collector.shared_history_path = os.path.join(diretorio, 'lotofacil_shared.bin')
+    collector.dataset_version_path = os.path.join(diretorio, 'lotofacil_version.json')
+    collector.stage_cache = VersionedCache(os.path.join(diretorio, 'lotofacil_stages.json'))
+    collector.cooccurrence_path = os.path.join(diretorio, 'lotofacil_cooccurrence.npz')
+    if principal is not None:
+        collector.api_url = principal.url
+    if alternativa is not None:
+        collector.alternative_url = alternativa.url
+    return collector
+
+
+def acrescentar_concursos(collector, historico, fim):
+    """Acrescenta os concursos do histórico até a posição fim ao binário e ao CSV do coletor"""
+    if os.path.exists(collector.store_path):
+        store = LotofacilDrawStore.load(collector.store_path)
+    else:
+        store = LotofacilDrawStore(collector.store_path)
+    inicio = len(store)
+    store.extend(historico.concursos[inicio:fim], historico.masks[inicio:fim], historico.datas[inicio:fim])
+    store.to_csv(collector.raw_data_path, inicio=inicio, append=inicio > 0)
+    store.flush()
+
+
+def test_sync_incremental():
+    """Testa a sincronização incremental contra os servidores locais"""
+    print("Testando sincronização incremental...")
+    
+    concursos = gerar_concursos(30)
+    with LocalLotofacilServer(concursos[:20]) as principal, LocalLotofacilServer(concursos[:20], status=500) as alternativa, \
+            tempfile.TemporaryDirectory() as diretorio:
+        collector = criar_coletor(diretorio, principal, alternativa)
+        
+        assert collector.run(incremental=True), "Falha na primeira sincronização"
+        assert LotofacilDrawStore.load(collector.store_path).last_concurso == 20, "Histórico completo não gravado"
+        compartilhado = SharedDrawHistory.attach(collector.shared_history_path)
+        assert len(compartilhado) == 20, "Histórico compartilhado não publicado"
+        
+        # Sem concursos novos: uma única requisição e nenhuma escrita
+        mtime = os.path.getmtime(collector.store_path)
+        principal.requests.clear()
+        assert collector.sync_incremental() == 0, "Nenhum concurso novo era esperado"
+        assert principal.requests == ['/api/lotofacil/latest'], f"Requisições inesperadas: {principal.requests}"
+        assert os.path.getmtime(collector.store_path) == mtime, "O histórico não deveria ser regravado"
+        
+        # Concursos novos buscados um a um
+        principal.concursos = concursos
+        assert collector.run(incremental=True), "Falha na sincronização incremental"
+        store = LotofacilDrawStore.load(collector.store_path)
+        assert list(store.concursos) == list(range(1, 31)), "Concursos novos não acrescentados"
+        assert collector.verify_processed_data(), "Features incrementais divergem do recálculo em lote"
+        assert compartilhado.refresh() and compartilhado.snapshot().last_concurso == 30, "Concursos novos não publicados"
+        
+        coocorrencia = LotofacilCooccurrenceIndex.load(collector.cooccurrence_path)
+        assert coocorrencia.last_concurso == 30 and len(coocorrencia) == 30, "Índice de coocorrência não atualizado"
+        assert (coocorrencia.pares == LotofacilCooccurrenceIndex.from_store(store).pares).all(), "Pares do índice divergem"
+    
+    print("✓ Sincronização incremental acrescentou apenas os concursos novos")
+    return True
+
+
+def test_features_incrementais():
+    """Testa as features incrementais contra o recálculo completo em lote"""
+    print("Testando features incrementais...")
+    
+    historico = SyntheticHistoryGenerator(seed=9).store(300)
+    
+    with tempfile.TemporaryDirectory() as diretorio:
+        os.makedirs(os.path.join(diretorio, 'incremental'))
+        os.makedirs(os.path.join(diretorio, 'lote'))
+        incremental = criar_coletor(os.path.join(diretorio, 'incremental'))
+        lote = criar_coletor(os.path.join(diretorio, 'lote'))
+        
+        # Processamento completo de um prefixo e acréscimos de um e de vários concursos
+        acrescentar_concursos(incremental, historico, 200)
+        assert incremental.process_data_for_ml(incremental=False), "Falha no processamento em lote do prefixo"
+        for fim in (201, 300):
+            acrescentar_concursos(incremental, historico, fim)
+            store = LotofacilDrawStore.load(incremental.store_path)
+            assert incremental._load_feature_state(store) is not None, "Estado incremental não reaproveitado"
+            assert incremental.process_data_for_ml(incremental=True), "Falha no processamento incremental"
+        
+        acrescentar_concursos(lote, historico, 300)
+        assert lote.process_data_for_ml(incremental=False), "Falha no processamento em lote"
+        
+        obtido = pd.read_csv(incremental.processed_data_path, dtype={'data': str})
+        esperado = pd.read_csv(lote.processed_data_path, dtype={'data': str})
+        assert list(obtido.columns) == list(esperado.columns) and len(obtido) == 300, "Formato do CSV incremental incorreto"
+        assert (obtido['data'] == esperado['data']).all(), "Datas divergem"
+        colunas = [c for c in esperado.columns if c != 'data']
+        assert np.array_equal(obtido[colunas].to_numpy(dtype=float), esperado[colunas].to_numpy(dtype=float)), \
+            "Features incrementais divergem do recálculo em lote"
+    
+    print("✓ lotofacil_processed.csv incremental idêntico ao recálculo em lote")
+    return True
+
+
+def test_cache_features():
+    """Testa o acréscimo de linhas ao cache de features e a detecção de cache desatualizado"""
+    print("Testando cache de features...")
+    
+    historico = SyntheticHistoryGenerator(seed=10).store(120)
+    
+    with tempfile.TemporaryDirectory() as diretorio:
+        collector = criar_coletor(diretorio)
+        acrescentar_concursos(collector, historico, 100)
+        assert collector.process_data_for_ml(), "Falha no processamento"
+        cache = collector.feature_cache
+        assert cache.is_fresh(collector.processed_data_path), "Cache recém-gravado não reconhecido"
+        
+        # Concursos novos: as linhas entram no CSV e no cache sem reconstruí-lo
+        acrescentar_concursos(collector, historico, 120)
+        assert collector.process_data_for_ml(incremental=True), "Falha no processamento incremental"
+        assert cache.is_fresh(collector.processed_data_path), "Cache não acompanhou o CSV"
+        assert cache.header()['linhas'] == 120, "Número de linhas do cache incorreto"
+        
+        csv = pd.read_csv(collector.processed_data_path, dtype={'data': str})
+        frame = cache.load_frame()
+        colunas = [c for c in csv.columns if c != 'data']
+        assert list(frame.columns) == list(csv.columns), "Colunas do cache divergem do CSV"
+        assert np.allclose(frame[colunas].to_numpy(dtype=float), csv[colunas].to_numpy(dtype=float)), "Cache diverge do CSV"
+        
+        # CSV alterado por fora: o cache deixa de valer e não aceita acréscimos parciais
+        with open(collector.processed_data_path, 'a', encoding='utf-8') as f:
+            f.write(csv.iloc[-1:].to_csv(header=False, index=False))
+        assert not cache.is_fresh(collector.processed_data_path), "Cache desatualizado aceito"
+        blocos = collector.load_feature_blocks(['dezena'])
+        assert cache.is_fresh(collector.processed_data_path) and len(blocos['dezena']) == 121, "Cache não reconstruído"
+        
+        # Colunas diferentes das do cache: o acréscimo é recusado
+        assert not cache.append(csv[colunas[:5]].iloc[:1], collector.processed_data_path), "Acréscimo com outras colunas aceito"
+    
+    print("✓ Cache de features acompanha os acréscimos e detecta CSV alterado")
+    return True
+
+
+def test_janelas_sequencia():
+    """Testa as janelas de sequência (views) contra as janelas copiadas linha a linha"""
+    print("Testando janelas de sequência...")
+    
+    historico = SyntheticHistoryGenerator(seed=11).store(80)
+    matriz = historico.indicator_matrix()
+    dezenas_df = pd.DataFrame(matriz, columns=[f'dezena_{i}' for i in range(1, 26)])
+    
+    for sequence_length in (1, 5, 12, 79, 80, 100):
+        # Implementação anterior: cópia de cada janela do DataFrame
+        X_copia = np.array([dezenas_df.iloc[i:i + sequence_length].values for i in range(len(dezenas_df) - sequence_length)])
+        y_copia = np.array([dezenas_df.iloc[i + sequence_length].values for i in range(len(dezenas_df) - sequence_length)])
+        
+        X, y = sequence_windows(matriz, sequence_length)
+        assert X.shape == (max(0, 80 - sequence_length), sequence_length, 25), f"Formato de X incorreto ({sequence_length})"
+        assert len(y) == len(X), f"Número de alvos incorreto ({sequence_length})"
+        if len(X_copia):
+            assert not X.flags.writeable and not y.flags.writeable, "Views deveriam ser somente leitura"
+            assert np.array_equal(X, X_copia) and np.array_equal(y, y_copia), f"Janelas divergem ({sequence_length})"
+        
+        X_mat, y_mat = sequence_windows(matriz, sequence_length, materialize=True)
+        assert X_mat.flags.writeable and X_mat.flags.c_contiguous, "Cópia materializada inválida"
+        assert np.array_equal(X_mat, X) and np.array_equal(y_mat, y), "Cópia materializada diverge"
+    
+    # Pelo coletor, a partir do bloco de dezenas do cache
+    with tempfile.TemporaryDirectory() as diretorio:
+        collector = criar_coletor(diretorio)
+        acrescentar_concursos(collector, historico, 80)
+        assert collector.process_data_for_ml(), "Falha no processamento"
+        X, y = collector.create_sequence_data(5)
+        df = pd.read_csv(collector.processed_data_path)[[f'dezena_{i}' for i in range(1, 26)]]
+        assert np.array_equal(X, np.array([df.iloc[i:i + 5].values for i in range(len(df) - 5)])), "Sequências do coletor divergem"
+        assert np.array_equal(y, df.iloc[5:].values), "Alvos do coletor divergem"
+    
+    print("✓ Janelas sem cópia idênticas às janelas copiadas")
+    return True
+
+
+def test_cache_condicional():
+    """Testa as requisições condicionais e o atalho para histórico inalterado"""
+    print("Testando cache HTTP condicional...")
+    
+    concursos = gerar_concursos(30)
+    with LocalLotofacilServer(concursos[:20]) as principal, LocalLotofacilServer(concursos[:20], status=500) as alternativa, \
+            tempfile.TemporaryDirectory() as diretorio:
+        collector = criar_coletor(diretorio, principal, alternativa)
+        assert collector.run(), "Falha na primeira coleta"
+        assert collector.http_cache.stats()['misses'] == 1, "Primeira coleta deveria ser um miss"
+        
+        # Servidor com ETag: 304 e nenhum arquivo regravado
+        mtimes = {p: os.path.getmtime(p) for p in (collector.raw_data_path, collector.processed_data_path)}
+        assert collector.run(), "Falha na coleta sem alterações"
+        assert principal.not_modified == 1, "A requisição condicional não foi enviada"
+        assert collector.last_fetch_status == 'not_modified', f"Situação inesperada: {collector.last_fetch_status}"
+        assert all(os.path.getmtime(p) == t for p, t in mtimes.items()), "Arquivos regravados sem alterações"
+        
+        # Servidor sem ETag: corpo idêntico detectado pelo hash
+        principal.etag = False
+        assert collector.run(), "Falha na coleta com corpo idêntico"
+        assert collector.last_fetch_status == 'unchanged', f"Situação inesperada: {collector.last_fetch_status}"
+        assert all(os.path.getmtime(p) == t for p, t in mtimes.items()), "Arquivos regravados sem alterações"
+        
+        # Conteúdo novo: processado normalmente
+        principal.concursos = concursos
+        assert collector.run(), "Falha na coleta com concursos novos"
+        assert LotofacilDrawStore.load(collector.store_path).last_concurso == 30, "Concursos novos não gravados"
+        
+        stats = collector.http_cache.stats()
+        assert (stats['hits'], stats['content_hits'], stats['misses']) == (1, 1, 2), f"Contadores incorretos: {stats}"
+    
+    print("✓ Histórico inalterado custou uma única requisição sem reprocessamento")
+    return True
+
+
+def test_versao_dados():
+    """Testa a versão do histórico e o manifesto de etapas dos consumidores"""
+    print("Testando versão do histórico...")
+    
+    store = SyntheticHistoryGenerator(seed=11).store(200)
+    alterado = SyntheticHistoryGenerator(seed=11).store(200)
+    alterado._masks[100] ^= 0b11
+    
+    versao = dataset_version(store)
+    assert versao.startswith('200-') and versao == dataset_version(SyntheticHistoryGenerator(seed=11).store(200)), "Versão não determinística"
+    assert dataset_version(alterado) != versao, "Conteúdo diferente com a mesma versão"
+    
+    concursos = gerar_concursos(30)
+    with LocalLotofacilServer(concursos[:20]) as principal, LocalLotofacilServer(concursos[:20], status=500) as alternativa, \
+            tempfile.TemporaryDirectory() as diretorio:
+        # Etapas só são reaproveitadas com a mesma versão e os mesmos parâmetros
+        manifesto = VersionedCache(os.path.join(diretorio, 'versions.json'))
+        manifesto.mark('model', versao, {'janelas': (10, 20)})
+        assert manifesto.is_current('model', versao, {'janelas': [10, 20]}), "Etapa atual não reconhecida"
+        assert not manifesto.is_current('model', versao, {'janelas': [10]}), "Parâmetros diferentes aceitos"
+        assert not manifesto.is_current('model', dataset_version(alterado), {'janelas': [10, 20]}), "Versão antiga aceita"
+        
+        collector = criar_coletor(diretorio, principal, alternativa)
+        assert collector.run(incremental=True), "Falha na primeira sincronização"
+        primeira = collector.get_dataset_version()
+        assert primeira == dataset_version(LotofacilDrawStore.load(collector.store_path)), "Versão publicada incorreta"
+        assert collector.stage_cache.get('features')['dataset_version'] == primeira, "Features sem versão registrada"
+        
+        # Concursos novos: nova versão, features recalculadas a partir dela
+        principal.concursos = concursos
+        assert collector.run(incremental=True), "Falha na sincronização incremental"
+        segunda = collector.get_dataset_version()
+        assert segunda != primeira and segunda.startswith('30-'), "Versão não acompanhou os concursos novos"
+        assert collector._processed_up_to_date(), "Features deveriam corresponder à versão atual"
+    
+    print("✓ Versão muda com o conteúdo e as etapas ficam associadas a ela")
+    return True
+
+
+def test_stream_historico():
+    """Testa a leitura em streaming do histórico completo"""
+    print("Testando leitura em streaming...")
+    
+    # Elementos divididos em qualquer ponto, inclusive no meio de caracteres UTF-8
+    concursos = gerar_concursos(50)
+    for concurso in concursos:
+        concurso['local'] = 'SÃO PAULO, SP'
+    corpo = json.dumps(concursos, ensure_ascii=False, indent=4).encode('utf-8')
+    for tamanho in (1, 7, 4096):
+        blocos = [corpo[i:i + tamanho] for i in range(0, len(corpo), tamanho)]
+        assert list(iter_json_array(blocos)) == concursos, f"Divergência com blocos de {tamanho} bytes"
+    
+    for invalido in (b'[{"concurso": 1}', b'{"concurso": 1}', b'[1] 2'):
+        try:
+            list(iter_json_array([invalido]))
+            assert False, f"Conteúdo inválido aceito: {invalido!r}"
+        except ValueError:
+            pass
+    
+    # Histórico em ordem decrescente, como retornado pela API principal
+    with LocalLotofacilServer(concursos[::-1]) as principal, LocalLotofacilServer(concursos, status=500) as alternativa, \
+            tempfile.TemporaryDirectory() as diretorio:
+        collector = criar_coletor(diretorio, principal, alternativa)
+        assert collector.fetch_data_from_api(), "Falha na leitura em streaming"
+        
+        with open(collector.json_data_path, 'rb') as f:
+            assert f.read() == principal.responder('/api/lotofacil'), "Cópia do JSON diferente do corpo recebido"
+        assert not [n for n in os.listdir(diretorio) if n.endswith('.tmp')], "Arquivos temporários não removidos"
+        
+        store = LotofacilDrawStore.load(collector.store_path)
+        assert list(store.concursos) == list(range(1, 51)), "Concursos fora de ordem"
+        assert list(store.dezenas(10)) == [int(d) for d in concursos[9]['dezenas']], "Dezenas divergentes"
+        
+        with open(collector.raw_data_path, 'r', encoding='utf-8') as f:
+            assert sum(1 for _ in f) == 51, "CSV incompleto"
+    
+    print("✓ Histórico lido concurso a concurso e gravado sem alterações")
+    return True
+
+
+def test_historico_sintetico():
+    """Testa o gerador de históricos sintéticos e a coleta simulada"""
+    print("Testando histórico sintético...")
+    
+    # Mesma semente, mesmo histórico, independentemente do tamanho dos lotes
+    store = SyntheticHistoryGenerator(seed=7, lote=1000).store(10000)
+    outro = SyntheticHistoryGenerator(seed=7, lote=4096).store(10000)
+    assert (store.masks == outro.masks).all() and (store.datas == outro.datas).all(), "Histórico não reproduzível"
+    assert (popcount(store.masks) == 15).all(), "Sorteio sem 15 dezenas distintas"
+    assert list(store.concursos[[0, -1]]) == [1, 10000], "Numeração dos concursos incorreta"
+    
+    # Coleta simulada grava CSV e histórico binário no mesmo formato da API
+    with tempfile.TemporaryDirectory() as diretorio:
+        with LocalLotofacilServer([]) as principal, LocalLotofacilServer([]) as alternativa:
+            collector = criar_coletor(diretorio, principal, alternativa)
+        assert collector.fetch_data_from_web(), "Falha na coleta simulada"
+        
+        binario = LotofacilDrawStore.load(collector.store_path)
+        csv = LotofacilDrawStore.from_csv(collector.raw_data_path)
+        assert list(binario.concursos) == list(range(3275, 3375)), "Concursos simulados incorretos"
+        assert (binario.masks == csv.masks).all() and (binario.datas == csv.datas).all(), "CSV e binário divergem"
+    
+    print("✓ Histórico sintético válido, reproduzível e no formato de lotofacil_raw.csv")
+    return True
+
+
+def test_indice_coocorrencia():
+    """Testa o índice de coocorrência contra uma contagem direta"""
+    print("Testando índice de coocorrência...")
+    
+    store = SyntheticHistoryGenerator(seed=3).store(500)
+    sorteios = [set(mask_to_dezenas(m)) for m in store.masks]
+    
+    # Índice construído em lote para parte do histórico e atualizado sorteio a sorteio
+    index = LotofacilCooccurrenceIndex.from_masks(store.masks[:300], janelas=(10, 100))
+    index.update_many(store.masks[300:], store.concursos[300:])
+    
+    for a, b, c in [(7, 13, 20), (1, 2, 3), (25, 24, 1)]:
+        assert index.pair_count(a, b) == sum({a, b} <= s for s in sorteios), "Contagem de par incorreta"
+        assert index.triple_count(c, b, a) == sum({a, b, c} <= s for s in sorteios), "Contagem de trio incorreta"
+        for janela in (10, 37, 100):
+            ultimos = sorteios[-janela:]
+            assert index.pair_count(a, b, janela) == sum({a, b} <= s for s in ultimos), f"Par incorreto na janela {janela}"
+            assert index.triple_count(a, b, c, janela) == sum({a, b, c} <= s for s in ultimos), f"Trio incorreto na janela {janela}"
+    
+    (par, contagem), = index.top_pairs(1, dezena=7)
+    assert 7 in par and contagem == max(index.pair_count(7, d) for d in range(1, 26) if d != 7), "Top de pares incorreto"
+    assert index.last_concurso == 500, "Último concurso não registrado"
+    
+    # Índice gravado: concursos novos acrescentados; histórico alterado força a reconstrução
+    with tempfile.TemporaryDirectory() as diretorio:
+        path = os.path.join(diretorio, 'coocorrencia.npz')
+        prefixo = LotofacilDrawStore()
+        prefixo.extend(store.concursos[:300], store.masks[:300], store.datas[:300])
+        LotofacilCooccurrenceIndex.load_or_build(prefixo, path, janelas=(10, 100))
+        
+        atualizado = LotofacilCooccurrenceIndex.load_or_build(store, path, janelas=(10, 100))
+        assert len(LotofacilCooccurrenceIndex.load(path)) == 500, "Concursos novos não gravados"
+        for janela in (None, 10, 100):
+            assert (atualizado.pair_matrix(janela) == index.pair_matrix(janela)).all(), f"Pares divergem (janela {janela})"
+            assert (atualizado.triple_vector(janela) == index.triple_vector(janela)).all(), f"Trios divergem (janela {janela})"
+        
+        alterado = SyntheticHistoryGenerator(seed=4).store(500)
+        reconstruido = LotofacilCooccurrenceIndex.load_or_build(alterado, path, janelas=(10, 100), save=False)
+        assert (reconstruido.pares == LotofacilCooccurrenceIndex.from_store(alterado).pares).all(), "Índice antigo reaproveitado"
+    
+    print("✓ Pares e trios coincidem com a contagem direta, inclusive em janelas")
+    return True
+
+
+def test_indice_repeticoes():
+    """Testa o índice de repetições contra uma varredura direta do histórico"""
+    print("Testando índice de repetições...")
+    
+    store = SyntheticHistoryGenerator(seed=6).store(800)
+    jogos = SyntheticHistoryGenerator(seed=7).store(300).masks
+    
+    # Jogos a 0, 1 e 2 dezenas de diferença de sorteios conhecidos
+    def trocar(mascara, n):
+        dezenas = mask_to_dezenas(mascara)
+        fora = [d for d in range(1, 26) if d not in dezenas]
+        return sum(1 << (d - 1) for d in dezenas[n:] + fora[:n])
+    
+    jogos[0] = store.masks[5]
+    jogos[1] = trocar(store.masks[50], 1)
+    jogos[2] = trocar(store.masks[100], 2)
+    
+    index = DrawRepeatIndex.from_store(store)
+    acertos = popcount(jogos[:, None] & store.masks[None, :])
+    
+    # Sem os vizinhos pré-calculados (modo dos históricos grandes) o resultado é o mesmo
+    sem_vizinhos = DrawRepeatIndex(store.masks, store.concursos, limite_vizinhos=0)
+    assert (sem_vizinhos.near_many(jogos) == (acertos >= 14).any(axis=1)).all(), "Repetições sem vizinhos incorretas"
+    
+    assert index.contains(store.masks[5]) and index.concurso(store.masks[5]) == 6, "Repetição exata não encontrada"
+    assert (index.contains_many(jogos) == (acertos == 15).any(axis=1)).all(), "Repetições exatas incorretas"
+    assert (index.near_many(jogos) == (acertos >= 14).any(axis=1)).all(), "Repetições a uma dezena incorretas"
+    assert (index.filter_new(jogos, k=2) == ~(acertos >= 13).any(axis=1)).all(), "Filtro com duas dezenas incorreto"
+    assert index.is_repeat(jogos[1]) and not index.is_repeat(jogos[2]) and index.is_repeat(jogos[2], k=2), "Distâncias incorretas"
+    
+    for i in (0, 1, 2, 17):
+        esperado = sorted(((int(store.concursos[j]), int(acertos[i, j])) for j in range(len(store)) if acertos[i, j] >= 12),
+                          key=lambda x: (-x[1], x[0]))
+        assert index.within(jogos[i], k=3) == esperado, f"Vizinhos incorretos para o jogo {i}"
+    
+    # Sorteios acrescentados passam a ser encontrados
+    index.update(jogos[17], 801)
+    assert index.concurso(jogos[17]) == 801 and index.within(jogos[17], k=3)[0] == (801, 15), "Atualização não indexada"
+    assert index.near_many(jogos[17:18])[0], "Vizinhos do sorteio acrescentado não indexados"
+    
+    print("✓ Repetições exatas e aproximadas coincidem com a varredura direta")
+    return True
+
+
+def test_sorteios_similares():
+    """Testa a busca dos sorteios mais parecidos nos dois modos contra uma ordenação direta"""
+    print("Testando busca de sorteios similares...")
+    
+    store = SyntheticHistoryGenerator(seed=10).store(3000)
+    jogos = SyntheticHistoryGenerator(seed=11).store(40).masks
+    jogos[0] = store.masks[123]
+    
+    # Ranking colexicográfico: crescente com a máscara e sem lacunas
+    amostra = sorted(set(store.masks.tolist()) | {0x7FFF, 0x1FFFFFF ^ 0x3FF})
+    ranking = combination_rank(amostra).tolist()
+    assert ranking[0] == 0 and ranking[-1] == 3268759 and ranking == sorted(set(ranking)), "Ranking incorreto"
+    
+    # Força bruta e anéis (forçados com limite baixo) devem coincidir com a ordenação direta
+    indices = [NearestDrawIndex.from_store(store), NearestDrawIndex.from_store(store, limite_forca_bruta=0)]
+    for i, jogo in enumerate(jogos):
+        acertos = popcount(store.masks & jogo).astype(int)
+        ordem = sorted(range(len(store)), key=lambda j: (-acertos[j], -store.concursos[j]))[:5]
+        esperado = [{'concurso': int(store.concursos[j]), 'acertos': int(acertos[j]), 'distancia': 2 * (15 - int(acertos[j]))}
+                    for j in ordem]
+        premiados = {str(f): sorted(int(c) for c, a in zip(store.concursos, acertos) if a == f) for f in (13, 14, 15)}
+        
+        for index in indices:
+            resultado = index.nearest(mask_to_dezenas(jogo), k=5)
+            assert resultado['similares'] == esperado, f"Sorteios similares incorretos para o jogo {i}"
+            assert resultado['premiados'] == premiados, f"Concursos com 13+ acertos incorretos para o jogo {i}"
+    
+    assert indices[1].nearest(jogos[0])['similares'][0] == {'concurso': 124, 'acertos': 15, 'distancia': 0}, "Jogo idêntico não encontrado"
+    assert len(indices[0].nearest_many(jogos[:3], k=2)) == 3, "Consulta em lote incompleta"
+    
+    try:
+        indices[0].nearest([1, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14])
+        assert False, "Jogo com dezena repetida deveria falhar"
+    except ValueError:
+        pass
+    
+    print("✓ Sorteios mais próximos coincidem com a ordenação direta nos dois modos")
+    return True
+
+
+def test_contador_janelas():
+    """Testa o contador de janelas contra contagens diretas dos últimos concursos"""
+    print("Testando contador de janelas...")
+    
+    store = SyntheticHistoryGenerator(seed=13).store(400)
+    sorteios = [mask_to_dezenas(m) for m in store.masks]
+    
+    def contagem(n, janela):
+        return [sum(d in s for s in sorteios[max(0, n - janela):n]) for d in range(1, 26)]
+    
+    # Acréscimos um a um e em lote produzem o mesmo estado
+    um_a_um = WindowedCounter(100)
+    for mascara in store.masks[:150]:
+        um_a_um.append(mascara)
+    em_lote = WindowedCounter.from_masks(store.masks[:150], 100)
+    for janela in (1, 5, 10, 15, 30, 77, 100):
+        esperado = contagem(150, janela)
+        assert um_a_um.counts(janela).tolist() == esperado, f"Contagem incorreta na janela {janela}"
+        assert em_lote.counts(janela).tolist() == esperado, f"Contagem em lote incorreta na janela {janela}"
+    assert (um_a_um.delays() == em_lote.delays()).all(), "Atrasos divergem"
+    assert list(em_lote.window_masks(30)) == list(store.masks[120:150]), "Máscaras da janela incorretas"
+    
+    # Sincronização incremental com o histórico e reconstrução quando ele muda
+    assert not em_lote.sync(store) and em_lote.counts(100).tolist() == contagem(400, 100), "Sincronização inicial incorreta"
+    maior = SyntheticHistoryGenerator(seed=13).store(430)
+    sorteios = [mask_to_dezenas(m) for m in maior.masks]
+    assert em_lote.sync(maior) and em_lote.counts(10).tolist() == contagem(430, 10), "Sincronização incremental incorreta"
+    outro = SyntheticHistoryGenerator(seed=14).store(430)
+    sorteios = [mask_to_dezenas(m) for m in outro.masks]
+    assert not em_lote.sync(outro) and em_lote.counts(50).tolist() == contagem(430, 50), "Histórico diferente não reconstruído"
+    
+    try:
+        em_lote.counts(101)
+        assert False, "Janela maior que a capacidade deveria falhar"
+    except ValueError:
+        pass
+    
+    print("✓ Contagens de qualquer janela coincidem com a contagem direta")
+    return True
+
+
+def test_estatisticas():
+    """Testa as estatísticas do histórico contra contagens diretas e o cache por versão"""
+    print("Testando estatísticas do histórico...")
+    
+    store = SyntheticHistoryGenerator(seed=12).store(700)
+    sorteios = [mask_to_dezenas(m) for m in store.masks]
+    moldura = {1, 2, 3, 4, 5, 6, 10, 11, 15, 16, 20, 21, 22, 23, 24, 25}
+    
+    for janela in (None, 50):
+        ultimos = sorteios[-janela:] if janela else sorteios
+        estatisticas = compute_statistics(store, janela)
+        assert estatisticas['concursos'] == len(ultimos), "Número de concursos incorreto"
+        
+        for item in estatisticas['dezenas']:
+            presencas = [item['dezena'] in s for s in ultimos]
+            sequencias = [0]
+            for presente in presencas:
+                sequencias.append(0 if presente else sequencias[-1] + 1)
+            assert item['frequencia'] == sum(presencas), f"Frequência incorreta para a dezena {item['dezena']}"
+            assert item['atraso_atual'] == sequencias[-1], f"Atraso atual incorreto para a dezena {item['dezena']}"
+            assert item['atraso_maximo'] == max(sequencias), f"Atraso máximo incorreto para a dezena {item['dezena']}"
+        
+        pares = [sum(d % 2 == 0 for d in s) for s in ultimos]
+        somas = [sum(s) for s in ultimos]
+        assert estatisticas['paridade']['distribuicao']['8'] == pares.count(8), "Distribuição de pares incorreta"
+        assert estatisticas['soma']['minimo'] == min(somas) and estatisticas['soma']['maximo'] == max(somas), "Soma incorreta"
+        assert estatisticas['soma']['distribuicao']['190-199'] == sum(190 <= s <= 199 for s in somas), "Faixa de soma incorreta"
+        assert sum(estatisticas['soma']['distribuicao'].values()) == len(ultimos), "Faixas de soma incompletas"
+        assert estatisticas['moldura']['distribuicao']['10'] == sum(len(moldura & set(s)) == 10 for s in ultimos), "Moldura incorreta"
+        assert estatisticas['centro']['distribuicao']['5'] == estatisticas['moldura']['distribuicao']['10'], "Centro incorreto"
+    
+    with tempfile.TemporaryDirectory() as diretorio:
+        cache_path = os.path.join(diretorio, 'estatisticas.json')
+        engine = StatisticsEngine(cache_path)
+        primeira = engine.get(store)
+        assert primeira['dataset_version'] == dataset_version(store), "Versão não registrada"
+        assert primeira['janelas']['15'] == [sum(d in s for s in sorteios[-15:]) for d in range(1, 26)], "Janela incorreta"
+        assert engine.get(store) is primeira, "Estatísticas recalculadas sem mudança de versão"
+        
+        # Outro processo reaproveita o cache em disco da mesma versão
+        assert StatisticsEngine(cache_path).get(store)['updated_at'] == primeira['updated_at'], "Cache em disco ignorado"
+        
+        # Um concurso novo muda a versão e força o recálculo
+        novo = SyntheticHistoryGenerator(seed=12).store(701)
+        assert engine.get(novo)['concursos'] == 701, "Estatísticas não recalculadas para a nova versão"
+        
+        # Janelas fora de JANELAS_ESTATISTICAS são calculadas sem entrar no cache
+        assert engine.get(novo, 37)['concursos'] == 37, "Janela arbitrária incorreta"
+        assert engine.get(novo, 30) is engine.get(novo, 30), "Janela padrão não guardada em cache"
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            assert set(json.load(f)['estatisticas']) == {'todos', '30'}, "Janela arbitrária gravada no cache"
+        
+        for janela in (0, -5):
+            try:
+                engine.get(novo, janela)
+                assert False, f"Janela {janela} deveria falhar"
+            except ValueError:
+                pass
+    
+    print("✓ Estatísticas coincidem com as contagens diretas e são reaproveitadas por versão")
+    return True
+
+
+def test_historico_compartilhado():
+    """Testa a publicação incremental e a substituição do histórico compartilhado"""
+    print("Testando histórico compartilhado...")
+    
+    completo = SyntheticHistoryGenerator(seed=5).store(6000)
+    
+    def prefixo(n):
+        store = LotofacilDrawStore()
+        store.extend(completo.concursos[:n], completo.masks[:n], completo.datas[:n])
+        return store
+    
+    with tempfile.TemporaryDirectory() as diretorio:
+        path = os.path.join(diretorio, 'shared.bin')
+        assert SharedDrawHistory.attach(path) is None, "Leitor conectado a arquivo inexistente"
+        
+        SharedDrawHistory.publish(prefixo(1000), path)
+        leitor = SharedDrawHistory.attach(path)
+        antigo = leitor.snapshot()
+        assert len(antigo) == 1000 and not leitor.refresh(), "Histórico publicado incorreto"
+        
+        # Concursos novos são acrescentados no mesmo arquivo
+        versao = SharedDrawHistory.publish(prefixo(1200), path)
+        assert SharedDrawHistory.publish(prefixo(1200), path) == versao, "Republicação sem mudança alterou a versão"
+        assert leitor.refresh() and leitor.version == versao, "Leitor não viu a nova versão"
+        assert len(leitor.snapshot()) == 1200 and len(antigo) == 1000, "Tamanhos incorretos após o acréscimo"
+        
+        # Capacidade esgotada: o arquivo é recriado e o leitor se reconecta
+        SharedDrawHistory.publish(completo, path)
+        assert leitor.refresh(), "Leitor não percebeu a substituição do arquivo"
+        atual = leitor.snapshot()
+        assert len(atual) == 6000 and (atual.masks == completo.masks).all(), "Histórico substituído incorreto"
+        assert (antigo.masks == completo.masks[:1000]).all(), "Snapshot antigo corrompido"
+        
+        try:
+            atual.masks[0] = 0
+            assert False, "Snapshot deveria ser somente leitura"
+        except ValueError:
+            pass
+    
+    print("✓ Acréscimos e substituições visíveis aos leitores sem recarregar o histórico")
+    return True
+
+
+def run_all_tests():
+    """Executa todos os testes"""
+    print("Iniciando testes da coleta de dados...")
+    print("=" * 80)
+    
+    tests = [
+        ("Busca em paralelo", test_fetch_fonte_mais_rapida),
+        ("Hedge após atraso", test_fetch_hedge_apos_atraso),
+        ("Falha da fonte principal", test_fetch_falha_principal),
+        ("Sincronização incremental", test_sync_incremental),
+        ("Features incrementais", test_features_incrementais),
+        ("Cache de features", test_cache_features),
+        ("Janelas de sequência", test_janelas_sequencia),
+        ("Cache HTTP condicional", test_cache_condicional),
+        ("Versão do histórico", test_versao_dados),
+        ("Leitura em streaming", test_stream_historico),
+        ("Histórico sintético", test_historico_sintetico),
+        ("Índice de coocorrência", test_indice_coocorrencia),
+        ("Índice de repetições", test_indice_repeticoes),
+        ("Sorteios similares", test_sorteios_similares),
+        ("Contador de janelas", test_contador_janelas),
+        ("Estatísticas do histórico", test_estatisticas),
+        ("Histórico compartilhado", test_historico_compartilhado)
+    ]
+    
+    results = {}
+    all_passed = True
+    
+    for name, test_func in tests:
+        print("\n" + "-" * 80)
+        print(f"Executando teste: {name}")
+        print("-" * 80)
+        
+        try:
+            result = test_func()
+            success = result is not None and result is not False
+            results[name] = success
+            
+            if not success:
+                all_passed = False
+            
+            print(f"\nResultado: {'PASSOU' if success else 'FALHOU'}")
+        except Exception as e:
+            results[name] = False
+            all_passed = False
+            print(f"\nResultado: FALHOU - Erro: {str(e)}")
+    
+    print("\n" + "=" * 80)
+    print("Resumo dos testes:")
+    print("=" * 80)
+    
+    for name, success in results.items():
+        print(f"{name}: {'✓ PASSOU' if success else '✗ FALHOU'}")
+    
+    print("\nResultado final:", "TODOS OS TESTES PASSARAM" if all_passed else "ALGUNS TESTES FALHARAM")
+    
+    return {
+        "success": all_passed,
+        "results": results
+    }
+
+
+if __name__ == "__main__":
+    run_all_tests()
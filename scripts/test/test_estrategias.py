@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Testes offline das estratégias de geração e conferência de jogos da Lotofácil
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import itertools
+import numpy as np
+
+# Adicionar diretórios dos módulos de IA e das estratégias ao path
+sys.path.append('/home/ubuntu/lotofacil/scripts/ia')
+sys.path.append('/home/ubuntu/lotofacil/scripts/estrategias')
+
+from draw_store import LotofacilDrawStore, mask_to_dezenas, dezenas_to_mask
+from synthetic_history import SyntheticHistoryGenerator
+from combinacoes import TabelaCombinacoes, TOTAL_COMBINACOES, PRIMOS, MOLDURA
+from conferencia import ConferenciaJogos, conferir, FAIXAS
+from ciclo_repositorio import RepositorioCiclos
+from ciclo_dezenas_fora import CicloDezenasFora, varrer_ciclo
+from ciclo_backtest import backtest_ciclos, resumir_ciclos, varrer_parametros
+from dataset_version import VersionedCache
+
+# Tabela compartilhada pelos testes (calculada uma única vez, removida ao final)
+_diretorio = tempfile.TemporaryDirectory(prefix='combinacoes_')
+_tabela = None
+
+
+def tabela_combinacoes():
+    """Obtém a tabela de combinações calculada em um diretório temporário"""
+    global _tabela
+    if _tabela is None:
+        _tabela = TabelaCombinacoes.build(_diretorio.name)
+    return _tabela
+
+
+def test_tabela_combinacoes():
+    """Testa a tabela de combinações e o motor de filtros contra uma verificação direta"""
+    print("Testando tabela de combinações...")
+    
+    tabela = tabela_combinacoes()
+    assert len(tabela) == TOTAL_COMBINACOES == 3268760, "Número de combinações incorreto"
+    assert (tabela.masks[1:] > tabela.masks[:-1]).all(), "Combinações repetidas ou fora de ordem"
+    
+    # Atributos conferidos em uma amostra espalhada pela tabela
+    for i in range(0, len(tabela), 32749):
+        dezenas = mask_to_dezenas(tabela.masks[i])
+        sequencias = [len(list(g)) for _, g in itertools.groupby(enumerate(dezenas), lambda x: x[1] - x[0])]
+        assert len(dezenas) == 15, "Jogo sem 15 dezenas"
+        assert tabela.colunas['soma'][i] == sum(dezenas), "Soma incorreta"
+        assert tabela.colunas['pares'][i] == sum(d % 2 == 0 for d in dezenas), "Pares incorretos"
+        assert tabela.colunas['primos'][i] == sum(d in PRIMOS for d in dezenas), "Primos incorretos"
+        assert tabela.colunas['moldura'][i] == sum(d in MOLDURA for d in dezenas), "Moldura incorreta"
+        assert tabela.colunas['maior_sequencia'][i] == max(sequencias), "Maior sequência incorreta"
+    
+    # Filtros combinados: todo jogo sorteado atende a todos eles
+    ultimo = list(range(1, 16))
+    filtros = dict(fixas=[3, 7], excluidas=[25], pares=(6, 8), soma=(180, 210), repetidas=(8, 10), ultimo_sorteio=ultimo)
+    selecao = tabela.filtrar(**filtros)
+    jogos = tabela.gerar_jogos(50, seed=1, **filtros)
+    assert len(jogos) == 50 and len({tuple(j) for j in jogos}) == 50, "Jogos sorteados repetidos"
+    assert jogos == tabela.gerar_jogos(50, seed=1, **filtros), "Amostragem não reproduzível"
+    for jogo in jogos:
+        assert {3, 7} <= set(jogo) and 25 not in jogo, "Dezenas fixas/excluídas não respeitadas"
+        assert 6 <= sum(d % 2 == 0 for d in jogo) <= 8 and 180 <= sum(jogo) <= 210, "Intervalos não respeitados"
+        assert 8 <= len(set(jogo) & set(ultimo)) <= 10, "Repetidas não respeitadas"
+    
+    # Contagem exata para um filtro fácil de verificar: 13 dezenas fixas deixam C(12, 2) jogos
+    assert tabela.contar(fixas=list(range(1, 14))) == 66, "Contagem com dezenas fixas incorreta"
+    assert tabela.jogos(tabela.filtrar(fixas=list(range(1, 16)))) == [list(range(1, 16))], "Jogo único não encontrado"
+    assert int(selecao.sum()) > 0, "Nenhum jogo selecionado"
+    
+    for filtros in ({'fixas': [1], 'excluidas': [1]}, {'fixas': [30]}, {'excluidas': [0]}, {'fixas': [40]}):
+        try:
+            tabela.filtrar(**filtros)
+            assert False, f"Filtro inválido deveria falhar: {filtros}"
+        except ValueError:
+            pass
+    
+    print("✓ Atributos e filtros coincidem com a verificação direta")
+    return True
+
+
+def test_conferencia():
+    """Testa a conferência em massa contra uma contagem direta"""
+    print("Testando conferência de jogos...")
+    
+    historico = SyntheticHistoryGenerator(seed=8).store(400)
+    jogos = SyntheticHistoryGenerator(seed=9).store(600).masks
+    
+    # Jogos iguais a sorteios garantem as faixas mais altas
+    jogos[:3] = historico.masks[[10, 20, 30]]
+    
+    resultado = ConferenciaJogos(historico).conferir(jogos)
+    sorteios = [set(mask_to_dezenas(m)) for m in historico.masks]
+    for i in list(range(0, 600, 37)) + [0, 1, 2]:
+        jogo = set(mask_to_dezenas(jogos[i]))
+        esperado = [sum(len(jogo & s) == faixa for s in sorteios) for faixa in FAIXAS]
+        assert list(resultado[i]) == esperado, f"Histograma incorreto para o jogo {i}"
+    assert (resultado[:3, -1] >= 1).all(), "Jogo idêntico a um sorteio sem 15 acertos"
+    
+    # A distribuição entre processos produz o mesmo resultado
+    assert (conferir(jogos, historico.masks, processos=2, lote=128) == resultado).all(), "Resultado do pool diverge"
+    
+    resumo = ConferenciaJogos(historico).resumo([mask_to_dezenas(jogos[0])])
+    assert resumo[0]['premiacoes'] == int(resultado[0].sum()), "Resumo inconsistente"
+    
+    for jogo in ([1, 2, 3], list(range(0, 15)), list(range(12, 27)), [-1] + list(range(2, 16))):
+        try:
+            ConferenciaJogos(historico).conferir([jogo])
+            assert False, f"Jogo inválido deveria falhar: {jogo}"
+        except ValueError:
+            pass
+    
+    print("✓ Faixas de premiação coincidem com a contagem direta")
+    return True
+
+
+def test_repositorio_ciclos():
+    """Testa o repositório de ciclos: eventos, compactação e recuperação do log"""
+    print("Testando repositório de ciclos...")
+    
+    with tempfile.TemporaryDirectory(prefix='ciclos_') as diretorio:
+        path = os.path.join(diretorio, 'ciclos.json')
+        repositorio = RepositorioCiclos(path, atraso=0.2, atraso_maximo=1.0, limite_eventos=40)
+        
+        def novo_ciclo(i):
+            return {'id': f'{i:04d}', 'status': 'ativo', 'dezenas': [1, 2, 3], 'dezenas_sorteadas': [], 'concursos': [],
+                    'data_fechamento': None, 'concurso_fechamento': None}
+        
+        # Ciclos fechados no terceiro concurso: 3 concursos + 3 acertos + abertura e fechamento
+        for i in range(10):
+            ciclo = repositorio.abrir(novo_ciclo(i))
+            for j, dezena in enumerate([1, 2, 3]):
+                repositorio.aplicar_concurso(ciclo['id'], {'concurso': 10 * i + j, 'data': None, 'dezenas': [dezena],
+                                                           'dezenas_ciclo_sorteadas': [dezena]})
+            repositorio.fechar_ciclo(ciclo['id'], 10 * i + 2, 'hoje')
+        ativo = repositorio.abrir(novo_ciclo(10))
+        repositorio.aplicar_concurso(ativo['id'], {'concurso': 100, 'data': None, 'dezenas': [2], 'dezenas_ciclo_sorteadas': [2]})
+        
+        # Alterações seguidas ficam pendentes e são gravadas de uma vez
+        assert not os.path.exists(repositorio.log_path), "Gravação não deveria ser imediata"
+        assert repositorio.ativo() is ativo and ativo['dezenas_sorteadas'] == [2], "Ciclo ativo incorreto"
+        assert len(repositorio.listar('fechado')) == 10, "Índice por status incorreto"
+        
+        # 82 eventos com limite de 40: gravados de uma vez e compactados no snapshot
+        time.sleep(0.5)
+        assert not repositorio.gravar(), "Gravação agendada não executada"
+        assert os.path.exists(path) and os.path.getsize(repositorio.log_path) == 0, "Log não compactado"
+        
+        # Novos eventos vão para a cauda do log
+        repositorio.aplicar_concurso(ativo['id'], {'concurso': 101, 'data': None, 'dezenas': [3], 'dezenas_ciclo_sorteadas': [3]})
+        assert repositorio.gravar(), "Eventos pendentes não gravados"
+        with open(repositorio.log_path, 'r', encoding='utf-8') as f:
+            cauda = f.readlines()
+        assert len(cauda) == 2, "Cauda do log incorreta"
+        
+        esperado = json.loads(json.dumps(repositorio.listar()))
+        assert RepositorioCiclos(path).listar() == esperado, "Snapshot + log divergem da memória"
+        
+        # Queda no meio de uma escrita: a linha incompleta é descartada
+        with open(repositorio.log_path, 'a', encoding='utf-8') as f:
+            f.write('{"tipo": "fechado", "id": "0010", "conc')
+        recuperado = RepositorioCiclos(path, atraso=0)
+        assert recuperado.listar() == esperado, "Linha incompleta não descartada"
+        
+        # Queda entre o snapshot e o esvaziamento do log: reaplicar o log não duplica nada
+        with open(recuperado.log_path, 'a', encoding='utf-8') as f:
+            f.writelines(cauda)
+        assert RepositorioCiclos(path).listar() == esperado, "Eventos reaplicados duplicados"
+        
+        recuperado.fechar_ciclo('0010', 100, 'hoje')
+        recuperado.compactar()
+        with open(path, 'r', encoding='utf-8') as f:
+            assert [c['status'] for c in json.load(f)] == ['fechado'] * 11, "Snapshot compactado incorreto"
+        assert os.path.getsize(recuperado.log_path) == 0, "Log não esvaziado na compactação"
+    
+    print("✓ Estado reconstruído por snapshot + log, inclusive após queda")
+    return True
+
+
+def test_atualizar_ciclo():
+    """Testa a atualização dos ciclos por máscaras de bits contra uma simulação direta"""
+    print("Testando atualização do ciclo...")
+    
+    historico = SyntheticHistoryGenerator(seed=1).store(400)
+    sorteios = [set(mask_to_dezenas(m)) for m in historico.masks]
+    tamanho = 2
+    
+    # Simulação concurso a concurso: fechado o ciclo, o seguinte usa as dezenas fora dos 10 concursos até ali
+    def dezenas_fora(fim):
+        contagem = {d: sum(d in s for s in sorteios[max(0, fim - 10):fim]) for d in range(1, 26)}
+        return sorted((d for d in contagem if contagem[d] <= 3), key=lambda d: (contagem[d], d))[:tamanho]
+    
+    esperado = []
+    dezenas, sorteadas, concursos = dezenas_fora(10), set(), []
+    for pos in range(10, len(historico)):
+        novas = sorted(d for d in dezenas if d in sorteios[pos] and d not in sorteadas)
+        sorteadas.update(novas)
+        concursos.append(novas)
+        if len(dezenas) == tamanho and len(sorteadas) == tamanho:
+            esperado.append((dezenas, sorted(sorteadas), int(historico.concursos[pos]), concursos))
+            dezenas, sorteadas, concursos = dezenas_fora(pos + 1), set(), []
+    esperado.append((dezenas, sorted(sorteadas), None, concursos))
+    assert len(esperado) > 5, "Poucos ciclos fechados no histórico de teste"
+    
+    with tempfile.TemporaryDirectory(prefix='ciclo_') as diretorio:
+        for detalhar in (True, False):
+            ciclo = CicloDezenasFora()
+            ciclo.ciclos_path = os.path.join(diretorio, f'ciclos_{detalhar}.json')
+            ciclo.versions = VersionedCache(os.path.join(diretorio, f'versions_{detalhar}.json'))
+            ciclo.num_dezenas_ciclo = tamanho
+            
+            # Ciclo aberto no concurso 10, atualizado em duas etapas
+            ciclo._abrir_ciclo(esperado[0][0], int(historico.concursos[9]))
+            parcial = LotofacilDrawStore()
+            parcial.extend(historico.concursos[:200], historico.masks[:200], historico.datas[:200])
+            assert ciclo.atualizar_ciclo(parcial, detalhar=detalhar) is not None, "Falha na primeira atualização"
+            assert ciclo.ciclo_atual['ultimo_concurso'] == int(historico.concursos[199]), "Ponto de retomada não registrado"
+            assert ciclo.atualizar_ciclo(historico, detalhar=detalhar) is ciclo.ciclo_atual, "Falha na segunda atualização"
+            
+            assert ciclo.ciclo_atual['ultimo_concurso'] == int(historico.concursos[-1]), "Ponto de retomada não avançou"
+            
+            ciclos = ciclo.repositorio.listar()
+            obtido = [(c['dezenas'], c['dezenas_sorteadas'], c['concurso_fechamento']) for c in ciclos]
+            assert obtido == [e[:3] for e in esperado], f"Ciclos divergem da simulação (detalhar={detalhar})"
+            if detalhar:
+                assert [[c['dezenas_ciclo_sorteadas'] for c in ciclo_['concursos']] for ciclo_ in ciclos] == [e[3] for e in esperado], \
+                    "Concursos registrados divergem da simulação"
+            ciclo.repositorio.fechar()
+    
+    # Ciclo com dezenas pendentes que nunca saem não fecha
+    fechamento, sorteadas, acertos = varrer_ciclo(0b111, 0b001, historico.masks[:50] & np.uint32(0x1FFFFFB), detalhar=True)
+    assert fechamento is None and len(acertos) == 50, "Fechamento indevido"
+    
+    print("✓ Ciclos e fechamentos coincidem com a simulação concurso a concurso")
+    return True
+
+
+def test_backtest_ciclos():
+    """Testa o backtest dos ciclos contra a atualização concurso a concurso da estratégia"""
+    print("Testando backtest dos ciclos...")
+    
+    historico = SyntheticHistoryGenerator(seed=1).store(400)
+    
+    for num_dezenas_ciclo, num_concursos in ((2, 10), (1, 6)):
+        ciclos = backtest_ciclos(historico.masks, historico.concursos, num_dezenas_ciclo, num_concursos)
+        
+        # Mesma sequência de ciclos produzida pela estratégia, a partir do primeiro ciclo
+        with tempfile.TemporaryDirectory(prefix='backtest_') as diretorio:
+            ciclo = CicloDezenasFora()
+            ciclo.ciclos_path = os.path.join(diretorio, 'ciclos.json')
+            ciclo.versions = VersionedCache(os.path.join(diretorio, 'versions.json'))
+            ciclo.num_dezenas_ciclo, ciclo.num_concursos = num_dezenas_ciclo, num_concursos
+            ciclo._abrir_ciclo(ciclos[0]['dezenas'], ciclos[0]['concurso_inicio'])
+            ciclo.atualizar_ciclo(historico)
+            estrategia = ciclo.repositorio.listar()
+            ciclo.repositorio.fechar()
+        
+        assert len(ciclos) == len(estrategia) > 5, "Número de ciclos diverge da estratégia"
+        for obtido, esperado in zip(ciclos, estrategia):
+            assert obtido['dezenas'] == esperado['dezenas'], "Dezenas do ciclo divergem"
+            assert (obtido['concurso_inicio'], obtido['concurso_fechamento']) == \
+                (esperado['concurso_inicio'], esperado['concurso_fechamento']), "Abertura/fechamento divergem"
+            assert obtido['duracao'] == len(esperado['concursos']), "Duração diverge"
+            assert obtido['ordem_acertos'] == [{'dezena': d, 'concurso': c['concurso']}
+                                               for c in esperado['concursos'] for d in c['dezenas_ciclo_sorteadas']], \
+                "Ordem dos acertos diverge"
+    
+    # A distribuição entre processos produz o mesmo resultado, na ordem dos parâmetros
+    parametros = [{'num_dezenas_ciclo': d, 'num_concursos': j} for d in (1, 2, 3) for j in (5, 10)]
+    resultados = varrer_parametros(historico.masks, parametros, processos=2)
+    assert [r['parametros'] for r in resultados] == parametros, "Ordem dos parâmetros alterada"
+    assert resultados == varrer_parametros(historico.masks, parametros, processos=1), "Resultado do pool diverge"
+    assert resultados[2]['resumo'] == resumir_ciclos(backtest_ciclos(historico.masks, num_dezenas_ciclo=2, num_concursos=5)), \
+        "Resumo diverge do backtest"
+    
+    print("✓ Ciclos do backtest coincidem com os da estratégia")
+    return True
+
+
+def test_indice_repeticoes_ciclo():
+    """Testa a reconstrução do índice de repetições da estratégia quando o histórico muda"""
+    print("Testando índice de repetições da estratégia...")
+    
+    historico = SyntheticHistoryGenerator(seed=13).store(200)
+    ciclo = CicloDezenasFora()
+    
+    indice = ciclo._obter_indice_repeticoes(historico)
+    assert ciclo._obter_indice_repeticoes(historico) is indice, "Índice reconstruído sem mudança no histórico"
+    
+    # Correção de um concurso passado: mesmo tamanho e mesmo último concurso
+    corrigido = dezenas_to_mask(list(range(11, 26)))
+    assert not indice.contains(corrigido), "Jogo de teste já sorteado"
+    historico.masks[10] = corrigido
+    
+    novo = ciclo._obter_indice_repeticoes(historico)
+    assert novo is not indice and novo.contains(corrigido), "Índice não reconstruído após a correção"
+    assert novo.near_many([corrigido])[0], "Jogo igual ao concurso corrigido não filtrado"
+    
+    print("✓ Índice reconstruído quando um concurso passado é corrigido")
+    return True
+
+
+def test_gerar_jogos_lote():
+    """Testa a geração vetorizada de jogos em lote"""
+    print("Testando geração de jogos em lote...")
+    
+    historico = SyntheticHistoryGenerator(seed=1).store(3500)
+    ultimo = mask_to_dezenas(historico.masks[-1])
+    
+    with tempfile.TemporaryDirectory(prefix='lote_') as diretorio:
+        ciclo = CicloDezenasFora()
+        ciclo.ciclos_path = os.path.join(diretorio, 'ciclos.json')
+        ciclo.versions = VersionedCache(os.path.join(diretorio, 'versions.json'))
+        
+        # Ciclo com 4 dezenas pendentes: 4 + 5 dezenas do último concurso fixas, 6 de 10 sorteadas (210 jogos)
+        ciclo._abrir_ciclo(ultimo[:10], int(historico.concursos[-1]))
+        ciclo.ciclo_atual['dezenas_sorteadas'] = ultimo[:6]
+        fixas = set(ultimo[6:]) | set(d for d in ultimo if d not in ultimo[:10])
+        
+        jogos = ciclo.gerar_jogos_lote(100, seed=42, df=historico)
+        assert jogos.shape == (100, 15), "Formato do lote incorreto"
+        assert (np.diff(jogos, axis=1) > 0).all(), "Dezenas fora de ordem ou repetidas"
+        assert all(fixas <= set(jogo) for jogo in jogos.tolist()), "Dezenas pendentes ou do último concurso ausentes"
+        assert not any(set(jogo) & set(ultimo[:6]) for jogo in jogos.tolist()), "Dezenas já sorteadas no ciclo incluídas"
+        
+        mascaras = [dezenas_to_mask(jogo) for jogo in jogos.tolist()]
+        assert len(set(mascaras)) == len(mascaras), "Jogos duplicados no lote"
+        assert not ciclo._obter_indice_repeticoes(historico).near_many(mascaras).any(), "Jogo repete concurso passado"
+        assert (ciclo.gerar_jogos_lote(100, seed=42, df=historico) == jogos).all(), "Semente não reproduz o lote"
+        
+        # Com deduplicação, o lote se limita aos jogos distintos possíveis
+        assert len(ciclo.gerar_jogos_lote(1000, seed=42, df=historico)) <= 210, "Lote excede os jogos possíveis"
+        
+        inicio = time.time()
+        jogos = ciclo.gerar_jogos_lote(100_000, seed=42, deduplicar=False, evitar_repetidos=False, df=historico)
+        tempo = time.time() - inicio
+        assert jogos.shape == (100_000, 15), "Formato do lote grande incorreto"
+        ciclo.repositorio.fechar()
+    
+    print(f"✓ 100.000 jogos gerados em {tempo * 1000:.1f} ms")
+    return True
+
+
+def run_all_tests():
+    """Executa todos os testes"""
+    print("Iniciando testes das estratégias...")
+    print("=" * 80)
+    
+    tests = [
+        ("Tabela de combinações", test_tabela_combinacoes),
+        ("Conferência de jogos", test_conferencia),
+        ("Repositório de ciclos", test_repositorio_ciclos),
+        ("Atualização do ciclo", test_atualizar_ciclo),
+        ("Backtest dos ciclos", test_backtest_ciclos),
+        ("Índice de repetições da estratégia", test_indice_repeticoes_ciclo),
+        ("Geração de jogos em lote", test_gerar_jogos_lote)
+    ]
+    
+    results = {}
+    all_passed = True
+    
+    for name, test_func in tests:
+        print("\n" + "-" * 80)
+        print(f"Executando teste: {name}")
+        print("-" * 80)
+        
+        try:
+            result = test_func()
+            success = result is not None and result is not False
+            results[name] = success
+            
+            if not success:
+                all_passed = False
+            
+            print(f"\nResultado: {'PASSOU' if success else 'FALHOU'}")
+        except Exception as e:
+            results[name] = False
+            all_passed = False
+            print(f"\nResultado: FALHOU - Erro: {str(e)}")
+    
+    print("\n" + "=" * 80)
+    print("Resumo dos testes:")
+    print("=" * 80)
+    
+    for name, success in results.items():
+        print(f"{name}: {'✓ PASSOU' if success else '✗ FALHOU'}")
+    
+    print("\nResultado final:", "TODOS OS TESTES PASSARAM" if all_passed else "ALGUNS TESTES FALHARAM")
+    
+    return {
+        "success": all_passed,
+        "results": results
+    }
+
+
+if __name__ == "__main__":
+    run_all_tests()